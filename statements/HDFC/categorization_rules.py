@@ -0,0 +1,233 @@
+import hashlib
+import json
+import os
+import re
+
+ENGINE_VERSION = 1
+DEFAULT_RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "categorization_rules.json")
+CACHE_DIR_NAME = ".rules_cache"
+
+# In-process cache: rules path -> (mtime_ns, size, CompiledRules)
+_loaded_rules = {}
+
+
+class CompiledRules:
+    """Categorization rules compiled into an ordered list of matching passes"""
+
+    def __init__(self, rules_hash, default, keywords, passes):
+        self.rules_hash = rules_hash
+        self.default = default
+        # keyword -> {'category', 'subcategory', 'priority', 'index'}
+        self.keywords = keywords
+        # Application order, lowest precedence first
+        self.passes = passes
+        self._patterns = [re.compile(p['pattern'], re.IGNORECASE) for p in passes]
+
+    def apply(self, narrations):
+        """Return (category, subcategory) Series for a Series of narrations"""
+        return self.labels(self.match_passes(narrations), narrations.index)
+
+    def match_passes(self, narrations):
+        """Index into self.passes of the pass that claims each narration, -1 where none does"""
+        import numpy as np
+
+        narrations = narrations.astype(object)
+        claimed_by = np.full(len(narrations), -1, dtype=np.int32)
+
+        # Walk passes from highest precedence down, so each row is only
+        # scanned until the first pass that claims it
+        pending = narrations.notna().to_numpy().copy()
+        for pass_index in range(len(self.passes) - 1, -1, -1):
+            if not pending.any():
+                break
+            candidates = narrations[pending]
+            matched = candidates.str.contains(self._patterns[pass_index], na=False).to_numpy()
+            if not matched.any():
+                continue
+            claimed_by[np.flatnonzero(pending)[matched]] = pass_index
+            pending[pending] = ~matched
+
+        return claimed_by
+
+    def labels(self, claimed_by, index):
+        """(category, subcategory) Series for the pass indices from match_passes (-1 is the default)"""
+        import numpy as np
+        import pandas as pd
+
+        # The default goes last, so that index -1 picks it
+        categories = np.array([p['category'] for p in self.passes] + [self.default['category']], dtype=object)
+        subcategories = np.array([p['subcategory'] for p in self.passes] + [self.default['subcategory']], dtype=object)
+        return (pd.Series(categories[claimed_by], index=index, dtype=object),
+                pd.Series(subcategories[claimed_by], index=index, dtype=object))
+
+    def to_dict(self):
+        return {
+            'engine_version': ENGINE_VERSION,
+            'rules_hash': self.rules_hash,
+            'default': self.default,
+            'keywords': self.keywords,
+            'passes': self.passes,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['rules_hash'], data['default'], data['keywords'], data['passes'])
+
+
+def read_rules_file(rules_path):
+    """Parse a JSON or YAML rules file into a dict"""
+    with open(rules_path, 'rb') as f:
+        raw = f.read()
+
+    if rules_path.lower().endswith(('.yaml', '.yml')):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError(f"PyYAML is required to read {rules_path}; install it or use a .json rules file")
+        return yaml.safe_load(raw), raw
+
+    return json.loads(raw.decode('utf-8')), raw
+
+
+def hash_rules(raw):
+    """Hash the rules file contents together with the engine version"""
+    digest = hashlib.sha256(raw)
+    digest.update(f"engine-{ENGINE_VERSION}".encode())
+    return digest.hexdigest()
+
+
+def compile_rules(spec, rules_hash):
+    """Compile a rules spec into matching passes
+
+    Rules with a higher priority win over lower ones; within a rule a later
+    keyword wins over an earlier one. Consecutive keywords that resolve to the
+    same category and subcategory are merged into a single regex pass.
+    """
+    default = spec.get('default', {})
+    default = {
+        'category': default.get('category', 'Others'),
+        'subcategory': default.get('subcategory', 'Miscellaneous'),
+    }
+
+    entries = []
+    for rule_index, rule in enumerate(spec.get('rules', [])):
+        category = rule.get('category')
+        keywords = rule.get('keywords', [])
+        if not category or not keywords:
+            raise ValueError(f"Rule #{rule_index + 1} needs a 'category' and at least one keyword")
+
+        priority = rule.get('priority', rule_index)
+        default_subcategory = rule.get('default_subcategory', default['subcategory'])
+        subcategory_of = {}
+        for subcategory, sub_keywords in rule.get('subcategories', {}).items():
+            for keyword in sub_keywords:
+                subcategory_of[keyword.upper()] = subcategory
+
+        for index, keyword in enumerate(keywords):
+            entries.append({
+                'keyword': keyword,
+                'category': category,
+                'subcategory': subcategory_of.get(keyword.upper(), default_subcategory),
+                'priority': priority,
+                'rule': rule_index,
+                'index': index,
+            })
+
+    entries.sort(key=lambda e: (e['priority'], e['rule'], e['index']))
+
+    keywords = {}
+    for entry in entries:
+        # A keyword repeated across rules resolves to its highest-precedence use
+        keywords[entry['keyword'].upper()] = {
+            'category': entry['category'],
+            'subcategory': entry['subcategory'],
+            'priority': entry['priority'],
+            'index': entry['index'],
+        }
+
+    passes = []
+    for entry in entries:
+        target = (entry['category'], entry['subcategory'])
+        if passes and (passes[-1]['category'], passes[-1]['subcategory']) == target:
+            passes[-1]['keywords'].append(entry['keyword'])
+        else:
+            passes.append({'category': target[0], 'subcategory': target[1], 'keywords': [entry['keyword']]})
+
+    for rule_pass in passes:
+        rule_pass['pattern'] = keyword_pattern(rule_pass['keywords'])
+
+    return CompiledRules(rules_hash, default, keywords, passes)
+
+
+def keyword_pattern(keywords):
+    """Build a case-insensitive alternation regex for literal keywords"""
+    return '|'.join(re.escape(k) for k in sorted(set(keywords), key=len, reverse=True))
+
+
+def load_rules(rules_path=DEFAULT_RULES_FILE, use_cache=True):
+    """Load compiled rules, reloading only when the rules file has changed
+
+    Compiled rules are cached on disk next to the rules file, keyed by the
+    hash of its contents, so an unchanged file is never recompiled.
+    """
+    rules_path = os.path.abspath(rules_path)
+    stat = os.stat(rules_path)
+
+    loaded = _loaded_rules.get(rules_path)
+    if loaded and loaded[0] == stat.st_mtime_ns and loaded[1] == stat.st_size:
+        return loaded[2]
+
+    spec, raw = read_rules_file(rules_path)
+    rules_hash = hash_rules(raw)
+
+    if loaded and loaded[2].rules_hash == rules_hash:
+        _loaded_rules[rules_path] = (stat.st_mtime_ns, stat.st_size, loaded[2])
+        return loaded[2]
+
+    cache_file = os.path.join(os.path.dirname(rules_path), CACHE_DIR_NAME, f"compiled_{rules_hash[:16]}.json")
+    rules = None
+    if use_cache and os.path.exists(cache_file):
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached.get('rules_hash') == rules_hash:
+                rules = CompiledRules.from_dict(cached)
+        except (OSError, ValueError, KeyError):
+            rules = None
+
+    if rules is None:
+        rules = compile_rules(spec, rules_hash)
+        if use_cache:
+            save_compiled_rules(rules, cache_file)
+
+    _loaded_rules[rules_path] = (stat.st_mtime_ns, stat.st_size, rules)
+    return rules
+
+
+def save_compiled_rules(rules, path):
+    """Write compiled rules as JSON (used for the cache and the applied-rules snapshot)"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(rules.to_dict(), f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def load_compiled_rules(path):
+    """Read a compiled rules snapshot, or None if it is missing or unreadable"""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return CompiledRules.from_dict(json.load(f))
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def changed_keywords(old_rules, new_rules):
+    """Keywords whose outcome or precedence differs between two rule sets"""
+    changed = set()
+    for keyword in set(old_rules.keywords) | set(new_rules.keywords):
+        if old_rules.keywords.get(keyword) != new_rules.keywords.get(keyword):
+            changed.add(keyword)
+    return changed
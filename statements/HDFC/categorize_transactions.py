@@ -1,102 +1,45 @@
-import pandas as pd
 import os
 import re
+import argparse
 from datetime import datetime
 
-def categorize_transactions(df):
+from categorization_rules import load_rules, load_compiled_rules, save_compiled_rules, changed_keywords, keyword_pattern, DEFAULT_RULES_FILE
+from date_range import add_range_arguments, in_range, is_ranged, month_partitions, range_label, remove_stale_partitions, replace_months
+from money import to_paise, to_rupees, format_rupees, export_amounts, import_amounts
+from output_tree import OutputTree, WorkbookAppender, file_fingerprint, write_excel
+from statement_reader import iter_workbook_chunks
+
+APPLIED_RULES_FILE = ".applied_rules.json"
+# Manifest stage for the Categorized_Files and Periodic_Files outputs
+CATEGORIZE_STAGE = "categorize"
+# Keys of the per-chunk rollups merged by categorize_chunks
+CATEGORY_KEYS = ['Category', 'Subcategory', 'Transaction_Type']
+MONTHLY_KEYS = ['Month_Year', 'Category']
+
+def categorize_transactions(df, rules=None, workers=None):
     """
     Categorize transactions based on narration patterns
+
+    Rules come from the external rules file (see categorization_rules.json)
+    unless a compiled rule set is passed in. With workers > 1, large inputs
+    are matched on that many cores (see parallel_categorize.py).
     """
-    
-    # Define categorization rules
-    categories = {
-        'Food & Dining': [
-            'ZOMATO', 'SWIGGY', 'ARUMUGAM', 'RESTAURANT', 'FOOD', 'CAFE', 'HOTEL',
-            'DHABA', 'MESS', 'CANTEEN', 'LUNCH', 'DINNER', 'BREAKFAST'
-        ],
-        'Shopping & Retail': [
-            'DECATHLON', 'PARKAR SHIRTS', 'CLOTH STORES', 'TRADING CO', 'COLLECTION',
-            'SPORTS', 'AMAZON', 'FLIPKART', 'MYNTRA', 'AJIO', 'RETAIL', 'MART',
-            'STORE', 'SHOPPING', 'MALL'
-        ],
-        'Transportation': [
-            'UBER', 'OLA', 'RAPIDO', 'TAXI', 'AUTO', 'BUS', 'TRAIN', 'METRO',
-            'PETROL', 'FUEL', 'DIESEL', 'TRANSPORT', 'TRAVEL', 'BOOKING'
-        ],
-        'Entertainment & Subscriptions': [
-            'SPOTIFY', 'NETFLIX', 'AMAZON PRIME', 'YOUTUBE', 'ENTERTAINMENT',
-            'MOVIE', 'CINEMA', 'GAMES', 'SUBSCRIPTION', 'MUSIC', 'UDEMY',
-            'LINKEDIN', 'COURSERA'
-        ],
-        'Utilities & Bills': [
-            'ELECTRICITY', 'WATER', 'GAS', 'INTERNET', 'MOBILE', 'PHONE',
-            'BROADBAND', 'WIFI', 'BILL', 'RECHARGE', 'PAYMENT', 'UTILITY'
-        ],
-        'Banking & Finance': [
-            'BANK', 'ATM', 'INTEREST', 'CHARGES', 'FEE', 'PENALTY', 'LOAN',
-            'EMI', 'INSURANCE', 'PREMIUM', 'INVESTMENT', 'MUTUAL FUND',
-            'DIVIDEND', 'TATA MOTORS', 'ZERODHA', 'TRADING', 'DEMAT'
-        ],
-        'Healthcare': [
-            'HOSPITAL', 'CLINIC', 'DOCTOR', 'MEDICAL', 'PHARMACY', 'MEDICINE',
-            'HEALTH', 'DIAGNOSTIC', 'LAB', 'CHECKUP'
-        ],
-        'Education': [
-            'SCHOOL', 'COLLEGE', 'UNIVERSITY', 'EDUCATION', 'COURSE', 'TRAINING',
-            'FEES', 'TUITION', 'BOOKS', 'STATIONERY'
-        ],
-        'Technology & Software': [
-            'GOOGLE', 'MICROSOFT', 'APPLE', 'SOFTWARE', 'CLOUD', 'HOSTING',
-            'DOMAIN', 'TECH', 'COMPUTER', 'MOBILE', 'GADGET'
-        ],
-        'Cash & ATM': [
-            'ATW', 'ATM', 'CASH', 'WITHDRAWAL'
-        ],
-        'Income & Salary': [
-            'SALARY', 'NEFT CR', 'IMPS CR', 'ACH C', 'CREDIT', 'INCOME',
-            'BONUS', 'INCENTIVE', 'REFUND', 'CASHBACK'
-        ],
-        'Investments & Savings': [
-            'INVESTMENT', 'MUTUAL FUND', 'SIP', 'FIXED DEPOSIT', 'RD',
-            'RECURRING DEPOSIT', 'SAVINGS', 'PORTFOLIO'
-        ]
-    }
+    import pandas as pd
+
+    if rules is None:
+        rules = load_rules()
     
     # Create a copy for categorization
     df_categorized = df.copy()
-    df_categorized['Category'] = 'Others'
-    df_categorized['Subcategory'] = 'Miscellaneous'
-    
-    # Apply categorization rules
-    for category, keywords in categories.items():
-        for keyword in keywords:
-            mask = df_categorized['Narration'].str.contains(keyword, case=False, na=False)
-            df_categorized.loc[mask, 'Category'] = category
-            
-            # Set subcategory based on specific patterns
-            if category == 'Food & Dining':
-                if any(word in keyword.lower() for word in ['zomato', 'swiggy']):
-                    df_categorized.loc[mask, 'Subcategory'] = 'Online Food Delivery'
-                else:
-                    df_categorized.loc[mask, 'Subcategory'] = 'Restaurant/Local Food'
-            elif category == 'Banking & Finance':
-                if 'INTEREST' in keyword:
-                    df_categorized.loc[mask, 'Subcategory'] = 'Bank Interest'
-                elif 'DIVIDEND' in keyword or 'TATA MOTORS' in keyword:
-                    df_categorized.loc[mask, 'Subcategory'] = 'Dividend Income'
-                elif 'ZERODHA' in keyword:
-                    df_categorized.loc[mask, 'Subcategory'] = 'Trading/Investment'
-                else:
-                    df_categorized.loc[mask, 'Subcategory'] = 'Banking Services'
-            elif category == 'Income & Salary':
-                if any(word in keyword for word in ['NEFT CR', 'IMPS CR', 'ACH C']):
-                    df_categorized.loc[mask, 'Subcategory'] = 'Salary/Income Transfer'
-                else:
-                    df_categorized.loc[mask, 'Subcategory'] = 'Other Income'
+    if workers and workers > 1:
+        from parallel_categorize import apply_parallel
+        df_categorized['Category'], df_categorized['Subcategory'] = apply_parallel(rules, df_categorized['Narration'], workers)
+    else:
+        df_categorized['Category'], df_categorized['Subcategory'] = rules.apply(df_categorized['Narration'])
     
     # Handle UPI transactions more specifically
     upi_mask = df_categorized['Narration'].str.contains('UPI-', case=False, na=False)
-    upi_uncategorized = upi_mask & (df_categorized['Category'] == 'Others')
+    upi_uncategorized = upi_mask & (df_categorized['Category'] == rules.default['category'])
     
     # For uncategorized UPI transactions, try to extract merchant name
     def extract_upi_merchant(narration):
@@ -117,58 +60,142 @@ def categorize_transactions(df):
     credit_mask = df_categorized['Deposit Amt.'].notna()
     df_categorized.loc[credit_mask, 'Transaction_Type'] = 'Credit'
     
-    # Add amount column (unified)
-    df_categorized['Amount'] = df_categorized['Withdrawal Amt.'].fillna(0) + df_categorized['Deposit Amt.'].fillna(0)
+    # Add amount column (unified), in paise so that totals are exact
+    df_categorized['Amount_Paise'] = to_paise(df_categorized['Withdrawal Amt.']) + to_paise(df_categorized['Deposit Amt.'])
     
     return df_categorized
 
+def category_rollup(df_categorized):
+    """
+    Amount and count per category, subcategory and transaction type (categories in order of appearance)
+    """
+    rollup = df_categorized.groupby(['Category', 'Subcategory', 'Transaction_Type'], sort=False)['Amount_Paise'].agg(['sum', 'size'])
+    return rollup.reset_index().rename(columns={'sum': 'Amount_Paise', 'size': 'Count'})
+
+def merge_partials(partials, keys):
+    """
+    Combine per-chunk rollups: sum the value columns of rows with the same keys
+    """
+    import pandas as pd
+
+    return pd.concat(partials, ignore_index=True).groupby(keys, sort=False, as_index=False).sum()
+
 def generate_category_summary(df_categorized):
     """
     Generate summary statistics by category
     """
+    print_category_summary(category_rollup(df_categorized))
+
+def print_category_summary(rollup):
+    """
+    Print summary statistics by category from a category rollup
+    """
     print("=== TRANSACTION CATEGORIZATION SUMMARY ===\n")
     
     # Overall summary
-    total_transactions = len(df_categorized)
-    total_debits = df_categorized[df_categorized['Transaction_Type'] == 'Debit']['Amount'].sum()
-    total_credits = df_categorized[df_categorized['Transaction_Type'] == 'Credit']['Amount'].sum()
+    total_transactions = rollup['Count'].sum()
+    total_debits = rollup[rollup['Transaction_Type'] == 'Debit']['Amount_Paise'].sum()
+    total_credits = rollup[rollup['Transaction_Type'] == 'Credit']['Amount_Paise'].sum()
     
     print(f"Total Transactions: {total_transactions}")
-    print(f"Total Debits: ₹{total_debits:,.2f}")
-    print(f"Total Credits: ₹{total_credits:,.2f}")
-    print(f"Net Amount: ₹{total_credits - total_debits:,.2f}")
+    print(f"Total Debits: {format_rupees(total_debits)}")
+    print(f"Total Credits: {format_rupees(total_credits)}")
+    print(f"Net Amount: {format_rupees(total_credits - total_debits)}")
     print()
     
     # Category-wise breakdown
     print("Category-wise Breakdown:")
     print("-" * 60)
     
-    category_summary = df_categorized.groupby(['Category', 'Transaction_Type']).agg({
-        'Amount': ['sum', 'count'],
-        'Date': ['min', 'max']
-    }).round(2)
-    
-    for category in df_categorized['Category'].unique():
-        cat_data = df_categorized[df_categorized['Category'] == category]
-        debit_amount = cat_data[cat_data['Transaction_Type'] == 'Debit']['Amount'].sum()
-        credit_amount = cat_data[cat_data['Transaction_Type'] == 'Credit']['Amount'].sum()
-        transaction_count = len(cat_data)
+    for category in rollup['Category'].unique():
+        cat_data = rollup[rollup['Category'] == category]
+        debit_amount = cat_data[cat_data['Transaction_Type'] == 'Debit']['Amount_Paise'].sum()
+        credit_amount = cat_data[cat_data['Transaction_Type'] == 'Credit']['Amount_Paise'].sum()
+        transaction_count = cat_data['Count'].sum()
         
         print(f"{category}:")
-        print(f"  Debits: ₹{debit_amount:,.2f} | Credits: ₹{credit_amount:,.2f} | Count: {transaction_count}")
+        print(f"  Debits: {format_rupees(debit_amount)} | Credits: {format_rupees(credit_amount)} | Count: {transaction_count}")
         
         # Top subcategories
         if transaction_count > 0:
-            top_subcats = cat_data.groupby('Subcategory')['Amount'].sum().sort_values(ascending=False).head(3)
-            print(f"  Top subcategories: {', '.join([f'{subcat} (₹{amt:,.0f})' for subcat, amt in top_subcats.items()])}")
+            top_subcats = cat_data.groupby('Subcategory')['Amount_Paise'].sum().sort_values(ascending=False).head(3)
+            print(f"  Top subcategories: {', '.join([f'{subcat} ({format_rupees(amt, 0)})' for subcat, amt in top_subcats.items()])}")
         print()
 
-def save_categorized_data(df_categorized, base_directory):
+def category_file_name(category):
+    """File name used for a category-wise workbook"""
+    safe_category_name = category.replace('&', 'and').replace('/', '_')
+    return f"Category_{safe_category_name}.xlsx"
+
+def save_category_files(df_categorized, categorized_dir, categories=None, stage=None):
+    """
+    Save category-wise files, optionally only for the given categories
+    """
+    if categories is None:
+        categories = df_categorized['Category'].unique()
+    
+    for category in categories:
+        category_data = df_categorized[df_categorized['Category'] == category]
+        category_file = os.path.join(categorized_dir, category_file_name(category))
+        if len(category_data) == 0:
+            # Category no longer has any transactions
+            if os.path.exists(category_file):
+                os.remove(category_file)
+                print(f"  Removed {category}: no transactions left")
+            if stage is not None:
+                stage.forget(category_file)
+            continue
+        write_excel(export_amounts(category_data), category_file, stage, index=False)
+        print(f"  Saved {category}: {len(category_data)} transactions")
+
+def save_monthly_categorized_files(df_categorized, periodic_dir, months=None, stage=None):
+    """
+    Save monthly categorized files, optionally only for the given months
+    """
+    if months is None:
+        months = df_categorized['Month_Year'].unique()
+    
+    for month_year in months:
+        month_data = df_categorized[df_categorized['Month_Year'] == month_year]
+        month_file = os.path.join(periodic_dir, f"Monthly_Categorized_{month_year}.xlsx")
+        write_excel(export_amounts(month_data), month_file, stage, index=False)
+        print(f"  Saved {month_year}: {len(month_data)} transactions")
+
+def monthly_category_summary(df_categorized):
+    """
+    Total amount and count per month and category
+    """
+    monthly_summary = df_categorized.groupby(['Month_Year', 'Category']).agg({
+        'Amount_Paise': 'sum',
+        'Date': 'count'
+    }).reset_index()
+    monthly_summary.columns = ['Month_Year', 'Category', 'Total_Amount_Paise', 'Transaction_Count']
+    return monthly_summary
+
+def save_monthly_summaries(df_categorized, periodic_dir, stage=None):
+    """
+    Save the monthly category summary and pivot workbooks
     """
-    Save categorized data to Excel files in organized folders
+    save_summary_workbooks(monthly_category_summary(df_categorized), periodic_dir, stage)
+
+def save_summary_workbooks(monthly_summary, periodic_dir, stage=None):
     """
-    import os
+    Save a monthly category summary and its month x category pivot
+    """
+    summary_file = os.path.join(periodic_dir, "Monthly_Category_Summary.xlsx")
+    write_excel(export_amounts(monthly_summary), summary_file, stage, index=False)
+    print(f"Saved monthly summary: {summary_file}")
     
+    # Create pivot table for better analysis
+    pivot_summary = monthly_summary.pivot(index='Month_Year', columns='Category', values='Total_Amount_Paise').fillna(0)
+    pivot_file = os.path.join(periodic_dir, "Monthly_Spending_Pivot.xlsx")
+    write_excel(to_rupees(pivot_summary), pivot_file, stage)
+    print(f"Saved pivot analysis: {pivot_file}")
+
+def save_categorized_data(df_categorized, base_directory, rules=None, stage=None):
+    """
+    Save categorized data to Excel files in organized folders (each written atomically, recorded in stage)
+    """
     # Create organized folder structure
     categorized_dir = os.path.join(base_directory, "Categorized_Files")
     periodic_dir = os.path.join(base_directory, "Periodic_Files")
@@ -182,70 +209,327 @@ def save_categorized_data(df_categorized, base_directory):
     
     # Save complete categorized data
     complete_file = os.path.join(categorized_dir, "Complete_Categorized_Statement.xlsx")
-    df_categorized.to_excel(complete_file, index=False)
+    write_excel(export_amounts(df_categorized), complete_file, stage, index=False)
     print(f"Saved complete categorized data: {complete_file}")
     
     # Save category-wise files
     print("\nSaving category-wise files...")
-    for category in df_categorized['Category'].unique():
-        category_data = df_categorized[df_categorized['Category'] == category]
-        safe_category_name = category.replace('&', 'and').replace('/', '_')
-        category_file = os.path.join(categorized_dir, f"Category_{safe_category_name}.xlsx")
-        category_data.to_excel(category_file, index=False)
-        print(f"  Saved {category}: {len(category_data)} transactions")
+    save_category_files(df_categorized, categorized_dir, stage=stage)
     
     # Save monthly categorized data (separate files for each month)
     print("\nSaving monthly categorized files...")
-    for month_year in df_categorized['Month_Year'].unique():
-        month_data = df_categorized[df_categorized['Month_Year'] == month_year]
-        month_file = os.path.join(periodic_dir, f"Monthly_Categorized_{month_year}.xlsx")
-        month_data.to_excel(month_file, index=False)
-        print(f"  Saved {month_year}: {len(month_data)} transactions")
+    save_monthly_categorized_files(df_categorized, periodic_dir, stage=stage)
     
-    # Save monthly summary
-    monthly_summary = df_categorized.groupby(['Month_Year', 'Category']).agg({
-        'Amount': 'sum',
-        'Date': 'count'
-    }).reset_index()
-    monthly_summary.columns = ['Month_Year', 'Category', 'Total_Amount', 'Transaction_Count']
+    # Save monthly summary and pivot
+    save_monthly_summaries(df_categorized, periodic_dir, stage)
     
-    summary_file = os.path.join(periodic_dir, "Monthly_Category_Summary.xlsx")
-    monthly_summary.to_excel(summary_file, index=False)
-    print(f"Saved monthly summary: {summary_file}")
+    # Remember which rules produced these files so --diff can patch them later
+    if rules is not None:
+        save_applied_rules(rules, os.path.join(categorized_dir, APPLIED_RULES_FILE), stage)
+
+def save_applied_rules(rules, path, stage=None):
+    save_compiled_rules(rules, path)
+    if stage is not None:
+        stage.record(path)
+
+def categorize_inputs(consolidated_file, rules):
+    """The consolidated workbook and rule set a categorize stage was run on"""
+    return {'consolidated': file_fingerprint(consolidated_file), 'rules': rules.rules_hash}
+
+def recategorize_changed_rules(base_directory, rules, stage=None):
+    """
+    Re-categorize only rows affected by a rules change and patch their outputs
+
+    Compares the current rules with the snapshot saved by the last run. Rows
+    whose narration matches no changed keyword keep their category, so only
+    the category and month files that actually change are rewritten.
+    """
+    import pandas as pd
+
+    categorized_dir = os.path.join(base_directory, "Categorized_Files")
+    periodic_dir = os.path.join(base_directory, "Periodic_Files")
+    complete_file = os.path.join(categorized_dir, "Complete_Categorized_Statement.xlsx")
+    applied_rules_file = os.path.join(categorized_dir, APPLIED_RULES_FILE)
     
-    # Create pivot table for better analysis
-    pivot_summary = monthly_summary.pivot(index='Month_Year', columns='Category', values='Total_Amount').fillna(0)
-    pivot_file = os.path.join(periodic_dir, "Monthly_Spending_Pivot.xlsx")
-    pivot_summary.to_excel(pivot_file)
-    print(f"Saved pivot analysis: {pivot_file}")
+    applied_rules = load_compiled_rules(applied_rules_file)
+    if applied_rules is None or not os.path.exists(complete_file):
+        print("No previous categorization snapshot found - run a full categorization first.")
+        return False
+    
+    if applied_rules.rules_hash == rules.rules_hash:
+        print("Rules unchanged since the last run - nothing to update.")
+        return True
+    
+    changed = changed_keywords(applied_rules, rules)
+    default_changed = applied_rules.default != rules.default
+    print(f"Changed keywords: {len(changed)}" + (" (default category changed)" if default_changed else ""))
+    
+    df_categorized = import_amounts(pd.read_excel(complete_file), ['Amount'])
+    df_categorized['Date'] = pd.to_datetime(df_categorized['Date'])
+    df_categorized['Month_Year'] = df_categorized['Date'].dt.to_period('M')
+    
+    affected = pd.Series(False, index=df_categorized.index)
+    if changed:
+        changed_pattern = re.compile(keyword_pattern(changed), re.IGNORECASE)
+        affected |= df_categorized['Narration'].astype(object).str.contains(changed_pattern, na=False)
+    if default_changed:
+        affected |= df_categorized['Category'] == applied_rules.default['category']
+    
+    if not affected.any():
+        save_applied_rules(rules, applied_rules_file, stage)
+        print("No transactions match the changed rules.")
+        return True
+    
+    old_rows = df_categorized.loc[affected, ['Category', 'Subcategory']]
+    base_columns = [c for c in df_categorized.columns if c not in ('Category', 'Subcategory', 'Transaction_Type', 'Amount_Paise')]
+    new_rows = categorize_transactions(df_categorized.loc[affected, base_columns], rules)
+    
+    moved = (old_rows['Category'] != new_rows['Category']) | (old_rows['Subcategory'] != new_rows['Subcategory'])
+    print(f"Re-categorized {int(affected.sum())} matching transactions, {int(moved.sum())} changed")
+    if not moved.any():
+        save_applied_rules(rules, applied_rules_file, stage)
+        return True
+    
+    moved_index = moved[moved].index
+    df_categorized.loc[moved_index, 'Category'] = new_rows.loc[moved_index, 'Category']
+    df_categorized.loc[moved_index, 'Subcategory'] = new_rows.loc[moved_index, 'Subcategory']
+    
+    affected_categories = sorted(set(old_rows.loc[moved_index, 'Category']) | set(new_rows.loc[moved_index, 'Category']))
+    affected_months = sorted(df_categorized.loc[moved_index, 'Month_Year'].unique())
+    
+    write_excel(export_amounts(df_categorized), complete_file, stage, index=False)
+    print(f"Updated complete categorized data: {complete_file}")
+    
+    print("\nPatching category-wise files...")
+    save_category_files(df_categorized, categorized_dir, affected_categories, stage)
+    
+    print("\nPatching monthly categorized files...")
+    save_monthly_categorized_files(df_categorized, periodic_dir, affected_months, stage)
+    
+    save_monthly_summaries(df_categorized, periodic_dir, stage)
+    save_applied_rules(rules, applied_rules_file, stage)
+    return True
 
-def main():
-    # Load consolidated data from the new organized structure
-    consolidated_file = 'Organized_Statements/Consolidated_Files/Complete_Consolidated_Statement.xlsx'
-    
-    # Check if the new structure exists, if not use old structure
-    if not os.path.exists(consolidated_file):
-        consolidated_file = 'Consolidated_Statements/Complete_Consolidated_Statement.xlsx'
-        if not os.path.exists(consolidated_file):
-            print("Error: No consolidated statement file found!")
-            print("Please run the consolidation script first.")
-            return
+def categorize_range(base_directory, rules, start, end, stage=None, workers=None):
+    """
+    Categorize only the months of a --from/--to range
+
+    Reads just the range's Statement_YYYY-MM.xlsx partitions from
+    Monthly_Files instead of the whole consolidated workbook, then patches
+    the outputs with them (see save_categorized_range).
+    """
+    import pandas as pd
+
+    if applied_rules_differ(base_directory, rules):
+        print("Rules changed since the last run - run with --diff (or without a range) first,")
+        print("so that every month is categorized with the same rules.")
+        return False
     
-    df = pd.read_excel(consolidated_file)
+    partitions = month_partitions(os.path.join(base_directory, "Monthly_Files"), "Statement_", start, end)
+    if not partitions:
+        print(f"Error: No monthly statement files from {range_label(start, end)}!")
+        print("Please run the consolidation script first.")
+        return False
     
-    # Add Month_Year column for monthly analysis
+    df = pd.concat([pd.read_excel(path) for path in partitions.values()], ignore_index=True)
     df['Date'] = pd.to_datetime(df['Date'])
     df['Month_Year'] = df['Date'].dt.to_period('M')
     
-    print("Categorizing transactions...")
-    df_categorized = categorize_transactions(df)
-    
-    # Generate summary
+    print(f"Categorizing {len(df)} transactions from {len(partitions)} month(s)...")
+    df_categorized = categorize_transactions(df, rules, workers)
     generate_category_summary(df_categorized)
+    save_categorized_range(df_categorized, base_directory, rules, start, end, stage)
+    return True
+
+def applied_rules_differ(base_directory, rules):
+    """True if the saved outputs were categorized with other rules (a range would then mix two rule sets)"""
+    applied_rules = load_compiled_rules(os.path.join(base_directory, "Categorized_Files", APPLIED_RULES_FILE))
+    return applied_rules is not None and applied_rules.rules_hash != rules.rules_hash
+
+def save_categorized_range(df_categorized, base_directory, rules, start, end, stage=None):
+    """
+    Patch the categorized outputs with the freshly categorized rows of a range
+
+    The range's month files are rewritten; in the complete workbook the
+    range's rows are swapped for the new ones, and only the category files
+    that had or now have rows in the range are written again.
+    """
+    import pandas as pd
+
+    categorized_dir = os.path.join(base_directory, "Categorized_Files")
+    periodic_dir = os.path.join(base_directory, "Periodic_Files")
+    os.makedirs(categorized_dir, exist_ok=True)
+    os.makedirs(periodic_dir, exist_ok=True)
+    complete_file = os.path.join(categorized_dir, "Complete_Categorized_Statement.xlsx")
+    
+    print("\nSaving monthly categorized files...")
+    save_monthly_categorized_files(df_categorized, periodic_dir, stage=stage)
+    months = {str(month) for month in df_categorized['Month_Year'].unique()}
+    remove_stale_partitions(periodic_dir, "Monthly_Categorized_", months, start, end, stage)
+    
+    affected_categories = set(df_categorized['Category'])
+    df_all = df_categorized
+    if os.path.exists(complete_file):
+        existing = import_amounts(pd.read_excel(complete_file), ['Amount'])
+        existing['Date'] = pd.to_datetime(existing['Date'])
+        existing['Month_Year'] = existing['Date'].dt.to_period('M')
+        affected_categories |= set(existing.loc[in_range(existing['Date'], start, end), 'Category'])
+        df_all = replace_months(existing, df_categorized, start, end)
+    
+    write_excel(export_amounts(df_all), complete_file, stage, index=False)
+    print(f"Updated complete categorized data: {complete_file}")
+    
+    print("\nSaving category-wise files...")
+    save_category_files(df_all, categorized_dir, sorted(affected_categories), stage)
     
-    # Save categorized data
-    base_directory = "Organized_Statements"
-    save_categorized_data(df_categorized, base_directory)
+    save_monthly_summaries(df_all, periodic_dir, stage)
+    save_applied_rules(rules, os.path.join(categorized_dir, APPLIED_RULES_FILE), stage)
+
+def add_arguments(parser, output_dir="Organized_Statements"):
+    """Register the categorization options on an argparse parser (output relative to the working folder unless given)"""
+    parser.add_argument("--output", "-o", default=output_dir, help="Organized_Statements folder")
+    parser.add_argument("--rules", default=DEFAULT_RULES_FILE, help="Categorization rules file (.json, or .yaml with PyYAML)")
+    parser.add_argument("--diff", action="store_true", help="Only re-categorize transactions affected by rule changes since the last run")
+    parser.add_argument("--resume", action="store_true", help="Skip if the last committed run used the same consolidated data and rules")
+    parser.add_argument("--chunk-size", type=int, help="Stream the consolidated workbook in batches of this many rows (bounded memory; full runs only)")
+    parser.add_argument("--workers", type=int, help="Match narrations on this many cores (for very large ledgers)")
+    add_range_arguments(parser, "months")
+
+def main():
+    parser = argparse.ArgumentParser(description="Categorize consolidated HDFC transactions")
+    add_arguments(parser)
+    args = parser.parse_args()
+    run_categorization(args.output, args.rules, args.diff, args.resume, args.chunk_size, args.start, args.end, args.workers)
+
+def run_categorization(base_directory, rules_path=DEFAULT_RULES_FILE, diff=False, resume=False, chunk_size=None, start=None, end=None,
+                       workers=None):
+    """Categorize the consolidated statement under base_directory
+
+    The output tree is locked for the whole run and the files written are
+    committed to its manifest at the end. With resume, nothing is done if
+    the committed outputs were made from the same consolidated workbook and rules.
+    With chunk_size, the workbook is streamed through in batches of that many rows.
+    With start or end, only the month partitions of that range are read and rewritten.
+    With workers, narrations are matched on that many cores.
+    """
+    rules = load_rules(rules_path)
+    
+    tree = OutputTree(base_directory)
+    with tree.locked():
+        inputs = categorize_inputs(os.path.join(base_directory, 'Consolidated_Files', 'Complete_Consolidated_Statement.xlsx'), rules)
+        if resume and tree.is_committed(CATEGORIZE_STAGE, inputs):
+            print("⏭️  Categorization already committed for this data and these rules - skipping")
+            return
+        
+        if is_ranged(start, end) and not diff:
+            print(f"Categorizing {range_label(start, end)} only...")
+            stage = tree.range_stage(CATEGORIZE_STAGE)
+            if categorize_range(base_directory, rules, start, end, stage, workers):
+                stage.commit()
+            return
+        stage = tree.stage(CATEGORIZE_STAGE, inputs, patch=diff)
+        
+        if diff:
+            if is_ranged(start, end):
+                print("--diff already rewrites only the affected months; ignoring --from/--to.")
+            print("Applying rule changes to existing categorized data...")
+            if recategorize_changed_rules(base_directory, rules, stage):
+                stage.commit()
+            return
+        
+        if categorize_into(base_directory, rules, stage, chunk_size, workers):
+            stage.commit()
+
+def find_consolidated_file(base_directory):
+    """The consolidated workbook (new organized structure first, then the old one), or None"""
+    consolidated_file = os.path.join(base_directory, 'Consolidated_Files', 'Complete_Consolidated_Statement.xlsx')
+    if os.path.exists(consolidated_file):
+        return consolidated_file
+    consolidated_file = os.path.join(os.path.dirname(base_directory), 'Consolidated_Statements', 'Complete_Consolidated_Statement.xlsx')
+    return consolidated_file if os.path.exists(consolidated_file) else None
+
+def categorize_chunks(consolidated_file, base_directory, rules, chunk_size, stage=None, workers=None):
+    """
+    Categorize the consolidated workbook a batch of rows at a time
+
+    Each batch is appended to the complete, category and month workbooks as
+    soon as it is categorized; a month's workbook is saved once the batches
+    move past that month. Each batch's rollups are added to running totals.
+    Peak memory is set by chunk_size, not by the length of the history.
+    """
+    import pandas as pd
+
+    categorized_dir = os.path.join(base_directory, "Categorized_Files")
+    periodic_dir = os.path.join(base_directory, "Periodic_Files")
+    os.makedirs(categorized_dir, exist_ok=True)
+    os.makedirs(periodic_dir, exist_ok=True)
+    complete_file = os.path.join(categorized_dir, "Complete_Categorized_Statement.xlsx")
+    
+    category_totals = None
+    monthly_totals = None
+    month_files = {}
+    with WorkbookAppender(stage) as books:
+        for number, df in enumerate(iter_workbook_chunks(consolidated_file, chunk_size), 1):
+            df['Date'] = pd.to_datetime(df['Date'])
+            df['Month_Year'] = df['Date'].dt.to_period('M')
+            df_categorized = categorize_transactions(df, rules, workers)
+            
+            exported = export_amounts(df_categorized)
+            books.append(complete_file, exported)
+            for category, rows in exported.groupby(df_categorized['Category'], sort=False):
+                books.append(os.path.join(categorized_dir, category_file_name(category)), rows)
+            for month_year, rows in exported.groupby(df_categorized['Month_Year'], sort=False):
+                month_files[month_year] = os.path.join(periodic_dir, f"Monthly_Categorized_{month_year}.xlsx")
+                books.append(month_files[month_year], rows)
+            # The statement is in month order, so the months before this chunk's last are complete
+            last_month = df_categorized['Month_Year'].max()
+            for month_year in [month for month in month_files if month < last_month]:
+                books.finish(month_files.pop(month_year))
+            
+            # Folded in as they come, so the totals hold one row per key rather than per key and chunk
+            category_totals = merge_partials([category_totals, category_rollup(df_categorized)], CATEGORY_KEYS)
+            monthly_totals = merge_partials([monthly_totals, monthly_category_summary(df_categorized)], MONTHLY_KEYS)
+            print(f"  Chunk {number}: {len(df)} transactions categorized")
+        print("Saving categorized files...")
+    
+    if category_totals is None:
+        print("Error: The consolidated statement has no transactions!")
+        return False
+    
+    print_category_summary(category_totals)
+    save_summary_workbooks(monthly_totals.sort_values(['Month_Year', 'Category'], ignore_index=True), periodic_dir, stage)
+    save_applied_rules(rules, os.path.join(categorized_dir, APPLIED_RULES_FILE), stage)
+    return True
+
+def categorize_into(base_directory, rules, stage=None, chunk_size=None, workers=None):
+    """Categorize and save (streamed in batches if chunk_size is given); False if there is no consolidated statement"""
+    import pandas as pd
+
+    consolidated_file = find_consolidated_file(base_directory)
+    if consolidated_file is None:
+        print("Error: No consolidated statement file found!")
+        print("Please run the consolidation script first.")
+        return False
+    
+    if chunk_size:
+        print(f"Categorizing transactions in chunks of {chunk_size} rows...")
+        if not categorize_chunks(consolidated_file, base_directory, rules, chunk_size, stage, workers):
+            return False
+    else:
+        df = pd.read_excel(consolidated_file)
+        
+        # Add Month_Year column for monthly analysis
+        df['Date'] = pd.to_datetime(df['Date'])
+        df['Month_Year'] = df['Date'].dt.to_period('M')
+        
+        print("Categorizing transactions...")
+        df_categorized = categorize_transactions(df, rules, workers)
+        
+        # Generate summary
+        generate_category_summary(df_categorized)
+        
+        # Save categorized data
+        save_categorized_data(df_categorized, base_directory, rules, stage)
     
     print("\n=== CATEGORIZATION COMPLETE ===")
     print("Check the organized folder structure:")
@@ -259,6 +543,7 @@ def main():
     print("    - Monthly_Categorized_*.xlsx files")
     print("    - Monthly_Category_Summary.xlsx")
     print("    - Monthly_Spending_Pivot.xlsx")
+    return True
 
 if __name__ == "__main__":
     main()
@@ -1,38 +1,174 @@
-import pandas as pd
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import argparse
 import glob
+import json
 
-def read_excel_files(directory_path):
-    """Read all Excel files in the directory and return a list of DataFrames"""
-    excel_files = glob.glob(os.path.join(directory_path, "*.xls*"))
+from date_range import (add_range_arguments, in_range, is_ranged, month_in_range, overlaps_range, range_label,
+                        remove_stale_partitions, replace_months)
+from money import to_paise, to_rupees
+from output_tree import OutputTree, atomic_path, file_fingerprint, write_excel
+from statement_reader import read_statement, read_statement_period, statement_format
+
+# Files parsed at once; each worker holds one workbook in memory
+MAX_LOAD_WORKERS = 4
+# Manifest stage for the Monthly_Files and Consolidated_Files outputs
+CONSOLIDATE_STAGE = "consolidate"
+# First and last transaction date of each export seen so far, by file name and
+# fingerprint, so --from/--to runs can skip exports without a period banner
+EXPORT_PERIODS_FILE = ".export_periods.json"
+# Excel workbooks and delimited-text exports
+EXPORT_PATTERNS = ("*.xls*", "*.csv", "*.txt")
+
+def find_excel_files(directory_path):
+    """The exports in a folder: Excel workbooks and delimited-text files"""
+    return sorted(path for pattern in EXPORT_PATTERNS for path in glob.glob(os.path.join(directory_path, pattern)))
+
+def export_fingerprints(directory_path):
+    """Size and modification time of each export, the inputs of the consolidate stage"""
+    return {os.path.basename(path): file_fingerprint(path) for path in find_excel_files(directory_path)}
+
+def load_export_periods(base_directory):
+    path = os.path.join(base_directory, EXPORT_PERIODS_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_export_periods(periods, base_directory):
+    os.makedirs(base_directory, exist_ok=True)
+    with atomic_path(os.path.join(base_directory, EXPORT_PERIODS_FILE)) as tmp_path:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(periods, f, indent=2)
+
+def export_period(file_path, periods):
+    """(first day, last day) of an export: remembered from an earlier read, else its banner, else None"""
+    known = periods.get(os.path.basename(file_path))
+    if known is not None and known['fingerprint'] == file_fingerprint(file_path):
+        return datetime.strptime(known['first'], '%Y-%m-%d').date(), datetime.strptime(known['last'], '%Y-%m-%d').date()
+    try:
+        return read_statement_period(file_path)
+    except Exception:
+        # Unreadable here means unreadable later too; leave it to the full read to report
+        return None
+
+def select_exports(excel_files, start, end, periods):
+    """The exports that may hold transactions in the range; those with an unknown period are kept"""
+    selected = []
+    for file_path in excel_files:
+        period = export_period(file_path, periods)
+        if period is None or overlaps_range(*period, start, end):
+            selected.append(file_path)
+    return selected
+
+def record_export_period(df, file_path, periods):
+    """Remember the dates an export covers, for pruning later ranged runs"""
+    import pandas as pd
+
+    date_columns = identify_date_column(df)
+    if not date_columns or not pd.api.types.is_datetime64_any_dtype(df[date_columns[0]]):
+        return
+    dates = df[date_columns[0]].dropna()
+    if dates.empty:
+        return
+    periods[os.path.basename(file_path)] = {
+        'fingerprint': file_fingerprint(file_path),
+        'first': dates.min().strftime('%Y-%m-%d'),
+        'last': dates.max().strftime('%Y-%m-%d'),
+    }
+
+def filter_to_range(df, start, end):
+    """The rows of an export whose month falls inside the range
+
+    The index is kept, so each row still carries its position in the export.
+    """
+    import pandas as pd
+
+    date_columns = identify_date_column(df)
+    if not date_columns or not pd.api.types.is_datetime64_any_dtype(df[date_columns[0]]):
+        print(f"  ⚠️  No parsed date column in {df['Source_File'].iloc[0] if len(df) else 'an export'} - keeping every row")
+        return df
+    return df[in_range(df[date_columns[0]], start, end)]
+
+def read_excel_file(file_path):
+    """Read one Excel or delimited-text export (header found automatically, columns typed) and tag it with its source file name"""
+    df = read_statement(file_path)
+    
+    # Add source file column
+    df['Source_File'] = os.path.basename(file_path)
+    return df
+
+def load_excel_file(file_path):
+    """Read one export, returning (engine, DataFrame or None, error, seconds)"""
+    start = time.perf_counter()
+    engine = None
+    try:
+        engine = statement_format(file_path)
+        return engine, read_excel_file(file_path), None, time.perf_counter() - start
+    except Exception as e:
+        return engine, None, e, time.perf_counter() - start
+
+def read_excel_files(directory_path, max_workers=MAX_LOAD_WORKERS, start=None, end=None, periods=None):
+    """Read all Excel files in the directory concurrently and return a list of DataFrames
+
+    With start or end, exports whose period (see export_period) lies outside
+    the range are skipped unread, and only rows in the range's months are
+    kept. The dates of every export read are recorded in periods, if given.
+    """
+    excel_files = find_excel_files(directory_path)
     dataframes = []
     
     print(f"Found {len(excel_files)} Excel files:")
     for file in excel_files:
         print(f"  - {os.path.basename(file)}")
     
-    for file_path in excel_files:
-        try:
-            # Try reading with different engines
-            try:
-                df = pd.read_excel(file_path, engine='xlrd')
-            except:
-                df = pd.read_excel(file_path, engine='openpyxl')
-            
-            # Add source file column
-            df['Source_File'] = os.path.basename(file_path)
+    if is_ranged(start, end):
+        selected = select_exports(excel_files, start, end, periods or {})
+        print(f"📅 {len(excel_files) - len(selected)} exports outside {range_label(start, end)} skipped without loading")
+        excel_files = selected
+    
+    if not excel_files:
+        return dataframes
+    
+    started = time.perf_counter()
+    workers = max(1, min(max_workers, len(excel_files)))
+    # map() keeps results in file order; at most `workers` files are parsed at once
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for file_path, (engine, df, error, seconds) in zip(excel_files, pool.map(load_excel_file, excel_files)):
+            name = os.path.basename(file_path)
+            if error is not None:
+                print(f"Error reading {name} [{engine or 'unknown format'}]: {str(error)}")
+                continue
+            if periods is not None:
+                record_export_period(df, file_path, periods)
+            if is_ranged(start, end):
+                df = filter_to_range(df, start, end)
+                if df.empty:
+                    print(f"Read {name} [{engine}] in {seconds:.2f}s - no rows in range")
+                    continue
             dataframes.append(df)
-            print(f"Successfully read {os.path.basename(file_path)} - {len(df)} rows")
-            
-        except Exception as e:
-            print(f"Error reading {os.path.basename(file_path)}: {str(e)}")
+            print(f"Successfully read {name} [{engine}] - {len(df)} rows in {seconds:.2f}s")
     
+    print(f"Loaded {len(dataframes)}/{len(excel_files)} files in {time.perf_counter() - started:.2f}s using {workers} worker(s)")
+    return dataframes
+
+def read_exports(directory_path, base_directory, start=None, end=None):
+    """read_excel_files with the export periods remembered under base_directory (and updated)"""
+    periods = load_export_periods(base_directory)
+    dataframes = read_excel_files(directory_path, start=start, end=end, periods=periods)
+    save_export_periods(periods, base_directory)
     return dataframes
 
 def identify_date_column(df):
     """Try to identify the date column in the DataFrame"""
-    date_columns = []
+    import pandas as pd
+
+    # Columns the statement reader already parsed as dates
+    date_columns = [col for col in df.columns if pd.api.types.is_datetime64_any_dtype(df[col])]
+    if date_columns:
+        return date_columns
     
     for col in df.columns:
         if any(word in str(col).lower() for word in ['date', 'transaction', 'time', 'posting']):
@@ -47,6 +183,8 @@ def identify_date_column(df):
 
 def consolidate_and_organize_by_month(dataframes):
     """Consolidate DataFrames and organize by month"""
+    import pandas as pd
+
     if not dataframes:
         print("No dataframes to consolidate")
         return {}
@@ -73,8 +211,9 @@ def consolidate_and_organize_by_month(dataframes):
     print(f"Using '{date_col}' as the date column")
     
     try:
-        # Convert to datetime with explicit DD/MM/YY format
-        consolidated_df[date_col] = pd.to_datetime(consolidated_df[date_col], format='%d/%m/%y', dayfirst=True)
+        # Convert to datetime with explicit DD/MM/YY format (the reader has usually done this already)
+        if not pd.api.types.is_datetime64_any_dtype(consolidated_df[date_col]):
+            consolidated_df[date_col] = pd.to_datetime(consolidated_df[date_col], format='%d/%m/%y', dayfirst=True)
         
         # Validate dates - check for any dates that seem incorrect
         current_date = datetime.now()
@@ -104,9 +243,15 @@ def consolidate_and_organize_by_month(dataframes):
         print(f"Error processing dates: {str(e)}")
         return {'all_data': consolidated_df}
 
-def save_monthly_data(monthly_data, base_directory):
-    """Save monthly data to separate Excel files in organized folders"""
-    import os
+def save_monthly_data(monthly_data, base_directory, stage=None, start=None, end=None):
+    """Save monthly data to separate Excel files in organized folders (each written atomically, recorded in stage)
+
+    With start or end, monthly_data holds only the range's months: those
+    partitions are rewritten (or removed if they have no rows left), and the
+    complete file and summary keep their rows for every other month.
+    """
+    import pandas as pd
+
     
     # Create organized folder structure
     monthly_dir = os.path.join(base_directory, "Monthly_Files")
@@ -126,52 +271,99 @@ def save_monthly_data(monthly_data, base_directory):
         filepath = os.path.join(monthly_dir, filename)
         
         try:
-            data.to_excel(filepath, index=False)
+            write_excel(data, filepath, stage, index=False)
             print(f"  Saved {filename}: {len(data)} records")
         except Exception as e:
             print(f"  Error saving {filename}: {str(e)}")
+    if is_ranged(start, end):
+        remove_stale_partitions(monthly_dir, "Statement_", monthly_data, start, end, stage)
     
     # Save complete consolidated file
     if monthly_data:
         all_data = pd.concat(monthly_data.values(), ignore_index=True)
         complete_file = os.path.join(consolidated_dir, "Complete_Consolidated_Statement.xlsx")
-        all_data.to_excel(complete_file, index=False)
+        if is_ranged(start, end) and os.path.exists(complete_file):
+            existing = pd.read_excel(complete_file)
+            existing['Date'] = pd.to_datetime(existing['Date'])
+            all_data = replace_months(existing, all_data, start, end)
+        write_excel(all_data, complete_file, stage, index=False)
         print(f"Saved complete consolidated file: {complete_file}")
         
         # Create a summary file
         summary_data = []
         for month, data in monthly_data.items():
-            total_withdrawals = data['Withdrawal Amt.'].sum()
-            total_deposits = data['Deposit Amt.'].sum()
+            # Summed as integer paise so the totals are exact
+            total_withdrawals = to_paise(data['Withdrawal Amt.']).sum()
+            total_deposits = to_paise(data['Deposit Amt.']).sum()
             summary_data.append({
                 'Month': month,
                 'Total_Records': len(data),
-                'Total_Withdrawals': total_withdrawals,
-                'Total_Deposits': total_deposits,
-                'Net_Amount': total_deposits - total_withdrawals
+                'Total_Withdrawals': to_rupees(total_withdrawals),
+                'Total_Deposits': to_rupees(total_deposits),
+                'Net_Amount': to_rupees(total_deposits - total_withdrawals)
             })
         
         summary_df = pd.DataFrame(summary_data)
         summary_file = os.path.join(consolidated_dir, "Monthly_Summary.xlsx")
-        summary_df.to_excel(summary_file, index=False)
+        if is_ranged(start, end) and os.path.exists(summary_file):
+            existing = pd.read_excel(summary_file, dtype={'Month': str})
+            kept = existing[~existing['Month'].map(lambda month: month_in_range(month, start, end))]
+            summary_df = pd.concat([kept, summary_df], ignore_index=True).sort_values('Month', ignore_index=True)
+        write_excel(summary_df, summary_file, stage, index=False)
         print(f"Saved monthly summary: {summary_file}")
 
+def add_arguments(parser):
+    """Register the consolidation options on an argparse parser"""
+    # Statements live next to this script
+    directory_path = os.path.dirname(os.path.abspath(__file__))
+    parser.add_argument("--input", "-i", default=directory_path, help="Folder with HDFC .xls/.csv exports")
+    parser.add_argument("--output", "-o", default=os.path.join(directory_path, "Organized_Statements"), help="Organized_Statements folder")
+    parser.add_argument("--resume", action="store_true", help="Skip if the last committed run used the same exports")
+    add_range_arguments(parser, "exports and months")
+
 def main():
-    # Set the directory path
-    directory_path = r"c:\Users\SG2952\Desktop\projects\personal financing\statements\HDFC"
-    base_directory = os.path.join(directory_path, "Organized_Statements")
-    
+    parser = argparse.ArgumentParser(description="Consolidate HDFC exports by month")
+    add_arguments(parser)
+    args = parser.parse_args()
+    run_consolidation(args.input, args.output, args.resume, args.start, args.end)
+
+def run_consolidation(directory_path, base_directory, resume=False, start=None, end=None):
+    """Consolidate the exports in directory_path into base_directory
+
+    The output tree is locked for the whole run and the files written are
+    committed to its manifest at the end. With resume, nothing is done if
+    the committed outputs were made from the same exports. With start or
+    end, only the exports and month files of that range are touched.
+    """
     print("=== HDFC Statement Consolidation ===")
     print(f"Reading files from: {directory_path}")
     print(f"Output directory: {base_directory}")
     print()
     
+    tree = OutputTree(base_directory)
+    with tree.locked():
+        inputs = export_fingerprints(directory_path)
+        if resume and tree.is_committed(CONSOLIDATE_STAGE, inputs):
+            print("⏭️  Consolidation already committed for these exports - skipping")
+            return
+        if is_ranged(start, end):
+            stage = tree.range_stage(CONSOLIDATE_STAGE)
+        else:
+            stage = tree.stage(CONSOLIDATE_STAGE, inputs)
+        if consolidate_into(directory_path, base_directory, stage, start, end):
+            stage.commit()
+
+def consolidate_into(directory_path, base_directory, stage=None, start=None, end=None):
+    """Read, consolidate and save (only the range's months if start or end is given); False if there was nothing to consolidate"""
     # Read all Excel files
-    dataframes = read_excel_files(directory_path)
+    dataframes = read_exports(directory_path, base_directory, start, end)
     
     if not dataframes:
-        print("No Excel files found or readable.")
-        return
+        if is_ranged(start, end):
+            print(f"No transactions from {range_label(start, end)} found in the exports.")
+        else:
+            print("No Excel files found or readable.")
+        return False
     
     # Show sample of first dataframe to understand structure
     print("\nSample data from first file:")
@@ -181,16 +373,20 @@ def main():
     
     # Consolidate and organize by month
     monthly_data = consolidate_and_organize_by_month(dataframes)
+    if is_ranged(start, end) and 'all_data' in monthly_data:
+        print("Dates could not be read, so the month files cannot be updated for a range.")
+        return False
     
     # Save consolidated data
     print(f"\nSaving organized data to: {base_directory}")
-    save_monthly_data(monthly_data, base_directory)
+    save_monthly_data(monthly_data, base_directory, stage, start, end)
     
     print("\n=== CONSOLIDATION COMPLETE ===")
     print("Check the organized folder structure:")
     print("📁 Organized_Statements/")
     print("  📁 Monthly_Files/ (individual monthly Excel files)")
     print("  📁 Consolidated_Files/ (complete data and summaries)")
+    return True
 
 if __name__ == "__main__":
     main()
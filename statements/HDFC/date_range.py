@@ -0,0 +1,133 @@
+"""
+Date Range - the --from/--to scoping shared by the statement scripts.
+
+Outputs are partitioned by calendar month (Statement_2025-01.xlsx,
+Monthly_Categorized_2025-01.xlsx, ...), so a range is applied in whole
+months: a run for 2025-01-15 to 2025-02-10 redoes January and February
+completely and leaves every other month's files as they are.
+
+parse_date_argument and add_range_arguments are also what the SBI scripts,
+pipeline.py and finance.py parse --from/--to with. pandas is imported only
+by the functions that work on dates in frames, so parsing the command line
+does not load it.
+"""
+
+import argparse
+import os
+import re
+from datetime import datetime, timedelta
+
+# Month partitions are named <prefix>YYYY-MM.xlsx
+PARTITION_PATTERN = re.compile(r'^(?P<prefix>.*?)(?P<month>\d{4}-\d{2})\.xlsx$')
+
+
+def parse_date_argument(value, end_of_month=False):
+    """YYYY-MM-DD, or YYYY-MM meaning the first (or last) day of that month"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        pass
+    try:
+        first = datetime.strptime(value, '%Y-%m').date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD or YYYY-MM, got {value!r}")
+    if not end_of_month:
+        return first
+    next_month = (first.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return next_month - timedelta(days=1)
+
+
+def add_range_arguments(parser, what="transactions", whole_months=True):
+    """Register --from/--to (stored as args.start and args.end) on an argparse parser
+
+    whole_months only changes the help: ranges over month partitions are
+    applied in whole months, ones over statement periods to the day.
+    """
+    if whole_months:
+        from_help = f"Only {what} from this month on (YYYY-MM[-DD]; whole months are processed)"
+        to_help = f"Only {what} up to this month (YYYY-MM[-DD])"
+    else:
+        from_help = f"Only {what} from this day on (YYYY-MM[-DD]; YYYY-MM is the month's first day)"
+        to_help = f"Only {what} up to this day (YYYY-MM[-DD]; YYYY-MM is the month's last day)"
+    parser.add_argument("--from", dest="start", type=parse_date_argument, help=from_help)
+    parser.add_argument("--to", dest="end", type=lambda value: parse_date_argument(value, end_of_month=True),
+                        help=to_help)
+
+
+def is_ranged(start, end):
+    return start is not None or end is not None
+
+
+def month_bounds(start, end):
+    """First and last month of the range as Periods (None for an open end)"""
+    import pandas as pd
+
+    return (pd.Period(start, 'M') if start is not None else None,
+            pd.Period(end, 'M') if end is not None else None)
+
+
+def range_label(start, end):
+    first, last = month_bounds(start, end)
+    return f"{first or 'the start'} to {last or 'the end'}"
+
+
+def month_in_range(month, start, end):
+    """True if a month (a Period or 'YYYY-MM') falls inside the range"""
+    import pandas as pd
+
+    first, last = month_bounds(start, end)
+    month = pd.Period(month, 'M')
+    return (first is None or month >= first) and (last is None or month <= last)
+
+
+def overlaps_range(first_day, last_day, start, end):
+    """True if the dates first_day to last_day share a month with the range"""
+    import pandas as pd
+
+    first, last = month_bounds(start, end)
+    return ((last is None or pd.Period(first_day, 'M') <= last) and
+            (first is None or pd.Period(last_day, 'M') >= first))
+
+
+def in_range(dates, start, end):
+    """Boolean mask of the datetime Series values whose month falls inside the range"""
+    import pandas as pd
+
+    first, last = month_bounds(start, end)
+    months = dates.dt.to_period('M')
+    mask = pd.Series(True, index=dates.index)
+    if first is not None:
+        mask &= months >= first
+    if last is not None:
+        mask &= months <= last
+    return mask.fillna(False)
+
+
+def month_partitions(directory, prefix, start=None, end=None):
+    """{month label: path} of the <prefix>YYYY-MM.xlsx files in a directory whose month is in the range"""
+    if not os.path.isdir(directory):
+        return {}
+    partitions = {}
+    for name in sorted(os.listdir(directory)):
+        match = PARTITION_PATTERN.match(name)
+        if match and match['prefix'] == prefix and month_in_range(match['month'], start, end):
+            partitions[match['month']] = os.path.join(directory, name)
+    return partitions
+
+
+def replace_months(existing, rows, start, end, date_column='Date'):
+    """existing with its rows in the range's months swapped for rows, in date order"""
+    import pandas as pd
+
+    kept = existing[~in_range(existing[date_column], start, end)]
+    return pd.concat([kept, rows], ignore_index=True).sort_values(date_column, kind='stable', ignore_index=True)
+
+
+def remove_stale_partitions(directory, prefix, months, start, end, stage=None):
+    """Delete the range's month partitions that are not in months (the range no longer has rows there)"""
+    for month, path in month_partitions(directory, prefix, start, end).items():
+        if month not in months:
+            os.remove(path)
+            print(f"  Removed {os.path.basename(path)}: no transactions left")
+            if stage is not None:
+                stage.forget(path)
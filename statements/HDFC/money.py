@@ -0,0 +1,43 @@
+# Amounts are held as int64 paise so sums are exact; rupees only appear in
+# printed output and in the Excel files
+PAISE_PER_RUPEE = 100
+PAISE_SUFFIX = '_Paise'
+
+
+def to_paise(amounts):
+    """Rupee amounts (numbers or numeric strings) as int64 paise; blanks become 0"""
+    import pandas as pd
+
+    rupees = pd.to_numeric(amounts, errors='coerce')
+    return (rupees * PAISE_PER_RUPEE).round().fillna(0).astype('int64')
+
+
+def to_rupees(paise):
+    """Paise (an int or a Series) as rupees, for display and export only"""
+    return paise / PAISE_PER_RUPEE
+
+
+def format_rupees(paise, decimals=2):
+    """Paise formatted as ₹1,234.56"""
+    return f"₹{to_rupees(paise):,.{decimals}f}"
+
+
+def export_amounts(df):
+    """Copy of df for Excel with every *_Paise column turned back into rupees under its plain name"""
+    paise_columns = {column: column[:-len(PAISE_SUFFIX)] for column in df.columns
+                     if str(column).endswith(PAISE_SUFFIX)}
+    if not paise_columns:
+        return df
+    exported = df.copy()
+    for column in paise_columns:
+        exported[column] = to_rupees(exported[column])
+    return exported.rename(columns=paise_columns)
+
+
+def import_amounts(df, columns):
+    """Replace rupee columns read back from Excel with their *_Paise equivalents"""
+    present = [column for column in columns if column in df.columns]
+    imported = df.copy()
+    for column in present:
+        imported[column] = to_paise(imported[column])
+    return imported.rename(columns={column: column + PAISE_SUFFIX for column in present})
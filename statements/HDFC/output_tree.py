@@ -0,0 +1,287 @@
+"""
+Output Tree - safe writes into a shared output folder such as Organized_Statements.
+
+  - every file is written to a temporary name next to it and renamed into
+    place, so readers see either the old or the new file, never half of one
+  - an advisory lock file per tree lets one run write at a time; a second
+    run waits instead of interleaving its files with the first
+  - a commit manifest (.manifest.json) records, per stage, the inputs the
+    stage was run on and the files it produced (size and modification time)
+
+A stage counts as committed only if its manifest entry matches the current
+inputs and every file it lists is still on disk unchanged. After a crash the
+interrupted stage has no matching entry, so a resumed run redoes it and
+skips the stages before it.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+MANIFEST_FILE = ".manifest.json"
+LOCK_FILE = ".lock"
+# Seconds between attempts to take a lock held by another run
+LOCK_POLL_SECONDS = 0.5
+
+
+def temporary_path(path):
+    """Hidden name next to path that keeps its extension (pandas picks the Excel engine from it)"""
+    directory, name = os.path.split(path)
+    stem, extension = os.path.splitext(name)
+    return os.path.join(directory, f".{stem}.{os.getpid()}-{threading.get_ident()}.tmp{extension}")
+
+
+@contextmanager
+def atomic_path(path):
+    """Yield a temporary path to write; it replaces path only if the block completes"""
+    tmp_path = temporary_path(path)
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def write_excel(frame, path, stage=None, **kwargs):
+    """DataFrame.to_excel through a temporary file, recorded in the stage if one is given"""
+    with atomic_path(path) as tmp_path:
+        frame.to_excel(tmp_path, **kwargs)
+    if stage is not None:
+        stage.record(path)
+
+
+class WorkbookAppender:
+    """Workbooks filled a DataFrame at a time, for output too big to build in memory
+
+    XlsxWriter's constant_memory mode writes each row to a temporary file as
+    soon as the next one starts and stores strings inline, with no shared
+    strings table. The memory used by a workbook therefore does not grow
+    with the rows appended to it. finish() saves a workbook that will get
+    no more rows. close() saves the rest. Each workbook replaces its file
+    atomically and is recorded in the stage. If the block fails, the
+    workbooks not yet finished are not saved.
+    """
+
+    def __init__(self, stage=None):
+        self.stage = stage
+        self.books = {}
+        self.finished = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    def open_book(self, path, columns):
+        try:
+            import xlsxwriter
+        except ImportError:
+            raise ValueError("XlsxWriter is required to write workbooks in chunks; install it with pip install xlsxwriter")
+        tmp_path = temporary_path(path)
+        # Narrations are written as text even when they start with '=' or look like a URL
+        book = xlsxwriter.Workbook(tmp_path, {'constant_memory': True, 'strings_to_formulas': False,
+                                              'strings_to_urls': False})
+        sheet = book.add_worksheet('Sheet1')
+        # The format pandas' to_excel gives datetimes, so both writers' files look alike
+        date_format = book.add_format({'num_format': 'yyyy-mm-dd hh:mm:ss'})
+        sheet.write_row(0, 0, [str(column) for column in columns])
+        self.books[path] = {'book': book, 'sheet': sheet, 'tmp_path': tmp_path, 'row': 1, 'date_format': date_format}
+        return self.books[path]
+
+    def append(self, path, frame):
+        """Append frame's rows to the workbook for path, starting it with a header row"""
+        import pandas as pd
+
+        if path in self.finished:
+            raise ValueError(f"{os.path.basename(path)} was already finished; rows must arrive in order")
+        entry = self.books.get(path) or self.open_book(path, frame.columns)
+        sheet = entry['sheet']
+        formats = [entry['date_format'] if pd.api.types.is_datetime64_any_dtype(dtype) else None
+                   for dtype in frame.dtypes]
+        # Excel has no NaN or Period; write blanks and the period's label
+        cells = frame.astype(object).where(frame.notna(), None)
+        row_number = entry['row']
+        for row in cells.itertuples(index=False, name=None):
+            for column, value in enumerate(row):
+                if value is None:
+                    continue
+                if isinstance(value, pd.Period):
+                    value = str(value)
+                sheet.write(row_number, column, value, formats[column])
+            row_number += 1
+        entry['row'] = row_number
+
+    def finish(self, path):
+        """Save the workbook for path now; appending to it again is an error"""
+        entry = self.books.pop(path)
+        self.finished.add(path)
+        try:
+            entry['book'].close()
+            os.replace(entry['tmp_path'], path)
+        finally:
+            if os.path.exists(entry['tmp_path']):
+                os.remove(entry['tmp_path'])
+        if self.stage is not None:
+            self.stage.record(path)
+
+    def close(self):
+        for path in list(self.books):
+            self.finish(path)
+
+    def discard(self):
+        for entry in self.books.values():
+            # Closing releases the row files; the half-written workbook is then removed
+            try:
+                entry['book'].close()
+            finally:
+                if os.path.exists(entry['tmp_path']):
+                    os.remove(entry['tmp_path'])
+        self.books = {}
+
+
+def file_fingerprint(path):
+    """[size, modification time in ns] of a file, or None if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def lock_file(handle):
+    """Try to take an exclusive lock on an open file; False if another process holds it"""
+    try:
+        if os.name == 'nt':
+            import msvcrt
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return False
+    return True
+
+
+def unlock_file(handle):
+    if os.name == 'nt':
+        import msvcrt
+        handle.seek(0)
+        msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+        fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+class OutputTree:
+    """An output folder with a lock file and a commit manifest"""
+
+    def __init__(self, base_directory):
+        self.base_directory = base_directory
+        self.manifest_path = os.path.join(base_directory, MANIFEST_FILE)
+        # Stages of one run may commit from several threads
+        self.manifest_lock = threading.Lock()
+
+    @contextmanager
+    def locked(self, timeout=None):
+        """Hold the tree's advisory lock, waiting for other runs to finish (up to timeout seconds)"""
+        os.makedirs(self.base_directory, exist_ok=True)
+        handle = open(os.path.join(self.base_directory, LOCK_FILE), 'a+')
+        try:
+            started = time.monotonic()
+            announced = False
+            while not lock_file(handle):
+                if timeout is not None and time.monotonic() - started > timeout:
+                    raise TimeoutError(f"{self.base_directory} is locked by another run")
+                if not announced:
+                    print(f"⏳ Waiting for another run to finish writing {self.base_directory}")
+                    announced = True
+                time.sleep(LOCK_POLL_SECONDS)
+            try:
+                yield self
+            finally:
+                unlock_file(handle)
+        finally:
+            handle.close()
+
+    def manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {'stages': {}}
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def stage(self, name, inputs, patch=False):
+        return Stage(self, name, inputs, patch)
+
+    def committed_inputs(self, name):
+        """The inputs a stage was last committed for, or None"""
+        entry = self.manifest()['stages'].get(name)
+        return entry['inputs'] if entry is not None else None
+
+    def range_stage(self, name):
+        """A patch stage for a --from/--to run
+
+        Only some months are redone, so the stage keeps the inputs of its last
+        full run: a later --resume still redoes everything if those changed.
+        """
+        return Stage(self, name, self.committed_inputs(name), patch=True)
+
+    def is_committed(self, name, inputs):
+        """True if the stage was committed for these inputs and its files are untouched since"""
+        entry = self.manifest()['stages'].get(name)
+        if entry is None or entry['inputs'] != json.loads(json.dumps(inputs)):
+            return False
+        return all(file_fingerprint(os.path.join(self.base_directory, relative)) == fingerprint
+                   for relative, fingerprint in entry['files'].items())
+
+    def commit(self, stage):
+        with self.manifest_lock:
+            manifest = self.manifest()
+            previous = manifest['stages'].get(stage.name)
+            # A patch rewrites some of the stage's files; the rest stay as last committed
+            files = dict(previous['files']) if stage.patch and previous else {}
+            for path in stage.deleted:
+                files.pop(os.path.relpath(path, self.base_directory), None)
+            for path in stage.files:
+                files[os.path.relpath(path, self.base_directory)] = file_fingerprint(path)
+            manifest['stages'][stage.name] = {
+                'committed_at': datetime.now().isoformat(timespec='seconds'),
+                'inputs': stage.inputs,
+                'files': files,
+            }
+            with atomic_path(self.manifest_path) as tmp_path:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(manifest, f, indent=2)
+
+
+class Stage:
+    """Files written by one step of a run, committed to the manifest together"""
+
+    def __init__(self, tree, name, inputs, patch=False):
+        self.tree = tree
+        self.name = name
+        self.inputs = inputs
+        self.patch = patch
+        self.files = []
+        self.deleted = []
+
+    def record(self, path):
+        if path not in self.files:
+            self.files.append(path)
+
+    def forget(self, path):
+        """A file the stage deleted"""
+        if path in self.files:
+            self.files.remove(path)
+        self.deleted.append(path)
+
+    def commit(self):
+        self.tree.commit(self)
@@ -0,0 +1,132 @@
+"""
+Parallel Categorize - rule matching for very large ledgers on every core.
+
+Matching narrations against the rule passes is pure CPU work, so for tens
+of millions of rows one process is the bottleneck. Here the narration
+column is split into contiguous shards that a process pool matches in
+parallel. No DataFrame is pickled in either direction:
+
+  - the narrations are written once into shared memory as one UTF-8 buffer
+    plus an offsets array, and each worker decodes only its own slice
+  - each worker writes the index of the matching pass (see
+    CompiledRules.match_passes) for its rows straight into a shared int32
+    array; only the compiled rules (a small dict) are sent, once per worker
+
+Every shard owns a fixed range of rows, so the merged result does not
+depend on which worker finishes first and equals CompiledRules.apply.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from categorization_rules import CompiledRules
+
+# Below this many narrations starting the pool costs more than it saves
+MIN_PARALLEL_ROWS = 200_000
+# Shards per worker, so a slow shard does not leave the other workers idle
+SHARDS_PER_WORKER = 4
+# Start method for this pool and pipeline.py's: forking while threads hold
+# locks can hang a worker, and Windows only has spawn anyway
+START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+# Rules compiled once per worker process by init_worker
+_worker_rules = None
+
+
+class SharedNarrations:
+    """A narration column in shared memory: UTF-8 bytes, offsets, missing flags and a result array"""
+
+    def __init__(self, narrations):
+        values = narrations.astype(object).to_numpy()
+        missing = pd.isna(values)
+        encoded = [b'' if is_missing else str(value).encode('utf-8') for value, is_missing in zip(values, missing)]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+
+        self.rows = len(encoded)
+        self.segments = {}
+        self._create('text', max(int(offsets[-1]), 1))[:int(offsets[-1])] = b''.join(encoded)
+        self.array('offsets', np.int64, len(offsets), create=True)[:] = offsets
+        self.array('missing', np.bool_, self.rows, create=True)[:] = missing
+        self.array('claimed_by', np.int32, self.rows, create=True)[:] = -1
+
+    def _create(self, name, size):
+        self.segments[name] = shared_memory.SharedMemory(create=True, size=size)
+        return self.segments[name].buf
+
+    def array(self, name, dtype, length, create=False):
+        if create:
+            self._create(name, max(np.dtype(dtype).itemsize * length, 1))
+        return np.ndarray((length,), dtype=dtype, buffer=self.segments[name].buf)
+
+    @property
+    def names(self):
+        """Segment names, all a worker needs to attach"""
+        return {name: segment.name for name, segment in self.segments.items()}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        for segment in self.segments.values():
+            segment.close()
+            segment.unlink()
+        self.segments = {}
+
+
+def init_worker(rules_dict):
+    global _worker_rules
+    _worker_rules = CompiledRules.from_dict(rules_dict)
+
+
+def match_shard(names, rows, first, last):
+    """Match rows first..last-1 of a SharedNarrations and write their pass indices in place"""
+    segments = {name: shared_memory.SharedMemory(name=shm_name) for name, shm_name in names.items()}
+    try:
+        offsets = np.ndarray((rows + 1,), dtype=np.int64, buffer=segments['offsets'].buf)
+        missing = np.ndarray((rows,), dtype=np.bool_, buffer=segments['missing'].buf)
+        claimed_by = np.ndarray((rows,), dtype=np.int32, buffer=segments['claimed_by'].buf)
+
+        base = int(offsets[first])
+        text = bytes(segments['text'].buf[base:int(offsets[last])])
+        bounds = (offsets[first:last + 1] - base).tolist()
+        narrations = pd.Series([None if missing[first + i] else text[bounds[i]:bounds[i + 1]].decode('utf-8')
+                                for i in range(last - first)], dtype=object)
+        claimed_by[first:last] = _worker_rules.match_passes(narrations)
+        # The views must go before the segments can close
+        del offsets, missing, claimed_by
+    finally:
+        for segment in segments.values():
+            segment.close()
+    return last - first
+
+
+def shard_bounds(rows, shards):
+    """(first, last) row ranges splitting rows into at most `shards` contiguous shards"""
+    edges = np.linspace(0, rows, min(shards, rows) + 1).astype(int).tolist()
+    return [(first, last) for first, last in zip(edges, edges[1:]) if last > first]
+
+
+def apply_parallel(rules, narrations, workers=None, min_rows=MIN_PARALLEL_ROWS):
+    """(category, subcategory) Series like rules.apply(narrations), matched in a process pool
+
+    Falls back to rules.apply for one worker or fewer than min_rows narrations.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(narrations) < min_rows:
+        return rules.apply(narrations)
+
+    with SharedNarrations(narrations) as shared, \
+            ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(START_METHOD),
+                                initializer=init_worker, initargs=(rules.to_dict(),)) as pool:
+        futures = [pool.submit(match_shard, shared.names, shared.rows, first, last)
+                   for first, last in shard_bounds(shared.rows, workers * SHARDS_PER_WORKER)]
+        for future in futures:
+            future.result()
+        claimed_by = shared.array('claimed_by', np.int32, shared.rows).copy()
+    return rules.labels(claimed_by, narrations.index)
@@ -2,7 +2,7 @@ import subprocess
 import sys
 import os
 
-def run_script(script_name, description):
+def run_script(script_name, description, extra_args=()):
     """Run a Python script and handle errors"""
     try:
         print(f"\n{'='*50}")
@@ -11,7 +11,8 @@ def run_script(script_name, description):
         
         result = subprocess.run([
             ".\.venv\Scripts\python.exe", 
-            script_name
+            script_name,
+            *extra_args
         ], capture_output=True, text=True, shell=True)
         
         if result.returncode == 0:
@@ -36,14 +37,24 @@ def main():
     print("3. Create organized folder structure")
     print("=" * 60)
     
+    # --resume skips the steps whose outputs were already committed for the same inputs
+    extra_args = ["--resume"] if "--resume" in sys.argv[1:] else []
+    # --from/--to YYYY-MM[-DD] limit both steps to those months
+    argv = sys.argv[1:]
+    for option in ("--from", "--to"):
+        if option in argv[:-1]:
+            extra_args += [option, argv[argv.index(option) + 1]]
+    
     # Step 1: Consolidate statements
-    if not run_script("consolidate_statements.py", "Statement Consolidation"):
+    if not run_script("consolidate_statements.py", "Statement Consolidation", extra_args):
         print("\n❌ Consolidation failed. Please check the error messages above.")
+        print("💡 Run again with --resume to continue from the last committed step.")
         return
     
     # Step 2: Categorize transactions
-    if not run_script("categorize_transactions.py", "Transaction Categorization"):
+    if not run_script("categorize_transactions.py", "Transaction Categorization", extra_args):
         print("\n❌ Categorization failed. Please check the error messages above.")
+        print("💡 Run again with --resume to continue from the last committed step.")
         return
     
     print("\n" + "="*60)
@@ -0,0 +1,486 @@
+import csv
+import itertools
+import re
+import warnings
+from datetime import datetime
+
+# Leading bytes of each Excel container and the pandas engine that reads it
+EXCEL_SIGNATURES = {
+    b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1': 'xlrd',   # OLE2 compound file (.xls)
+    b'PK\x03\x04': 'openpyxl',                         # Zip container (.xlsx)
+}
+
+# Delimited-text exports (NetBanking's "Delimited" download), read with the C CSV parser
+DELIMITED_EXTENSIONS = ('.csv', '.txt')
+DELIMITERS = (',', '\t', ';', '|')
+# Delimited exports name some columns differently; they are renamed to the Excel export's names
+CANONICAL_COLUMNS = {
+    'narration': 'Narration',
+    'value dat': 'Value Dt',
+    'value date': 'Value Dt',
+    'debit amount': 'Withdrawal Amt.',
+    'credit amount': 'Deposit Amt.',
+    'chq/ref number': 'Chq./Ref.No.',
+    'chq./ref.no.': 'Chq./Ref.No.',
+}
+# Columns left blank in the Excel export when they do not apply, but 0.00 in delimited text
+BLANK_WHEN_ZERO = ('Withdrawal Amt.', 'Deposit Amt.')
+
+# Full-history exports start with a bank banner (address, account details,
+# statement period) before the column header
+HEADER_SCAN_ROWS = 50
+# Data rows used to work out the date format of each date column
+SCHEMA_SAMPLE_ROWS = 20
+CHUNK_ROWS = 5000
+# openpyxl releases whose private row parser iter_xlsx_rows has been checked against
+XLSX_ROW_PARSER_VERSIONS = ('3.1.',)
+
+AMOUNT_KEYWORDS = ('withdrawal', 'deposit', 'debit', 'credit', 'balance', 'amount', 'amt')
+DATE_FORMATS = ('%d/%m/%y', '%d/%m/%Y', '%d-%m-%Y', '%d-%b-%Y', '%Y-%m-%d')
+# First cell of the summary block that follows the transactions
+FOOTER_MARKERS = ('statement summary',)
+# Banner line giving the period an export covers, e.g. "Statement From : 01/04/2024  To : 31/03/2025"
+PERIOD_PATTERN = re.compile(r'from\s*:?\s*(\d{1,2}/\d{1,2}/\d{2,4})\s*to\s*:?\s*(\d{1,2}/\d{1,2}/\d{2,4})', re.IGNORECASE)
+
+
+class StatementSchema:
+    """Header position and column types of one export"""
+
+    def __init__(self, header_row, columns, kinds, date_formats):
+        self.header_row = header_row
+        self.columns = columns
+        # column -> 'date', 'amount' or 'text'
+        self.kinds = kinds
+        # date column -> strptime format, 'datetime' for real date cells, or None
+        self.date_formats = date_formats
+
+    @property
+    def date_column(self):
+        """The transaction date: the first date column whose samples parsed"""
+        for column in self.columns:
+            if self.kinds[column] == 'date' and self.date_formats.get(column):
+                return column
+        return None
+
+
+def sniff_excel_engine(file_path):
+    """Pick the pandas engine for an Excel file from its magic bytes"""
+    with open(file_path, 'rb') as f:
+        header = f.read(8)
+    for signature, engine in EXCEL_SIGNATURES.items():
+        if header.startswith(signature):
+            return engine
+    raise ValueError(f"not an Excel workbook (starts with {header[:4]!r})")
+
+
+def statement_format(file_path):
+    """'xlrd' or 'openpyxl' for a workbook (from its magic bytes), 'csv' for a delimited-text export"""
+    try:
+        return sniff_excel_engine(file_path)
+    except ValueError:
+        if file_path.lower().endswith(DELIMITED_EXTENSIONS):
+            return 'csv'
+        raise
+
+
+def open_delimited(file_path):
+    return open(file_path, 'r', newline='', encoding='utf-8-sig', errors='replace')
+
+
+def find_delimited_header(file_path):
+    """(header line index, delimiter, fields in the header line) of a delimited-text export, from its first lines"""
+    with open_delimited(file_path) as f:
+        lines = list(itertools.islice(f, HEADER_SCAN_ROWS))
+    for index, line in enumerate(lines):
+        for delimiter in DELIMITERS:
+            if delimiter not in line:
+                continue
+            row = next(csv.reader([line], delimiter=delimiter))
+            if is_header_row(row):
+                return index, delimiter, len(row)
+    raise ValueError(f"no header row in the first {HEADER_SCAN_ROWS} lines")
+
+
+def iter_sheet_rows(file_path):
+    """Yield the first sheet's rows (or a delimited export's lines) as lists without loading the file into pandas"""
+    engine = statement_format(file_path)
+    if engine == 'csv':
+        _, delimiter, _ = find_delimited_header(file_path)
+        with open_delimited(file_path) as f:
+            for row in csv.reader(f, delimiter=delimiter):
+                yield row
+    elif engine == 'xlrd':
+        import xlrd
+
+        # on_demand only loads the sheet that is asked for
+        book = xlrd.open_workbook(file_path, on_demand=True)
+        try:
+            sheet = book.sheet_by_index(0)
+            for i in range(sheet.nrows):
+                values = sheet.row_values(i)
+                for j, cell_type in enumerate(sheet.row_types(i)):
+                    if cell_type == xlrd.XL_CELL_DATE:
+                        values[j] = xlrd.xldate.xldate_as_datetime(values[j], book.datemode)
+                yield values
+            book.unload_sheet(0)
+        finally:
+            book.release_resources()
+    else:
+        yield from iter_xlsx_rows(file_path)
+
+
+def iter_xlsx_rows(file_path):
+    """Yield the first sheet's rows of an .xlsx workbook as lists
+
+    openpyxl's read-only iter_rows clears each parsed row but leaves it
+    attached to <sheetData>, so its memory grows by about 80 bytes a row.
+    On the openpyxl releases in XLSX_ROW_PARSER_VERSIONS, openpyxl's own row
+    parser (shared strings, date styles) reads each <row> element, which is
+    then dropped from the tree. That parser is not public API, so any other
+    release (or a parser that no longer fits) falls back to iter_rows.
+    """
+    from openpyxl import load_workbook
+
+    # read_only streams rows from the zip instead of building the whole sheet
+    book = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = book.worksheets[0]
+        parsed = iter_xlsx_row_elements(book, sheet)
+        if parsed is None:
+            for row in sheet.iter_rows(values_only=True):
+                yield list(row)
+        else:
+            yield from parsed
+    finally:
+        book.close()
+
+
+def iter_xlsx_row_elements(book, sheet):
+    """Generator of a read-only sheet's rows through openpyxl's row parser, or None where it cannot be used"""
+    import openpyxl
+
+    if not openpyxl.__version__.startswith(XLSX_ROW_PARSER_VERSIONS):
+        return None
+    try:
+        from openpyxl.worksheet._reader import ROW_TAG, WorkSheetParser
+
+        get_source, shared_strings = sheet._get_source, sheet._shared_strings
+        formats = {'date_formats': book._date_formats, 'timedelta_formats': book._timedelta_formats}
+    except (ImportError, AttributeError):
+        return None
+    source = get_source()
+    try:
+        parser = WorkSheetParser(source, shared_strings, data_only=True, epoch=book.epoch, **formats)
+    except TypeError:
+        source.close()
+        return None
+    return parse_xlsx_rows(source, parser, ROW_TAG, sheet.max_column or 0)
+
+
+def parse_xlsx_rows(source, parser, row_tag, width):
+    """Yield the rows of a sheet's XML, dropping each <row> element once it is parsed"""
+    from xml.etree.ElementTree import iterparse
+
+    with source:
+        next_row = 1
+        parents = []
+        for event, element in iterparse(source, events=('start', 'end')):
+            if event == 'start':
+                parents.append(element)
+                continue
+            parents.pop()
+            if element.tag != row_tag:
+                continue
+            index, cells = parser.parse_row(element)
+            parents[-1].remove(element)
+            values = [None] * max(width, max((cell['column'] for cell in cells), default=0))
+            for cell in cells:
+                values[cell['column'] - 1] = cell['value']
+            # Rows with no cells are missing from the file
+            for _ in range(next_row, index):
+                yield [None] * width
+            next_row = index + 1
+            yield values
+
+
+def is_empty(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def is_footer_row(row):
+    """The summary block after the last transaction"""
+    first = next((cell for cell in row if not is_empty(cell)), None)
+    return isinstance(first, str) and first.strip().lower().startswith(FOOTER_MARKERS)
+
+
+def column_kind(name):
+    """Classify a header cell as a date, amount or text column"""
+    name = name.lower()
+    if 'date' in name or name.endswith(' dt'):
+        return 'date'
+    if any(keyword in name for keyword in AMOUNT_KEYWORDS):
+        return 'amount'
+    return 'text'
+
+
+def is_header_row(row):
+    """The header names a date column and at least one amount column"""
+    names = [cell.strip().lower() for cell in row if isinstance(cell, str)]
+    return (any(column_kind(name) == 'date' for name in names) and
+            any(column_kind(name) == 'amount' for name in names))
+
+
+def parses_as(value, fmt):
+    try:
+        datetime.strptime(str(value).strip(), fmt)
+        return True
+    except ValueError:
+        return False
+
+
+def detect_date_format(samples):
+    """Format matching the most samples, 'datetime' for date cells, None if nothing parses"""
+    samples = [value for value in samples if not is_empty(value)]
+    if any(isinstance(value, datetime) for value in samples):
+        return 'datetime'
+    # Separator rows (*****) can sit among the samples, so pick the best
+    # match rather than requiring every sample to parse
+    best_format, best_count = None, 0
+    for fmt in DATE_FORMATS:
+        count = sum(parses_as(value, fmt) for value in samples)
+        if count > best_count:
+            best_format, best_count = fmt, count
+    return best_format
+
+
+def canonical_column(name):
+    """The Excel export's name for a column (delimited exports use different ones)"""
+    return CANONICAL_COLUMNS.get(name.lower(), name)
+
+
+def find_header(rows):
+    """Consume rows up to and including the header; return (header row index, column names)"""
+    for index, row in enumerate(itertools.islice(rows, HEADER_SCAN_ROWS)):
+        if is_header_row(row):
+            # Drop trailing unnamed columns (formatting bleed past the table)
+            width = max(i for i, cell in enumerate(row) if not is_empty(cell)) + 1
+            columns = [canonical_column(str(cell).strip()) if not is_empty(cell) else f"Unnamed: {i}"
+                       for i, cell in enumerate(row[:width])]
+            return index, columns
+    raise ValueError(f"no header row in the first {HEADER_SCAN_ROWS} rows")
+
+
+def detect_schema(header_row, columns, sample_rows):
+    """Work out column types from the header names and the first data rows"""
+    kinds = {column: column_kind(column) if not column.startswith("Unnamed: ") else 'text'
+             for column in columns}
+    date_formats = {}
+    for i, column in enumerate(columns):
+        if kinds[column] == 'date':
+            date_formats[column] = detect_date_format(row[i] if i < len(row) else None
+                                                      for row in sample_rows)
+    return StatementSchema(header_row, columns, kinds, date_formats)
+
+
+def parse_banner_date(value):
+    for fmt in ('%d/%m/%Y', '%d/%m/%y'):
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            pass
+    return None
+
+
+def read_statement_period(file_path):
+    """(first day, last day) an export covers from the banner above its header, or None
+
+    Only the rows up to the header are read, so exports outside a --from/--to
+    range can be skipped without loading their transactions.
+    """
+    rows = iter_sheet_rows(file_path)
+    try:
+        for row in itertools.islice(rows, HEADER_SCAN_ROWS):
+            if is_header_row(row):
+                break
+            text = ' '.join(str(cell) for cell in row if not is_empty(cell))
+            match = PERIOD_PATTERN.search(text)
+            if match:
+                first, last = (parse_banner_date(value) for value in match.groups())
+                if first and last:
+                    return first, last
+    finally:
+        rows.close()
+    return None
+
+
+def read_schema(file_path):
+    """Find the header row and column types of an export from its first rows"""
+    rows = iter_sheet_rows(file_path)
+    try:
+        header_row, columns = find_header(rows)
+        return detect_schema(header_row, columns, list(itertools.islice(rows, SCHEMA_SAMPLE_ROWS)))
+    finally:
+        rows.close()
+
+
+def convert_column(values, kind, date_format):
+    """Turn one column of raw cell values into a typed Series"""
+    import pandas as pd
+
+    values = pd.Series(values, dtype=object)
+    if kind == 'date':
+        if date_format and date_format != 'datetime':
+            return pd.to_datetime(values.where(values.map(lambda v: isinstance(v, str))).str.strip(),
+                                  format=date_format, errors='coerce')
+        return pd.to_datetime(values.where(values.map(lambda v: isinstance(v, datetime))), errors='coerce')
+    if kind == 'amount':
+        return pd.to_numeric(values.astype(str).str.replace(',', '', regex=False).str.strip(), errors='coerce')
+    return values.where(~values.map(is_empty))
+
+
+def rows_to_frame(rows, schema):
+    """Build a typed DataFrame from raw rows, dropping rows without a transaction date"""
+    import pandas as pd
+
+    width = len(schema.columns)
+    padded = [(row + [None] * width)[:width] for row in rows]
+    frame = pd.DataFrame({
+        column: convert_column([row[i] for row in padded], schema.kinds[column],
+                               schema.date_formats.get(column))
+        for i, column in enumerate(schema.columns)
+    })
+    # Separator (*****) and blank rows have no parsable date
+    return frame[frame[schema.date_column].notna()].reset_index(drop=True)
+
+
+def iter_statement_chunks(file_path, chunk_rows=CHUNK_ROWS):
+    """Yield (schema, typed DataFrame) chunks of at most chunk_rows transactions"""
+    rows = iter_sheet_rows(file_path)
+    try:
+        header_row, columns = find_header(rows)
+        sample = list(itertools.islice(rows, SCHEMA_SAMPLE_ROWS))
+        schema = detect_schema(header_row, columns, sample)
+        if schema.date_column is None:
+            raise ValueError("could not recognise the dates in any date column")
+
+        chunk = []
+        for row in itertools.chain(sample, rows):
+            if is_footer_row(row):
+                break
+            chunk.append(row)
+            if len(chunk) == chunk_rows:
+                yield schema, rows_to_frame(chunk, schema)
+                chunk = []
+        if chunk:
+            yield schema, rows_to_frame(chunk, schema)
+    finally:
+        rows.close()
+
+
+def iter_workbook_chunks(file_path, chunk_rows=CHUNK_ROWS):
+    """Yield DataFrames of at most chunk_rows rows from a plain workbook whose first row is the header
+
+    For the workbooks these scripts write themselves (no banner or footer),
+    streamed so that only one chunk is in memory at a time.
+    """
+    import pandas as pd
+
+    rows = iter_sheet_rows(file_path)
+    try:
+        columns = next(rows, None)
+        if columns is None:
+            return
+        while True:
+            chunk = list(itertools.islice(rows, chunk_rows))
+            if not chunk:
+                break
+            yield pd.DataFrame.from_records(chunk, columns=columns).infer_objects()
+    finally:
+        rows.close()
+
+
+def convert_delimited_column(values, kind, date_format):
+    """Vectorized conversion of one column of a delimited export read as strings"""
+    import pandas as pd
+
+    values = values.str.strip()
+    if kind == 'date':
+        return pd.to_datetime(values, format=date_format, errors='coerce')
+    if kind == 'amount':
+        return pd.to_numeric(values.str.replace(',', '', regex=False), errors='coerce')
+    return values.where(values != '')
+
+
+def check_field_counts(raw, columns, header_row, caught, delimiter):
+    """Raise ValueError if any line had more fields than the header
+
+    Such a line (a narration with an unquoted delimiter, say) would either be
+    dropped by the parser or have its amounts shifted into the wrong columns,
+    so the export is rejected like an unreadable workbook instead.
+    """
+    skipped = sorted(int(line) for warning in caught
+                     for line in re.findall(r'Skipping line (\d+)', str(warning.message)))
+    extra = raw[raw.columns[len(columns):]].fillna('').ne('').any(axis=1).to_numpy().nonzero()[0]
+    lines = []
+    for position in extra:
+        # Rows follow the header line by line (blank lines included), less the lines the parser skipped
+        line = header_row + 2 + position
+        for skipped_line in skipped:
+            line += skipped_line <= line
+        lines.append(int(line))
+    lines = sorted(lines + skipped)
+    if lines:
+        shown = ', '.join(map(str, lines[:5])) + (', ...' if len(lines) > 5 else '')
+        raise ValueError(f"{len(lines)} line(s) have more fields than the header (line {shown}) - "
+                         f"is there an unquoted {delimiter!r} in a narration?")
+
+
+def read_delimited_statement(file_path):
+    """Read a delimited-text export with the C parser into the same typed frame as an Excel export
+
+    The banner above the header is skipped, every column is read as a string
+    (no per-column type inference) and then converted with the format found
+    in the first rows, %d/%m/%y for HDFC.
+    """
+    import pandas as pd
+
+    header_row, delimiter, width = find_delimited_header(file_path)
+    lines = iter_sheet_rows(file_path)
+    try:
+        rows = itertools.islice(lines, header_row, None)
+        _, columns = find_header(rows)
+        schema = detect_schema(header_row, columns, list(itertools.islice(rows, SCHEMA_SAMPLE_ROWS)))
+    finally:
+        lines.close()
+    if schema.date_column is None or schema.date_formats[schema.date_column] == 'datetime':
+        raise ValueError("could not recognise the dates in any date column")
+
+    # Lines may end in a delimiter, so one field more than the header is read; it must be empty
+    names = columns + [f"Unnamed: {i}" for i in range(len(columns), width + 1)]
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always', pd.errors.ParserWarning)
+        raw = pd.read_csv(file_path, sep=delimiter, skiprows=header_row + 1, header=None, names=names,
+                          index_col=False, dtype=str, engine='c', keep_default_na=False, skip_blank_lines=False,
+                          encoding='utf-8-sig', encoding_errors='replace', on_bad_lines='warn')
+    check_field_counts(raw, columns, header_row, caught, delimiter)
+    frame = pd.DataFrame({
+        column: convert_delimited_column(raw[column], schema.kinds[column], schema.date_formats.get(column))
+        for column in columns
+    })
+    for column in BLANK_WHEN_ZERO:
+        if column in frame:
+            frame[column] = frame[column].mask(frame[column] == 0)
+    # Separator, blank and summary rows have no parsable date
+    return frame[frame[schema.date_column].notna()].reset_index(drop=True)
+
+
+def read_statement(file_path, chunk_rows=CHUNK_ROWS):
+    """Read a whole export (through the C CSV parser for delimited text, else the streaming reader) into one typed DataFrame"""
+    import pandas as pd
+
+    if statement_format(file_path) == 'csv':
+        return read_delimited_statement(file_path)
+    frames = [frame for _, frame in iter_statement_chunks(file_path, chunk_rows)]
+    if not frames:
+        return pd.DataFrame(columns=read_schema(file_path).columns)
+    return pd.concat(frames, ignore_index=True)
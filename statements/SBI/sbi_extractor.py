@@ -5,18 +5,31 @@ Extracts transactions from SBI bank statement PDFs and organizes output in folde
 """
 
 import os
-import re
-import pandas as pd
-import fitz  # PyMuPDF
 from datetime import datetime
 import glob
 import argparse
 import sys
 from pathlib import Path
 
+from sbi_parsing import PAISE_PER_RUPEE, capture_raw_transactions, convert_raw_transactions, new_raw_buffers
+from sbi_keyring import PASSPHRASE_VARIABLE, load_keyring
+from sbi_reconciliation import print_reconciliation, reconcile_balances
+from sbi_statement_index import build_index, select_statements
+# sbi_statement_index imported statement_paths, which put HDFC/ (where date_range lives) on the path
+from date_range import add_range_arguments
+
+# pandas and PyMuPDF are imported where they are used, so --help, a bad
+# input path or a missing password fail fast without the heavy imports
+
 class SBITransactionExtractor:
-    def __init__(self, output_dir="extracted_transactions"):
-        self.transactions = []
+    def __init__(self, output_dir="extracted_transactions", keyring=None):
+        self._transactions = []
+        # Candidate passwords per file family, used when no password is given (see sbi_keyring)
+        self.keyring = keyring
+        # Column buffers filled by parse_sbi_transactions (see sbi_parsing)
+        self.raw_transactions = new_raw_buffers()
+        # Rows whose balance change fits neither a debit nor a credit
+        self.balance_breaks = []
         self.output_dir = Path(output_dir)
         self.failed_files = []
         
@@ -32,13 +45,32 @@ class SBITransactionExtractor:
         
         print(f"📁 Output directory created: {self.output_dir.absolute()}")
     
-    def extract_text_with_password(self, pdf_path, password):
+    def authenticate(self, doc, pdf_path, password):
+        """Unlock an open PDF with the given password, or with the keyring's candidates for its file family"""
+        if password or self.keyring is None:
+            return bool(doc.authenticate(password or ""))
+        
+        opened = False
+        changed = False
+        with self.keyring.lock:
+            for candidate in self.keyring.candidates_for(pdf_path):
+                opened = bool(doc.authenticate(candidate))
+                changed |= self.keyring.record(pdf_path, candidate, opened)
+                if opened:
+                    break
+            if changed:
+                self.keyring.save()
+        return opened
+    
+    def extract_text_with_password(self, pdf_path, password=None):
         """Extract text from password-protected PDF"""
+        import fitz  # PyMuPDF
+        
         try:
             doc = fitz.open(pdf_path)
             
             if doc.is_encrypted:
-                if not doc.authenticate(password):
+                if not self.authenticate(doc, pdf_path, password):
                     print(f"  ❌ Wrong password for {os.path.basename(pdf_path)}")
                     doc.close()
                     return None
@@ -55,100 +87,24 @@ class SBITransactionExtractor:
             print(f"  ❌ Error: {e}")
             return None
     
+    @property
+    def transactions(self):
+        """Parsed transactions; statements captured since the last access are converted in one batch"""
+        if self.raw_transactions['text']:
+            batch, breaks = reconcile_balances(convert_raw_transactions(self.raw_transactions))
+            print_reconciliation(batch, breaks)
+            self._transactions.extend(batch.to_dict('records'))
+            self.balance_breaks.extend(breaks.to_dict('records'))
+            self.raw_transactions = new_raw_buffers()
+        return self._transactions
+    
     def parse_sbi_transactions(self, text, filename):
-        """Parse SBI transactions from text"""
-        lines = text.split('\n')
-        transactions_found = 0
-        
-        for i, line in enumerate(lines):
-            line = line.strip()
-            
-            # Match SBI transaction format: DD-MM-YY at start
-            date_match = re.match(r'^(\d{2}-\d{2}-\d{2})', line)
-            if date_match:
-                date_str = date_match.group(1)
-                
-                # Convert YY to YYYY
-                day, month, year = date_str.split('-')
-                year_int = int(year)
-                if year_int <= 30:
-                    full_year = 2000 + year_int
-                else:
-                    full_year = 1900 + year_int
-                
-                try:
-                    transaction_date = datetime(full_year, int(month), int(day))
-                except ValueError:
-                    continue
-                
-                # Collect transaction lines
-                transaction_parts = []
-                j = i
-                while j < len(lines) and j < i + 6:
-                    current_line = lines[j].strip()
-                    if current_line:
-                        transaction_parts.append(current_line)
-                    j += 1
-                    
-                    # Check for complete transaction
-                    combined_text = ' '.join(transaction_parts)
-                    amounts = re.findall(r'\b(\d{1,3}(?:,\d{3})*\.\d{2})\b', combined_text)
-                    
-                    if len(amounts) >= 2:
-                        if j < len(lines) and re.match(r'^\d{2}-\d{2}-\d{2}', lines[j].strip()):
-                            break
-                        elif len(amounts) >= 3:
-                            break
-                
-                # Process the transaction
-                combined_transaction = ' '.join(transaction_parts)
-                amounts = re.findall(r'\b(\d{1,3}(?:,\d{3})*\.\d{2})\b', combined_transaction)
-                
-                if len(amounts) >= 2:
-                    balance = float(amounts[-1].replace(',', ''))
-                    
-                    # Find transaction amount
-                    transaction_amount = 0.0
-                    for amount in amounts[:-1]:
-                        amt_val = float(amount.replace(',', ''))
-                        if amt_val > 0:
-                            transaction_amount = amt_val
-                            break
-                    
-                    # Extract description
-                    description = combined_transaction
-                    description = re.sub(r'^\d{2}-\d{2}-\d{2}', '', description)
-                    for amt in amounts:
-                        description = description.replace(amt, '')
-                    description = re.sub(r'-+', ' ', description)
-                    description = re.sub(r'\s+', ' ', description).strip()
-                    
-                    # Determine transaction type
-                    if '/DR/' in combined_transaction:
-                        transaction_type = 'Debit'
-                    elif '/CR/' in combined_transaction:
-                        transaction_type = 'Credit'
-                    elif any(keyword in description.upper() for keyword in ['SALARY', 'DIVIDEND', 'INTEREST', 'DEPOSIT', 'CREDIT']):
-                        transaction_type = 'Credit'
-                    else:
-                        transaction_type = 'Debit'
-                    
-                    if transaction_amount > 0:
-                        transaction = {
-                            'Date': transaction_date,
-                            'Description': description,
-                            'Type': transaction_type,
-                            'Amount': transaction_amount,
-                            'Balance': balance,
-                            'Source_File': filename
-                        }
-                        
-                        self.transactions.append(transaction)
-                        transactions_found += 1
-        
-        return transactions_found
+        """Capture SBI transactions from text; they are converted when self.transactions is read"""
+        captured = len(self.raw_transactions['text'])
+        capture_raw_transactions(text, filename, self.raw_transactions)
+        return len(self.raw_transactions['text']) - captured
     
-    def process_single_pdf(self, pdf_path, password):
+    def process_single_pdf(self, pdf_path, password=None):
         """Process a single PDF file"""
         filename = os.path.basename(pdf_path)
         print(f"📄 Processing: {filename}")
@@ -171,22 +127,48 @@ class SBITransactionExtractor:
         
         return transactions_found
     
-    def export_to_excel(self):
-        """Export transactions to Excel with organized structure"""
+    def saved_transactions(self, main_excel):
+        """Rows of an earlier export's main workbook, with dates and paise like self.transactions"""
+        import pandas as pd
+        
+        saved = pd.read_excel(main_excel, sheet_name='All_Transactions')
+        saved['Date'] = pd.to_datetime(saved['Date'], format='%d/%m/%Y')
+        saved['Amount_Paise'] = (saved['Amount'] * PAISE_PER_RUPEE).round().astype('int64')
+        saved['Balance_Paise'] = (saved['Balance'] * PAISE_PER_RUPEE).round().astype('int64')
+        return saved.drop(columns=['Amount', 'Balance'])
+    
+    def export_to_excel(self, merge_existing=False):
+        """Export transactions to Excel with organized structure
+        
+        With merge_existing (a --from/--to run), the statements processed now
+        replace their rows in the existing workbook and the rest are kept;
+        only the year files of the processed statements are rewritten.
+        """
+        import pandas as pd
+        
         if not self.transactions:
             print("❌ No transactions found to export!")
             return None
         
         # Create DataFrame
         df = pd.DataFrame(self.transactions)
-        df = df.sort_values('Date')
+        years = df['Date'].dt.year.unique()
+        main_excel = self.output_dir / "excel_files" / "SBI_All_Transactions.xlsx"
+        if merge_existing and main_excel.exists():
+            saved = self.saved_transactions(main_excel)
+            saved = saved[~saved['Source_File'].isin(set(df['Source_File']))]
+            print(f"📎 Keeping {len(saved)} transactions of other statements from {main_excel.name}")
+            df = pd.concat([saved, df], ignore_index=True)
+        df = df.sort_values('Date', kind='stable')
         
         # Format date column
         df['Date_Display'] = df['Date'].dt.strftime('%d/%m/%Y')
         
-        # Create main Excel file
-        main_excel = self.output_dir / "excel_files" / "SBI_All_Transactions.xlsx"
+        # Amounts are kept in paise; the workbook shows rupees
+        df['Amount'] = df['Amount_Paise'] / PAISE_PER_RUPEE
+        df['Balance'] = df['Balance_Paise'] / PAISE_PER_RUPEE
         
+        # Create main Excel file
         with pd.ExcelWriter(main_excel, engine='openpyxl') as writer:
             # Main transactions sheet
             export_df = df[['Date_Display', 'Description', 'Type', 'Amount', 'Balance', 'Source_File']].copy()
@@ -197,15 +179,19 @@ class SBITransactionExtractor:
             df_monthly = df.copy()
             df_monthly['Month'] = df_monthly['Date'].dt.to_period('M')
             monthly_summary = df_monthly.groupby(['Month', 'Type']).agg({
-                'Amount': ['sum', 'count']
-            }).round(2)
+                'Amount_Paise': ['sum', 'count']
+            })
+            monthly_summary[('Amount_Paise', 'sum')] /= PAISE_PER_RUPEE
+            monthly_summary = monthly_summary.rename(columns={'Amount_Paise': 'Amount'})
             monthly_summary.to_excel(writer, sheet_name='Monthly_Summary')
             
             # File Summary
             file_summary = df.groupby('Source_File').agg({
-                'Amount': ['count', 'sum'],
+                'Amount_Paise': ['count', 'sum'],
                 'Type': lambda x: f"Credits: {sum(x == 'Credit')}, Debits: {sum(x == 'Debit')}"
-            }).round(2)
+            })
+            file_summary[('Amount_Paise', 'sum')] /= PAISE_PER_RUPEE
+            file_summary = file_summary.rename(columns={'Amount_Paise': 'Amount'})
             file_summary.to_excel(writer, sheet_name='File_Summary')
             
             # Format sheets
@@ -223,8 +209,7 @@ class SBITransactionExtractor:
                     adjusted_width = min(max_length + 2, 60)
                     worksheet.column_dimensions[column_letter].width = adjusted_width
         
-        # Create separate files by year
-        years = df['Date'].dt.year.unique()
+        # Create separate files by year (those the processed statements fall in)
         for year in years:
             year_df = df[df['Date'].dt.year == year].copy()
             year_df['Date_Display'] = year_df['Date'].dt.strftime('%d/%m/%Y')
@@ -244,8 +229,9 @@ class SBITransactionExtractor:
         report_file = self.output_dir / "reports" / "summary_report.txt"
         
         # Calculate summary statistics
-        total_credits = sum(t['Amount'] for t in self.transactions if t['Type'] == 'Credit')
-        total_debits = sum(t['Amount'] for t in self.transactions if t['Type'] == 'Debit')
+        # Integer paise, so the totals are exact
+        total_credits = sum(t['Amount_Paise'] for t in self.transactions if t['Type'] == 'Credit') / PAISE_PER_RUPEE
+        total_debits = sum(t['Amount_Paise'] for t in self.transactions if t['Type'] == 'Debit') / PAISE_PER_RUPEE
         credit_count = sum(1 for t in self.transactions if t['Type'] == 'Credit')
         debit_count = sum(1 for t in self.transactions if t['Type'] == 'Debit')
         
@@ -262,9 +248,9 @@ class SBITransactionExtractor:
             
             monthly_data[month_key]['count'] += 1
             if transaction['Type'] == 'Credit':
-                monthly_data[month_key]['credits'] += transaction['Amount']
+                monthly_data[month_key]['credits'] += transaction['Amount_Paise']
             else:
-                monthly_data[month_key]['debits'] += transaction['Amount']
+                monthly_data[month_key]['debits'] += transaction['Amount_Paise']
         
         # Write report
         with open(report_file, 'w', encoding='utf-8') as f:
@@ -285,8 +271,9 @@ class SBITransactionExtractor:
             f.write("-" * 20 + "\n")
             for month in sorted(monthly_data.keys()):
                 data = monthly_data[month]
-                net = data['credits'] - data['debits']
-                f.write(f"{month}: ₹{net:,.2f} (C: ₹{data['credits']:,.2f}, D: ₹{data['debits']:,.2f}, Count: {data['count']})\n")
+                credits = data['credits'] / PAISE_PER_RUPEE
+                debits = data['debits'] / PAISE_PER_RUPEE
+                f.write(f"{month}: ₹{credits - debits:,.2f} (C: ₹{credits:,.2f}, D: ₹{debits:,.2f}, Count: {data['count']})\n")
             
             f.write("\nFILE PROCESSING SUMMARY\n")
             f.write("-" * 25 + "\n")
@@ -297,6 +284,14 @@ class SBITransactionExtractor:
             for filename, count in sorted(file_counts.items()):
                 f.write(f"{filename}: {count} transactions\n")
             
+            if self.balance_breaks:
+                f.write(f"\nBALANCE BREAKS ({len(self.balance_breaks)})\n")
+                f.write("-" * 20 + "\n")
+                for row in self.balance_breaks:
+                    f.write(f"{row['Source_File']}:{row['Line']} {row['Date'].strftime('%d/%m/%Y')} "
+                            f"{row['Type']} ₹{row['Amount_Paise'] / PAISE_PER_RUPEE:,.2f}, balance moved "
+                            f"₹{row['Balance_Change_Paise'] / PAISE_PER_RUPEE:,.2f}: {row['Description']}\n")
+            
             if self.failed_files:
                 f.write(f"\nFAILED FILES ({len(self.failed_files)})\n")
                 f.write("-" * 15 + "\n")
@@ -305,12 +300,13 @@ class SBITransactionExtractor:
         
         return report_file
     
-    def process_all_pdfs(self, directory_path, password):
-        """Process all PDFs in directory"""
-        pdf_files = glob.glob(os.path.join(directory_path, "*.pdf"))
-        
+    def process_all_pdfs(self, directory_path, password=None, start=None, end=None):
+        """Process all PDFs in directory, or only those whose file name puts them in [start, end]"""
+        return self.process_pdfs(find_pdfs(directory_path, start, end), password)
+    
+    def process_pdfs(self, pdf_files, password=None):
+        """Process a list of PDF files; True if any transactions were found"""
         if not pdf_files:
-            print("❌ No PDF files found in the directory!")
             return False
         
         print(f"📁 Found {len(pdf_files)} PDF files to process")
@@ -334,14 +330,40 @@ class SBITransactionExtractor:
         
         return total_transactions > 0
 
-def main():
-    parser = argparse.ArgumentParser(description="Extract transactions from SBI bank statement PDFs")
-    parser.add_argument("--input", "-i", default="statements", help="Input directory containing PDF files (default: statements)")
-    parser.add_argument("--output", "-o", default="extracted_transactions", help="Output directory (default: extracted_transactions)")
-    parser.add_argument("--password", "-p", help="PDF password (will prompt if not provided)")
+def find_pdfs(directory_path, start=None, end=None):
+    """PDFs in a directory, without those whose file name puts them outside [start, end]"""
+    pdf_files = glob.glob(os.path.join(directory_path, "*.pdf"))
     
-    args = parser.parse_args()
+    if not pdf_files:
+        print("❌ No PDF files found in the directory!")
+        return []
     
+    if start or end:
+        # Statements whose names give no period are kept; only the named ones can be ruled out
+        entries, _ = build_index(directory_path)
+        indexed = {entry['path'] for entry in entries}
+        selected = set(select_statements(entries, start, end))
+        skipped = len([path for path in pdf_files if path in indexed and path not in selected])
+        pdf_files = [path for path in pdf_files if path not in indexed or path in selected]
+        print(f"📅 {skipped} statements outside {start or '...'} to {end or '...'} skipped without decrypting")
+        if not pdf_files:
+            print("❌ No statements cover the requested dates!")
+    return pdf_files
+
+def add_arguments(parser, input_dir="statements", output_dir="extracted_transactions"):
+    """Register the extractor options on an argparse parser (defaults relative to this folder unless given)"""
+    parser.add_argument("--input", "-i", default=input_dir, help=f"Input directory containing PDF files (default: {input_dir})")
+    parser.add_argument("--output", "-o", default=output_dir, help=f"Output directory (default: {output_dir})")
+    parser.add_argument("--password", "-p", help="PDF password (will prompt if not provided)")
+    add_range_arguments(parser, "statements covering dates", whole_months=False)
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract transactions from SBI bank statement PDFs")
+    add_arguments(parser)
+    run(parser.parse_args())
+
+def run(args):
+    """Run the extraction for parsed command line arguments"""
     # Print header
     print("🏦 SBI TRANSACTION EXTRACTOR - COMMAND LINE TOOL")
     print("=" * 60)
@@ -360,24 +382,35 @@ def main():
             print(f"💡 Make sure your PDF files are in a 'statements' folder or specify the correct path with --input")
             sys.exit(1)
     
-    # Get password
+    # Get password: --password, else the keyring, else a prompt (only when someone can answer it)
     password = args.password
+    keyring = None
     if not password:
-        password = input("🔐 Enter PDF password: ")
+        try:
+            keyring = load_keyring()
+        except ValueError as e:
+            print(f"❌ Keyring: {e}")
+            sys.exit(1)
+        if keyring is not None:
+            print(f"🔑 Using the keyring ({len(keyring.families)} file families)")
+        elif sys.stdin.isatty():
+            password = input("🔐 Enter PDF password: ")
     
-    if not password:
+    if not password and keyring is None:
         print("❌ Password is required!")
+        print(f"💡 Pass --password, or add passwords with sbi_keyring.py and set ${PASSPHRASE_VARIABLE}")
         sys.exit(1)
     
     # Initialize extractor
-    extractor = SBITransactionExtractor(args.output)
+    extractor = SBITransactionExtractor(args.output, keyring)
     
     # Process all PDFs
-    success = extractor.process_all_pdfs(input_dir, password)
+    success = extractor.process_all_pdfs(input_dir, password, args.start, args.end)
     
     if success:
         print("\n📊 Generating Excel files...")
-        main_excel = extractor.export_to_excel()
+        # A --from/--to run updates the workbook rather than replacing it with the range alone
+        main_excel = extractor.export_to_excel(merge_existing=bool(args.start or args.end))
         
         print("📋 Generating summary report...")
         report_file = extractor.generate_report()
@@ -388,8 +421,8 @@ def main():
         print(f"📋 Summary report: {report_file}")
         
         # Print quick summary
-        total_credits = sum(t['Amount'] for t in extractor.transactions if t['Type'] == 'Credit')
-        total_debits = sum(t['Amount'] for t in extractor.transactions if t['Type'] == 'Debit')
+        total_credits = sum(t['Amount_Paise'] for t in extractor.transactions if t['Type'] == 'Credit') / PAISE_PER_RUPEE
+        total_debits = sum(t['Amount_Paise'] for t in extractor.transactions if t['Type'] == 'Debit') / PAISE_PER_RUPEE
         
         print(f"\n💰 Total Credits: ₹{total_credits:,.2f}")
         print(f"💸 Total Debits: ₹{total_debits:,.2f}")
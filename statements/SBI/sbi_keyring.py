@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+SBI Keyring - encrypted store of statement passwords for unattended runs.
+
+Passwords are kept per file family: the start of the statement file name,
+usually the 11-digit account number. A family can hold several candidate
+passwords (date of birth, account number, ...). The first candidate that
+opens a file is remembered and tried first for the rest of the family, and
+candidates a family has rejected are not tried on it again, so a batch over
+many accounts never prompts and never repeats a known-bad guess.
+
+The keyring is a JSON file encrypted with Fernet (needs the `cryptography`
+package) under a key derived from a passphrase with scrypt. Batch runs read
+the passphrase from $SBI_KEYRING_PASSPHRASE.
+
+Usage:
+    python sbi_keyring.py add 88673015778          # prompts for the password to add
+    python sbi_keyring.py list
+    python sbi_keyring.py forget 88673015778       # drop the remembered password
+    python sbi_keyring.py remove 88673015778
+"""
+
+import argparse
+import base64
+import getpass
+import hashlib
+import json
+import os
+import sys
+import threading
+
+KEYRING_FILE = os.environ.get("SBI_KEYRING_FILE", os.path.join(os.path.expanduser("~"), ".sbi_keyring"))
+PASSPHRASE_VARIABLE = "SBI_KEYRING_PASSPHRASE"
+KEYRING_VERSION = 1
+
+# Family used for files that match no other prefix
+DEFAULT_FAMILY = "*"
+
+# scrypt cost; the parameters are stored with the file so they can be raised later
+SCRYPT_N = 2 ** 15
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+
+def fernet_for(passphrase, salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P):
+    try:
+        from cryptography.fernet import Fernet
+    except ImportError:
+        raise ValueError("the cryptography package is required for the SBI keyring; install it with pip install cryptography")
+    key = hashlib.scrypt(passphrase.encode('utf-8'), salt=salt, n=n, r=r, p=p, maxmem=2 ** 26, dklen=32)
+    return Fernet(base64.urlsafe_b64encode(key))
+
+
+class Keyring:
+    """Candidate passwords per file family, with the one that worked remembered"""
+
+    def __init__(self, path, passphrase, families=None, salt=None, scrypt_params=(SCRYPT_N, SCRYPT_R, SCRYPT_P)):
+        self.path = path
+        # prefix -> {'candidates': [...], 'working': password or None, 'rejected': [...]}
+        self.families = families if families is not None else {}
+        self.salt = salt or os.urandom(16)
+        self.scrypt_params = scrypt_params
+        # Held while trying passwords, so parallel workers do not update the keyring at once
+        self.lock = threading.Lock()
+        # Deriving the key is deliberately slow, so it is done once per keyring
+        self.fernet = fernet_for(passphrase, self.salt, *scrypt_params)
+
+    def __getstate__(self):
+        # Locks cannot be pickled; a copy sent to a worker process gets its own
+        state = dict(self.__dict__)
+        del state['lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path, passphrase):
+        """Open an existing keyring (or start an empty one if the file does not exist)"""
+        if not os.path.exists(path):
+            return cls(path, passphrase)
+        with open(path, 'r', encoding='utf-8') as f:
+            envelope = json.load(f)
+
+        keyring = cls(path, passphrase, None, base64.b64decode(envelope['salt']),
+                      (envelope['n'], envelope['r'], envelope['p']))
+        from cryptography.fernet import InvalidToken
+        try:
+            payload = json.loads(keyring.fernet.decrypt(envelope['token'].encode('ascii')))
+        except InvalidToken:
+            raise ValueError(f"wrong passphrase for {path}")
+        keyring.families = payload['families']
+        return keyring
+
+    def save(self):
+        token = self.fernet.encrypt(json.dumps({'families': self.families}).encode('utf-8'))
+        envelope = {
+            'version': KEYRING_VERSION,
+            'kdf': 'scrypt',
+            'salt': base64.b64encode(self.salt).decode('ascii'),
+            'n': self.scrypt_params[0],
+            'r': self.scrypt_params[1],
+            'p': self.scrypt_params[2],
+            'token': token.decode('ascii'),
+        }
+        tmp_path = self.path + ".tmp"
+        with open(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w', encoding='utf-8') as f:
+            json.dump(envelope, f)
+        os.replace(tmp_path, self.path)
+
+    def add(self, prefix, password):
+        family = self.families.setdefault(prefix, {'candidates': [], 'working': None, 'rejected': []})
+        if password not in family['candidates']:
+            family['candidates'].append(password)
+        if password in family['rejected']:
+            family['rejected'].remove(password)
+
+    def remove(self, prefix):
+        return self.families.pop(prefix, None) is not None
+
+    def forget(self, prefix):
+        """Clear what a family has learned (remembered and rejected passwords)"""
+        family = self.families.get(prefix)
+        if family is None:
+            return False
+        family['working'] = None
+        family['rejected'] = []
+        return True
+
+    def family_for(self, filename):
+        """Longest configured prefix of the file name, else the default family (None if neither)"""
+        name = os.path.basename(filename)
+        matches = [prefix for prefix in self.families if prefix != DEFAULT_FAMILY and name.startswith(prefix)]
+        if matches:
+            return max(matches, key=len)
+        return DEFAULT_FAMILY if DEFAULT_FAMILY in self.families else None
+
+    def candidates_for(self, filename):
+        """Passwords to try for a file: the remembered one first, never ones the family rejected"""
+        prefix = self.family_for(filename)
+        if prefix is None:
+            return []
+        family = self.families[prefix]
+        ordered = [family['working']] if family['working'] else []
+        ordered += family['candidates']
+        if prefix != DEFAULT_FAMILY and DEFAULT_FAMILY in self.families:
+            ordered += self.families[DEFAULT_FAMILY]['candidates']
+        seen = set(family['rejected'])
+        candidates = []
+        for password in ordered:
+            if password not in seen:
+                seen.add(password)
+                candidates.append(password)
+        return candidates
+
+    def record(self, filename, password, worked):
+        """Remember the outcome of trying a password on a file; True if the keyring changed"""
+        prefix = self.family_for(filename)
+        if prefix is None:
+            return False
+        family = self.families[prefix]
+        if worked:
+            if family['working'] == password:
+                return False
+            family['working'] = password
+        else:
+            if password in family['rejected']:
+                return False
+            family['rejected'].append(password)
+            if family['working'] == password:
+                family['working'] = None
+        return True
+
+
+def load_keyring(path=KEYRING_FILE, passphrase=None):
+    """The keyring for unattended runs, or None if there is no keyring file or no passphrase"""
+    passphrase = passphrase or os.environ.get(PASSPHRASE_VARIABLE)
+    if not passphrase or not os.path.exists(path):
+        return None
+    return Keyring.load(path, passphrase)
+
+
+def open_keyring_interactive(path, create=False):
+    """Keyring for the management commands; asks for the passphrase if it is not in the environment"""
+    passphrase = os.environ.get(PASSPHRASE_VARIABLE)
+    if not passphrase:
+        passphrase = getpass.getpass("🔐 Keyring passphrase: ")
+        if create and not os.path.exists(path) and getpass.getpass("🔐 Repeat passphrase: ") != passphrase:
+            print("❌ Passphrases do not match")
+            sys.exit(1)
+    if not os.path.exists(path) and not create:
+        print(f"❌ No keyring at {path} - add a password first")
+        sys.exit(1)
+    return Keyring.load(path, passphrase)
+
+
+def add_arguments(parser):
+    """Register the keyring commands on an argparse parser"""
+    parser.add_argument("--keyring", default=KEYRING_FILE, help=f"Keyring file (default: {KEYRING_FILE})")
+    commands = parser.add_subparsers(dest="action", required=True)
+    add = commands.add_parser("add", help="Add a candidate password for a file family")
+    add.add_argument("prefix", help=f"Start of the statement file names, e.g. the account number ('{DEFAULT_FAMILY}' for any file)")
+    add.add_argument("--password", "-p", help="Password to add (prompted if not given)")
+    for action, text in (("remove", "Delete a file family"), ("forget", "Clear the remembered and rejected passwords")):
+        command = commands.add_parser(action, help=text)
+        command.add_argument("prefix")
+    commands.add_parser("list", help="Show the file families (never the passwords)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the encrypted SBI statement password keyring")
+    add_arguments(parser)
+    run(parser.parse_args())
+
+
+def run(args):
+    """Run a keyring command for parsed command line arguments"""
+    try:
+        keyring = open_keyring_interactive(args.keyring, create=args.action == "add")
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    if args.action == "add":
+        password = args.password or getpass.getpass(f"🔑 Password for {args.prefix}: ")
+        if not password:
+            print("❌ Password is required!")
+            sys.exit(1)
+        keyring.add(args.prefix, password)
+        keyring.save()
+        print(f"✅ {args.prefix}: {len(keyring.families[args.prefix]['candidates'])} candidate password(s)")
+    elif args.action in ("remove", "forget"):
+        changed = keyring.remove(args.prefix) if args.action == "remove" else keyring.forget(args.prefix)
+        if not changed:
+            print(f"⚠️  No family {args.prefix} in the keyring")
+            return
+        keyring.save()
+        print(f"✅ {args.action.capitalize()} {args.prefix}")
+    else:
+        if not keyring.families:
+            print("🔑 The keyring is empty")
+        for prefix, family in sorted(keyring.families.items()):
+            print(f"🔑 {prefix:<14} {len(family['candidates'])} candidate(s), "
+                  f"{'remembered' if family['working'] else 'none remembered'}, {len(family['rejected'])} rejected")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+SBI Parsing - turns the text of an SBI statement PDF into transactions.
+
+Parsing runs in two phases. The line loop only captures strings (date parts,
+the transaction text and the amount tokens) into column buffers; dates,
+amounts and debit/credit types are then converted a whole column at a time
+with pandas, and rows with impossible dates are dropped with a mask.
+"""
+
+import re
+from datetime import datetime
+
+# Transactions start with a DD-MM-YY line
+DATE_LINE = re.compile(r'^(\d{2})-(\d{2})-(\d{2})')
+# 1,234.56 or 22470.94 - SBI prints balances without thousands separators
+AMOUNT_PATTERN = re.compile(r'\b(\d{1,3}(?:,\d{3})+\.\d{2}|\d+\.\d{2})\b')
+# Removed from the transaction text to leave the description
+STRIP_PATTERN = f"{DATE_LINE.pattern}|{AMOUNT_PATTERN.pattern}"
+NONZERO_DIGIT = re.compile(r'[1-9]')
+CREDIT_KEYWORDS = ['SALARY', 'DIVIDEND', 'INTEREST', 'DEPOSIT', 'CREDIT']
+
+# Lines after the date line that can belong to one transaction
+TRANSACTION_WINDOW = 6
+# Two-digit years up to this are 20xx, the rest 19xx
+YEAR_PIVOT = 30
+
+# Amounts are int64 paise; they become rupees only when written to Excel or printed
+PAISE_PER_RUPEE = 100
+# Line is the 1-based line of the extracted PDF text the transaction starts on
+TRANSACTION_COLUMNS = ['Date', 'Description', 'Type', 'Amount_Paise', 'Balance_Paise', 'Source_File', 'Line']
+
+RAW_COLUMNS = ['day', 'month', 'year', 'text', 'amount', 'balance', 'source_file', 'line']
+
+
+def new_raw_buffers():
+    """Empty column buffers for capture_raw_transactions"""
+    return {column: [] for column in RAW_COLUMNS}
+
+
+def capture_raw_transactions(text, filename, raw=None):
+    """Phase one: append date parts, transaction text and amount strings to column buffers"""
+    lines = [line.strip() for line in text.split('\n')]
+    if raw is None:
+        raw = new_raw_buffers()
+
+    for i, line in enumerate(lines):
+        date_match = DATE_LINE.match(line)
+        if not date_match:
+            continue
+
+        # Collect transaction lines until the amounts and balance are in
+        parts = []
+        amounts = []
+        j = i
+        while j < len(lines) and j < i + TRANSACTION_WINDOW:
+            if lines[j]:
+                parts.append(lines[j])
+                amounts.extend(AMOUNT_PATTERN.findall(lines[j]))
+            j += 1
+
+            if len(amounts) >= 2:
+                if j < len(lines) and DATE_LINE.match(lines[j]):
+                    break
+                elif len(amounts) >= 3:
+                    break
+
+        if len(amounts) < 2:
+            continue
+        # The transaction amount is the first non-zero amount before the balance
+        amount = next((a for a in amounts[:-1] if NONZERO_DIGIT.search(a)), None)
+        if amount is None:
+            continue
+
+        day, month, year = date_match.groups()
+        raw['day'].append(day)
+        raw['month'].append(month)
+        raw['year'].append(year)
+        raw['text'].append(' '.join(parts))
+        raw['amount'].append(amount)
+        raw['balance'].append(amounts[-1])
+        raw['source_file'].append(filename)
+        raw['line'].append(i + 1)
+
+    return raw
+
+
+def convert_raw_transactions(raw):
+    """Phase two: convert the column buffers (one or many statements) into a typed DataFrame"""
+    import numpy as np
+    import pandas as pd
+
+    frame = pd.DataFrame(raw, columns=RAW_COLUMNS)
+
+    two_digit_year = pd.to_numeric(frame['year'])
+    century = pd.Series(np.where(two_digit_year <= YEAR_PIVOT, '20', '19'), index=frame.index)
+    dates = pd.to_datetime(frame['day'] + '-' + frame['month'] + '-' + century + frame['year'],
+                           format='%d-%m-%Y', errors='coerce')
+
+    text = frame['text'].astype(object)
+    description = (text.str.replace(STRIP_PATTERN, '', regex=True)
+                       .str.replace(r'[-\s]+', ' ', regex=True)
+                       .str.strip())
+
+    is_debit = text.str.contains('/DR/', regex=False)
+    is_credit = (text.str.contains('/CR/', regex=False) |
+                 description.str.upper().str.contains('|'.join(CREDIT_KEYWORDS)))
+
+    transactions = pd.DataFrame({
+        'Date': dates,
+        'Description': description,
+        'Type': np.where(~is_debit & is_credit, 'Credit', 'Debit'),
+        'Amount_Paise': amount_strings_to_paise(frame['amount']),
+        'Balance_Paise': amount_strings_to_paise(frame['balance']),
+        'Source_File': frame['source_file'],
+        'Line': frame['line'],
+    }, columns=TRANSACTION_COLUMNS)
+
+    # Impossible dates (e.g. 31-02-24) are rejected here rather than per line
+    return transactions[dates.notna()].reset_index(drop=True)
+
+
+def amount_strings_to_paise(amounts):
+    """'1,234.56' -> 123456; every captured amount has exactly two decimals, so this is exact"""
+    return amounts.str.replace(r'[,.]', '', regex=True).astype('int64')
+
+
+def parse_transactions(text, filename):
+    """Parse SBI statement text into a transactions DataFrame"""
+    return convert_raw_transactions(capture_raw_transactions(text, filename))
+
+
+def parse_transactions_per_row(text, filename):
+    """The original single-pass parser, converting each row as it goes (benchmark baseline)"""
+    lines = text.split('\n')
+    transactions = []
+
+    for i, line in enumerate(lines):
+        line = line.strip()
+        date_match = DATE_LINE.match(line)
+        if not date_match:
+            continue
+
+        # Convert YY to YYYY
+        day, month, year = date_match.groups()
+        year_int = int(year)
+        full_year = 2000 + year_int if year_int <= YEAR_PIVOT else 1900 + year_int
+        try:
+            transaction_date = datetime(full_year, int(month), int(day))
+        except ValueError:
+            continue
+
+        transaction_parts = []
+        j = i
+        while j < len(lines) and j < i + TRANSACTION_WINDOW:
+            current_line = lines[j].strip()
+            if current_line:
+                transaction_parts.append(current_line)
+            j += 1
+
+            amounts = AMOUNT_PATTERN.findall(' '.join(transaction_parts))
+            if len(amounts) >= 2:
+                if j < len(lines) and DATE_LINE.match(lines[j].strip()):
+                    break
+                elif len(amounts) >= 3:
+                    break
+
+        combined_transaction = ' '.join(transaction_parts)
+        amounts = AMOUNT_PATTERN.findall(combined_transaction)
+        if len(amounts) < 2:
+            continue
+
+        balance = float(amounts[-1].replace(',', ''))
+        transaction_amount = 0.0
+        for amount in amounts[:-1]:
+            amt_val = float(amount.replace(',', ''))
+            if amt_val > 0:
+                transaction_amount = amt_val
+                break
+
+        description = re.sub(DATE_LINE.pattern, '', combined_transaction)
+        description = AMOUNT_PATTERN.sub('', description)
+        description = re.sub(r'-+', ' ', description)
+        description = re.sub(r'\s+', ' ', description).strip()
+
+        if '/DR/' in combined_transaction:
+            transaction_type = 'Debit'
+        elif '/CR/' in combined_transaction:
+            transaction_type = 'Credit'
+        elif any(keyword in description.upper() for keyword in CREDIT_KEYWORDS):
+            transaction_type = 'Credit'
+        else:
+            transaction_type = 'Debit'
+
+        if transaction_amount > 0:
+            transactions.append({
+                'Date': transaction_date,
+                'Description': description,
+                'Type': transaction_type,
+                'Amount': transaction_amount,
+                'Balance': balance,
+                'Source_File': filename,
+            })
+
+    return transactions
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+SBI Reconciliation - checks parsed transactions against the running balance.
+
+Within a statement each row's balance must equal the previous balance plus a
+credit or minus a debit. The check is a handful of array operations over the
+whole batch, so it runs on every extraction. A row whose Debit/Credit guess
+is contradicted by the balance chain, but fits the other way, has its type
+corrected; rows that fit neither way are reported as breaks with their file
+and line.
+"""
+
+from sbi_parsing import PAISE_PER_RUPEE
+
+# Balance_Check values
+CHECK_OPENING = 'opening'      # first row of a statement, nothing to compare with
+CHECK_OK = 'ok'
+CHECK_CORRECTED = 'corrected'  # Type flipped to match the balance chain
+CHECK_BREAK = 'break'          # balance change matches neither a debit nor a credit
+
+BREAK_COLUMNS = ['Source_File', 'Line', 'Date', 'Description', 'Type', 'Amount_Paise',
+                 'Balance_Paise', 'Balance_Change_Paise']
+
+
+def reconcile_balances(transactions):
+    """Check running balances per statement; return (transactions with Type corrected, breaks)
+
+    Rows must be in statement order with each Source_File contiguous, which
+    is how the parser captures them.
+    """
+    import numpy as np
+
+    amounts = transactions['Amount_Paise'].to_numpy()
+    balances = transactions['Balance_Paise'].to_numpy()
+    files = transactions['Source_File'].to_numpy()
+
+    opening = np.ones(len(transactions), dtype=bool)
+    opening[1:] = files[1:] != files[:-1]
+    change = np.zeros(len(transactions), dtype='int64')
+    change[1:] = balances[1:] - balances[:-1]
+
+    fits_credit = ~opening & (change == amounts)
+    fits_debit = ~opening & (change == -amounts)
+    is_credit = transactions['Type'].to_numpy() == 'Credit'
+
+    consistent = opening | np.where(is_credit, fits_credit, fits_debit)
+    corrected = ~consistent & (fits_credit | fits_debit)
+    broken = ~consistent & ~corrected
+
+    reconciled = transactions.copy()
+    reconciled['Type'] = np.where(corrected, np.where(fits_credit, 'Credit', 'Debit'), reconciled['Type'])
+    reconciled['Balance_Check'] = np.select([opening, corrected, broken],
+                                            [CHECK_OPENING, CHECK_CORRECTED, CHECK_BREAK], CHECK_OK)
+
+    breaks = reconciled[broken].assign(Balance_Change_Paise=change[broken])[BREAK_COLUMNS]
+    return reconciled, breaks.reset_index(drop=True)
+
+
+def print_reconciliation(reconciled, breaks, limit=10):
+    """Print the reconciliation outcome and the first few breaks"""
+    checks = reconciled['Balance_Check'].value_counts()
+    print(f"🔎 Balance check: {checks.get(CHECK_OK, 0)} ok, {checks.get(CHECK_CORRECTED, 0)} type corrected, "
+          f"{checks.get(CHECK_BREAK, 0)} breaks ({checks.get(CHECK_OPENING, 0)} statement openings)")
+    for row in breaks.head(limit).itertuples(index=False):
+        print(f"  ⚠️  {row.Source_File}:{row.Line} {row.Date:%d/%m/%Y} ₹{row.Amount_Paise / PAISE_PER_RUPEE:,.2f} {row.Type}, "
+              f"balance moved ₹{row.Balance_Change_Paise / PAISE_PER_RUPEE:,.2f} - {row.Description[:50]}")
+    if len(breaks) > limit:
+        print(f"  ... and {len(breaks) - limit} more")
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+SBI Statement Index - what the statement PDFs cover, from their names alone.
+
+SBI names each statement after the account and the last day of the period
+(8867301577831012025.pdf is account ...5778, month ending 31-01-2025;
+downloading it again adds " (1)"). The index is built from the file names
+and os.stat, so it needs neither the password nor PyMuPDF, and answers
+straight away:
+
+  - which months each account has statements for, and which are missing
+  - which statements cover the same month (re-downloads or overlaps)
+  - which files to decrypt for a date range (sbi_extractor.py --from/--to)
+
+When the extractor workbook exists, the transaction dates it holds for each
+file are checked against the period the file name claims.
+"""
+
+import argparse
+import os
+import re
+import sys
+from datetime import date, datetime
+
+# statement_paths, one folder up, knows where everything lives and puts both bank
+# folders on the path; --from/--to are parsed by HDFC/date_range.py through it
+STATEMENTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if STATEMENTS_DIR not in sys.path:
+    sys.path.append(STATEMENTS_DIR)
+
+import statement_paths
+from date_range import add_range_arguments
+
+# 11-digit account number, period end as DDMMYYYY, optional " (n)" download copy
+FILENAME_PATTERN = re.compile(r'^(\d{11})(\d{2})(\d{2})(\d{4})(?: \((\d+)\))?\.pdf$', re.IGNORECASE)
+
+
+
+def parse_statement_name(filename):
+    """(account, period_start, period_end, copy) for an SBI statement name, or None
+
+    Statements are monthly, so a statement covers the calendar month its
+    period end falls in.
+    """
+    match = FILENAME_PATTERN.match(os.path.basename(filename))
+    if not match:
+        return None
+    account, day, month, year, copy = match.groups()
+    try:
+        period_end = date(int(year), int(month), int(day))
+    except ValueError:
+        return None
+    return account, period_end.replace(day=1), period_end, int(copy or 0)
+
+
+def build_index(pdf_dir):
+    """Index entries for every SBI statement PDF in a folder, plus the names that did not parse"""
+    entries = []
+    unrecognized = []
+    with os.scandir(pdf_dir) as scan:
+        for item in scan:
+            if not item.is_file() or not item.name.lower().endswith('.pdf'):
+                continue
+            parsed = parse_statement_name(item.name)
+            if parsed is None:
+                unrecognized.append(item.name)
+                continue
+            account, period_start, period_end, copy = parsed
+            stat = item.stat()
+            entries.append({
+                'file': item.name,
+                'path': item.path,
+                'account': account,
+                'period_start': period_start,
+                'period_end': period_end,
+                'copy': copy,
+                'size': stat.st_size,
+                'modified': datetime.fromtimestamp(stat.st_mtime),
+            })
+    entries.sort(key=lambda entry: (entry['account'], entry['period_end'], entry['copy']))
+    return entries, sorted(unrecognized)
+
+
+def month_key(day):
+    return day.year * 12 + day.month - 1
+
+
+def month_label(key):
+    return date(key // 12, key % 12 + 1, 1).strftime('%b %Y')
+
+
+def month_ranges(keys):
+    """Sorted month keys collapsed into 'Jan 2021 - Mar 2021' style ranges"""
+    ranges = []
+    for key in keys:
+        if ranges and ranges[-1][1] == key - 1:
+            ranges[-1][1] = key
+        else:
+            ranges.append([key, key])
+    return [month_label(first) if first == last else f"{month_label(first)} - {month_label(last)}"
+            for first, last in ranges]
+
+
+def coverage(entries):
+    """Per account: first and last month, months covered, missing months and overlapping files"""
+    accounts = {}
+    for entry in entries:
+        account = accounts.setdefault(entry['account'], {'files': [], 'months': {}})
+        account['files'].append(entry)
+        account['months'].setdefault(month_key(entry['period_end']), []).append(entry)
+
+    report = {}
+    for number, account in accounts.items():
+        keys = sorted(account['months'])
+        overlaps = []
+        for key in keys:
+            files = account['months'][key]
+            if len(files) > 1:
+                same = len({entry['size'] for entry in files}) == 1
+                overlaps.append((month_label(key), [entry['file'] for entry in files],
+                                 'identical copies' if same else 'different files'))
+        report[number] = {
+            'files': len(account['files']),
+            'first': keys[0],
+            'last': keys[-1],
+            'covered': len(keys),
+            'missing': [key for key in range(keys[0], keys[-1] + 1) if key not in account['months']],
+            'overlaps': overlaps,
+        }
+    return report
+
+
+def select_statements(entries, start=None, end=None):
+    """Paths of the statements whose period overlaps [start, end] (dates; either may be None)"""
+    return [entry['path'] for entry in entries
+            if (start is None or entry['period_end'] >= start) and (end is None or entry['period_start'] <= end)]
+
+
+def check_extracted(entries, excel_file):
+    """Compare the extractor workbook with the index; return (not extracted, outside period) lists"""
+    import pandas as pd
+
+    extracted = pd.read_excel(excel_file, sheet_name='All_Transactions', usecols=['Date', 'Source_File'])
+    extracted['Date'] = pd.to_datetime(extracted['Date'], format='%d/%m/%Y', errors='coerce')
+    spans = extracted.groupby('Source_File')['Date'].agg(['min', 'max'])
+
+    not_extracted = []
+    outside = []
+    for entry in entries:
+        if entry['file'] not in spans.index:
+            not_extracted.append(entry['file'])
+            continue
+        first, last = spans.loc[entry['file']]
+        if first.date() < entry['period_start'] or last.date() > entry['period_end']:
+            outside.append((entry['file'], first.date(), last.date()))
+    return not_extracted, outside
+
+
+def print_coverage(report, unrecognized):
+    for number, account in report.items():
+        print(f"🏦 Account ...{number[-4:]}: {account['files']} files, "
+              f"{month_label(account['first'])} to {month_label(account['last'])}, "
+              f"{account['covered']} months covered")
+        if account['missing']:
+            print(f"  ❓ Missing {len(account['missing'])} months: {', '.join(month_ranges(account['missing']))}")
+        for month, files, kind in account['overlaps']:
+            print(f"  🔁 {month}: {len(files)} {kind} - {', '.join(files)}")
+    for name in unrecognized:
+        print(f"⚠️  Not an SBI statement name: {name}")
+
+
+def add_arguments(parser):
+    """Register the index options on an argparse parser"""
+    parser.add_argument("--input", "-i", default=statement_paths.SBI_PDF_DIR, help="Folder with SBI PDF statements")
+    parser.add_argument("--excel", default=statement_paths.SBI_EXCEL_FILE, help="Extractor workbook to cross-check (if present)")
+    add_range_arguments(parser, "statements covering dates", whole_months=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show which months the SBI statement PDFs cover, from their file names")
+    add_arguments(parser)
+    run(parser.parse_args())
+
+
+def run(args):
+    """Print coverage (and the statements for a date range) for parsed command line arguments"""
+    if not os.path.isdir(args.input):
+        print(f"❌ Input directory does not exist: {args.input}")
+        sys.exit(1)
+
+    entries, unrecognized = build_index(args.input)
+    if not entries:
+        print("📄 No SBI statement PDFs found")
+        return
+    print_coverage(coverage(entries), unrecognized)
+
+    if args.start or args.end:
+        selected = select_statements(entries, args.start, args.end)
+        print(f"\n📅 {len(selected)} statements cover {args.start or 'the start'} to {args.end or 'the end'}:")
+        for path in selected:
+            print(f"  {os.path.basename(path)}")
+
+    if os.path.exists(args.excel):
+        not_extracted, outside = check_extracted(entries, args.excel)
+        print(f"\n🔎 Extraction check against {os.path.basename(args.excel)}:")
+        if not_extracted:
+            print(f"  📭 {len(not_extracted)} statements have no extracted transactions: {', '.join(not_extracted)}")
+        for name, first, last in outside:
+            print(f"  ⚠️  {name}: transactions from {first:%d/%m/%Y} to {last:%d/%m/%Y} fall outside its month")
+        if not not_extracted and not outside:
+            print("  ✅ Every statement's transactions fall inside its month")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Anomalies - flags unusual spends and duplicate charges as statements arrive.
+
+Rolling statistics per category and per counterparty (count, mean and
+variance of the log amount, and the typical day of the month) are kept in a
+small JSON state file next to the ledger. Each batch of new debits is scored
+against that state and then merged into it with the parallel mean/variance
+update, so history is never rescanned.
+
+Flags:
+  unusual amount  - far above what is usually paid to the counterparty
+                    (or within the category while the counterparty is new)
+  off schedule    - a counterparty normally paid on a fixed day of the month
+                    was paid on a very different day
+  duplicate       - same counterparty and amount again within a day
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import statement_paths
+from counterparties import normalize_counterparties
+from money import PAISE_PER_RUPEE, export_amounts, format_rupees, import_amounts
+from transfers import TRANSFER_CATEGORY
+
+STATE_FILE = "anomaly_state.json"
+ANOMALIES_FILE = "Anomalies.xlsx"
+STATE_VERSION = 1
+
+# Each statistic is [count, mean, m2, sum cos(day), sum sin(day)] of the log rupee amount
+STAT_FIELDS = ['Count', 'Mean', 'M2', 'Day_Cos', 'Day_Sin']
+
+# History needed before a key is scored
+MIN_HISTORY = 5
+# Standard deviations above the mean (in log amount) that count as unusual
+Z_THRESHOLD = 3.0
+# Floor for the log-amount standard deviation, so fixed-price payments can move ~10% quietly
+MIN_STD = 0.1
+# Small spends are never flagged as unusual
+MIN_FLAG_PAISE = 500 * PAISE_PER_RUPEE
+# Day-of-month concentration (0-1) above which a counterparty is on a fixed schedule
+SCHEDULE_CONCENTRATION = 0.9
+SCHEDULE_TOLERANCE_DAYS = 5
+# Repeats of small amounts (tea, parking, card checks) are routine
+DUPLICATE_WINDOW_DAYS = 1
+MIN_DUPLICATE_PAISE = 200 * PAISE_PER_RUPEE
+
+ANOMALY_COLUMNS = ['Date', 'Account', 'Description', 'Counterparty', 'Category', 'Amount_Paise', 'Reason', 'Detail']
+
+REASON_AMOUNT = 'unusual amount'
+REASON_SCHEDULE = 'off schedule'
+REASON_DUPLICATE = 'duplicate'
+
+
+def empty_state():
+    return {'version': STATE_VERSION, 'categories': {}, 'counterparties': {}, 'recent': []}
+
+
+def load_state(output_dir=statement_paths.UNIFIED_OUTPUT_DIR):
+    """Rolling statistics saved by the last run, or an empty state"""
+    path = os.path.join(output_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return empty_state()
+    with open(path, 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    return state if state.get('version') == STATE_VERSION else empty_state()
+
+
+def save_state(state, output_dir=statement_paths.UNIFIED_OUTPUT_DIR):
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, STATE_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def stats_frame(stats):
+    """State dict {key: [count, mean, ...]} as a DataFrame indexed by key"""
+    import pandas as pd
+
+    return pd.DataFrame.from_dict(stats, orient='index', columns=STAT_FIELDS, dtype=float)
+
+
+def prepare_debits(rows):
+    """Debits of a ledger batch (other than own-account transfers) with their counterparty, log amount and day angle"""
+    import numpy as np
+    import pandas as pd
+
+    debits = rows[(rows['Type'] == 'Debit') & (rows['Amount_Paise'] > 0) & (rows['Category'] != TRANSFER_CATEGORY)]
+    day_angle = 2 * np.pi * (debits['Date'].dt.day - 1) / 31
+    return pd.DataFrame({
+        'Date': debits['Date'],
+        'Account': debits['Account'],
+        'Description': debits['Description'],
+        'Counterparty': normalize_counterparties(debits['Description']),
+        'Category': debits['Category'].fillna('Uncategorized'),
+        'Amount_Paise': debits['Amount_Paise'],
+        'Log_Amount': np.log(debits['Amount_Paise'] / PAISE_PER_RUPEE),
+        'Day_Cos': np.cos(day_angle),
+        'Day_Sin': np.sin(day_angle),
+    })
+
+
+def batch_stats(debits, key):
+    """Per-key statistics of one batch, in the state's layout"""
+    import pandas as pd
+
+    debits = debits[debits[key] != '']
+    groups = debits.groupby(key)
+    stats = pd.DataFrame({
+        'Count': groups.size(),
+        'Mean': groups['Log_Amount'].mean(),
+        'M2': groups['Log_Amount'].var(ddof=0) * groups.size(),
+        'Day_Cos': groups['Day_Cos'].sum(),
+        'Day_Sin': groups['Day_Sin'].sum(),
+    })
+    return stats.astype(float)
+
+
+def combine_stats(a, b):
+    """Combine two aligned frames of statistics (Chan et al. parallel variance)"""
+    import pandas as pd
+
+    count = a['Count'] + b['Count']
+    delta = b['Mean'] - a['Mean']
+    share = (b['Count'] / count).fillna(0.0)
+    return pd.DataFrame({
+        'Count': count,
+        'Mean': a['Mean'] + delta * share,
+        'M2': a['M2'] + b['M2'] + delta ** 2 * a['Count'] * share,
+        'Day_Cos': a['Day_Cos'] + b['Day_Cos'],
+        'Day_Sin': a['Day_Sin'] + b['Day_Sin'],
+    }, index=a.index)
+
+
+def merge_stats(old, new):
+    """Fold one set of per-key statistics into another"""
+    keys = old.index.union(new.index)
+    return combine_stats(old.reindex(keys, fill_value=0.0), new.reindex(keys, fill_value=0.0))
+
+
+def prior_stats(debits, key, stats):
+    """Statistics each debit is judged against: the saved state plus earlier debits of the batch"""
+    import pandas as pd
+
+    known = stats.reindex(debits[key]).fillna(0.0)
+    known.index = debits.index
+
+    groups = debits.assign(Square=debits['Log_Amount'] ** 2).groupby(key, sort=False)
+    count = groups.cumcount().astype(float)
+    total = groups['Log_Amount'].cumsum() - debits['Log_Amount']
+    squares = groups['Square'].cumsum() - debits['Log_Amount'] ** 2
+    mean = (total / count).fillna(0.0)
+    earlier = pd.DataFrame({
+        'Count': count,
+        'Mean': mean,
+        'M2': (squares - total * mean).clip(lower=0.0),
+        'Day_Cos': groups['Day_Cos'].cumsum() - debits['Day_Cos'],
+        'Day_Sin': groups['Day_Sin'].cumsum() - debits['Day_Sin'],
+    })
+    prior = combine_stats(known, earlier)
+    prior.loc[debits[key] == '', 'Count'] = 0.0
+    return prior
+
+
+def typical_day(stats):
+    """Typical day of the month and how concentrated payments are around it (0-1)"""
+    import numpy as np
+
+    angle = np.arctan2(stats['Day_Sin'], stats['Day_Cos']) % (2 * np.pi)
+    concentration = np.hypot(stats['Day_Sin'], stats['Day_Cos']) / stats['Count'].where(stats['Count'] > 0)
+    return np.round(angle * 31 / (2 * np.pi)) % 31 + 1, concentration
+
+
+def z_scores(debits, prior):
+    """Standard deviations of each log amount above its prior mean (NaN with too little history)"""
+    import numpy as np
+
+    std = np.sqrt(prior['M2'] / (prior['Count'] - 1).clip(lower=1)).clip(lower=MIN_STD)
+    return ((debits['Log_Amount'] - prior['Mean']) / std).where(prior['Count'] >= MIN_HISTORY)
+
+
+def find_duplicates(debits, recent):
+    """Debits repeating a counterparty and amount within DUPLICATE_WINDOW_DAYS of an earlier one"""
+    import pandas as pd
+
+    earlier = pd.DataFrame(recent, columns=['Date', 'Counterparty', 'Amount_Paise'])
+    earlier['Date'] = pd.to_datetime(earlier['Date'])
+    candidates = pd.concat([earlier.assign(New=False),
+                            debits[['Date', 'Counterparty', 'Amount_Paise']].assign(New=True)])
+    candidates = candidates[(candidates['Counterparty'] != '') & (candidates['Amount_Paise'] >= MIN_DUPLICATE_PAISE)]
+    candidates = candidates.sort_values(['Counterparty', 'Amount_Paise', 'Date'], kind='stable')
+
+    previous = candidates.groupby(['Counterparty', 'Amount_Paise'], sort=False)['Date'].shift()
+    gap = (candidates['Date'] - previous).dt.days
+    repeated = candidates['New'] & (gap <= DUPLICATE_WINDOW_DAYS)
+    return gap[repeated]
+
+
+def score_batch(debits, state):
+    """Anomalies among a date-ordered batch of new debits
+
+    Each debit is judged against the saved state plus the debits before it in
+    the batch, exactly as if the batch had arrived one row at a time.
+    """
+    import numpy as np
+    import pandas as pd
+
+    payee = prior_stats(debits, 'Counterparty', stats_frame(state['counterparties']))
+    category = prior_stats(debits, 'Category', stats_frame(state['categories']))
+    flags = []
+
+    # Judge against the counterparty once it has history, the category until then
+    payee_z = z_scores(debits, payee)
+    use_payee = payee_z.notna()
+    z = payee_z.where(use_payee, z_scores(debits, category))
+    unusual = (z >= Z_THRESHOLD) & (debits['Amount_Paise'] >= MIN_FLAG_PAISE)
+    usual = np.exp(payee['Mean'].where(use_payee, category['Mean']))
+    flags.append(debits[unusual].assign(
+        Reason=REASON_AMOUNT,
+        Detail=[f"{score:.1f} sd above the usual ₹{amount:,.0f} for this {'counterparty' if by_payee else 'category'}"
+                for score, amount, by_payee in zip(z[unusual], usual[unusual], use_payee[unusual])],
+    ))
+
+    usual_day, concentration = typical_day(payee)
+    distance = (debits['Date'].dt.day - usual_day).abs()
+    distance = np.minimum(distance, 31 - distance)
+    off_schedule = ((payee['Count'] >= MIN_HISTORY) & (concentration >= SCHEDULE_CONCENTRATION) &
+                    (distance > SCHEDULE_TOLERANCE_DAYS))
+    flags.append(debits[off_schedule].assign(
+        Reason=REASON_SCHEDULE,
+        Detail=[f"usually paid around day {int(day)}" for day in usual_day[off_schedule]],
+    ))
+
+    gaps = find_duplicates(debits, state['recent'])
+    flags.append(debits.loc[gaps.index].assign(
+        Reason=REASON_DUPLICATE,
+        Detail=[f"same amount {int(gap)} day(s) earlier" for gap in gaps],
+    ))
+
+    anomalies = pd.concat([flag for flag in flags if len(flag)] or [pd.DataFrame(columns=ANOMALY_COLUMNS)])
+    return anomalies[ANOMALY_COLUMNS].sort_values('Date', kind='stable').reset_index(drop=True)
+
+
+def update_state(state, debits):
+    """Fold a batch of debits into the rolling statistics"""
+    import pandas as pd
+
+    for name, key in (('counterparties', 'Counterparty'), ('categories', 'Category')):
+        merged = merge_stats(stats_frame(state[name]), batch_stats(debits, key))
+        state[name] = {index: [float(value) for value in row] for index, row in zip(merged.index, merged.to_numpy())}
+
+    # Only debits close to the newest date can still have a duplicate arrive
+    recent = pd.DataFrame(state['recent'], columns=['Date', 'Counterparty', 'Amount_Paise'])
+    recent['Date'] = pd.to_datetime(recent['Date'])
+    recent = pd.concat([recent, debits[['Date', 'Counterparty', 'Amount_Paise']]])
+    if len(recent):
+        recent = recent[recent['Date'] >= recent['Date'].max() - pd.Timedelta(days=DUPLICATE_WINDOW_DAYS)]
+    state['recent'] = [[date.strftime('%Y-%m-%d'), counterparty, int(amount)]
+                       for date, counterparty, amount in recent.itertuples(index=False)]
+    return state
+
+
+def process_new_rows(rows, output_dir=statement_paths.UNIFIED_OUTPUT_DIR):
+    """Score newly ingested ledger rows, update the saved state and record any anomalies"""
+    state = load_state(output_dir)
+    debits = prepare_debits(rows.sort_values('Date', kind='stable'))
+    if debits.empty:
+        return debits.iloc[0:0]
+
+    anomalies = score_batch(debits, state)
+    save_state(update_state(state, debits), output_dir)
+    if len(anomalies):
+        append_anomalies(anomalies, output_dir)
+        print_anomalies(anomalies)
+    return anomalies
+
+
+def rebuild_state(ledger, output_dir=statement_paths.UNIFIED_OUTPUT_DIR):
+    """Recompute the state from a whole ledger (after a full rebuild); nothing is flagged"""
+    state = update_state(empty_state(), prepare_debits(ledger))
+    save_state(state, output_dir)
+    return state
+
+
+def append_anomalies(anomalies, output_dir=statement_paths.UNIFIED_OUTPUT_DIR):
+    import pandas as pd
+
+    path = os.path.join(output_dir, ANOMALIES_FILE)
+    if os.path.exists(path):
+        previous = import_amounts(pd.read_excel(path), ['Amount'])
+        previous['Date'] = pd.to_datetime(previous['Date'])
+        anomalies = pd.concat([previous, anomalies], ignore_index=True)
+    export_amounts(anomalies).to_excel(path, index=False)
+    return path
+
+
+def print_anomalies(anomalies, limit=20):
+    icons = {REASON_AMOUNT: '💥', REASON_SCHEDULE: '📆', REASON_DUPLICATE: '👯'}
+    print(f"🚨 {len(anomalies)} anomalies")
+    for row in anomalies.head(limit).itertuples(index=False):
+        print(f"  {icons.get(row.Reason, '⚠️ ')} {row.Date:%d/%m/%Y} {format_rupees(row.Amount_Paise):>12} "
+              f"{row.Reason}: {row.Detail} - {str(row.Description)[:40]}")
+    if len(anomalies) > limit:
+        print(f"  ... and {len(anomalies) - limit} more")
+
+
+def add_arguments(parser):
+    """Register the anomaly options on an argparse parser"""
+    parser.add_argument("--ledger", default=statement_paths.UNIFIED_OUTPUT_DIR, help="Unified ledger directory")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute the rolling statistics from the saved ledger")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show anomalies flagged in newly ingested transactions")
+    add_arguments(parser)
+    run(parser.parse_args())
+
+
+def run(args):
+    """Print recorded anomalies, or rebuild the statistics, for parsed command line arguments"""
+    import pandas as pd
+
+    if args.rebuild:
+        from unified_ledger import load_ledger
+
+        ledger = load_ledger(args.ledger)
+        if ledger is None:
+            print("❌ No unified ledger found - run 'finance.py report' first.")
+            sys.exit(1)
+        state = rebuild_state(ledger, args.ledger)
+        print(f"✅ Rolling statistics rebuilt: {len(state['counterparties'])} counterparties, "
+              f"{len(state['categories'])} categories")
+        return
+
+    path = os.path.join(args.ledger, ANOMALIES_FILE)
+    if not os.path.exists(path):
+        print("✅ No anomalies recorded.")
+        return
+    anomalies = import_amounts(pd.read_excel(path), ['Amount'])
+    anomalies['Date'] = pd.to_datetime(anomalies['Date'])
+    print_anomalies(anomalies.sort_values('Date', ascending=False, kind='stable'))
+
+
+if __name__ == "__main__":
+    main()
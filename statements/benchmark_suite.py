@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite - timing checks for the statement tools.
+
+Usage:
+    python benchmark_suite.py            # run every benchmark
+    python benchmark_suite.py startup    # run selected benchmarks
+    python benchmark_suite.py sbi_parse --repeat 10
+"""
+
+import argparse
+import glob
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import statement_paths
+
+FINANCE_CLI = os.path.join(statement_paths.STATEMENTS_DIR, "finance.py")
+SBI_DEBUG_DIR = os.path.join(statement_paths.SBI_OUTPUT_DIR, "debug_files")
+
+# Run in a fresh interpreter per mode so each peak RSS is its own. On Linux
+# ru_maxrss survives fork and exec, so it would report this process's peak
+# if that were higher; VmHWM belongs to the new interpreter alone (both in KB)
+CATEGORIZE_PEAK_SCRIPT = """
+import resource, sys, time
+from categorization_rules import load_rules
+from categorize_transactions import categorize_into
+start = time.perf_counter()
+categorize_into(sys.argv[1], load_rules(), chunk_size=int(sys.argv[2]) or None)
+try:
+    with open('/proc/self/status') as f:
+        peak_kb = next(int(line.split()[1]) for line in f if line.startswith('VmHWM:'))
+except OSError:
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(time.perf_counter() - start, peak_kb)
+"""
+
+
+def parse_importtime(stderr):
+    """Total import time in microseconds from `python -X importtime` output"""
+    total_us = 0
+    modules = set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.add(name.strip())
+        # Only top-level imports; nested ones are already in their parent's cumulative time
+        if not name[1:].startswith(" "):
+            total_us += int(cumulative)
+    return total_us, modules
+
+
+def time_python(args, repeat):
+    """Run a python command `repeat` times; return median wall ms, median import ms, imported modules"""
+    wall_ms = []
+    import_ms = []
+    modules = set()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-X", "importtime", *args],
+                                capture_output=True, text=True, cwd=statement_paths.STATEMENTS_DIR)
+        wall_ms.append((time.perf_counter() - start) * 1000)
+        if result.returncode != 0:
+            return None, None, set()
+        total_us, modules = parse_importtime(result.stderr)
+        import_ms.append(total_us / 1000)
+    return statistics.median(wall_ms), statistics.median(import_ms), modules
+
+
+def bench_startup(repeat):
+    """CLI startup per subcommand, measured with -X importtime"""
+    sys.path.insert(0, statement_paths.STATEMENTS_DIR)
+    from finance import SUBCOMMAND_IMPORTS
+
+    print(f"{'Command':<24}{'Wall (ms)':>12}{'Imports (ms)':>15}  Heavy modules")
+    print("-" * 72)
+
+    wall, imports, modules = time_python([FINANCE_CLI, "--help"], repeat)
+    heavy = sorted(m for m in ("pandas", "numpy", "fitz") if m in modules)
+    print(f"{'finance --help':<24}{wall:>12.1f}{imports:>15.1f}  {', '.join(heavy) or '-'}")
+
+    for name in SUBCOMMAND_IMPORTS:
+        wall, imports, modules = time_python([FINANCE_CLI, name, "--help"], repeat)
+        print(f"{f'{name} --help':<24}{wall:>12.1f}{imports:>15.1f}  {'-' if not modules & {'pandas', 'fitz'} else 'loaded!'}")
+
+        # The imports the subcommand pays for once it actually runs
+        code = f"import finance; finance.load_subcommand({name!r})"
+        wall, imports, _ = time_python(["-c", code], repeat)
+        if wall is None:
+            print(f"{f'{name} (run)':<24}{'n/a':>12}{'n/a':>15}  missing dependency")
+        else:
+            print(f"{f'{name} (run)':<24}{wall:>12.1f}{imports:>15.1f}  {', '.join(SUBCOMMAND_IMPORTS[name])}")
+
+
+def best_of(repeat, func):
+    """Fastest of `repeat` runs in milliseconds, and the last result"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append((time.perf_counter() - start) * 1000)
+    return min(times), result
+
+
+def bench_sbi_parse(repeat):
+    """SBI text parsing and balance checks on the debug corpus"""
+    import pandas as pd
+    from sbi_parsing import (TRANSACTION_COLUMNS, capture_raw_transactions, convert_raw_transactions,
+                             new_raw_buffers, parse_transactions, parse_transactions_per_row)
+    from sbi_reconciliation import reconcile_balances
+
+    corpus = []
+    for path in sorted(glob.glob(os.path.join(SBI_DEBUG_DIR, "*.txt"))):
+        with open(path, encoding="utf-8") as f:
+            corpus.append((f.read(), os.path.basename(path)))
+    if not corpus:
+        print(f"No debug files in {SBI_DEBUG_DIR}")
+        return
+
+    def capture_all():
+        raw = new_raw_buffers()
+        for text, name in corpus:
+            capture_raw_transactions(text, name, raw)
+        return raw
+
+    per_row_ms, rows = best_of(repeat, lambda: [row for text, name in corpus
+                                                for row in parse_transactions_per_row(text, name)])
+    capture_ms, raw = best_of(repeat, capture_all)
+    convert_ms, batched = best_of(repeat, lambda: convert_raw_transactions(raw))
+    per_file_ms, _ = best_of(repeat, lambda: [parse_transactions(text, name) for text, name in corpus])
+    reconcile_ms, (_, breaks) = best_of(repeat, lambda: reconcile_balances(batched))
+
+    print(f"Corpus: {len(corpus)} files, {sum(len(text) for text, _ in corpus) / 1024:.0f} KB, {len(rows)} transactions")
+    print(f"{'Parser':<36}{'Time (ms)':>12}{'Speedup':>10}")
+    print("-" * 58)
+    print(f"{'per-row loop (baseline)':<36}{per_row_ms:>12.1f}{'1.0x':>10}")
+    print(f"{'phase 1: raw capture loop':<36}{capture_ms:>12.1f}{per_row_ms / capture_ms:>9.1f}x")
+    print(f"{'phase 2: vectorized conversion':<36}{convert_ms:>12.1f}")
+    print(f"{'two-phase, one batch':<36}{capture_ms + convert_ms:>12.1f}{per_row_ms / (capture_ms + convert_ms):>9.1f}x")
+    print(f"{'two-phase, one batch per file':<36}{per_file_ms:>12.1f}{per_row_ms / per_file_ms:>9.1f}x")
+    print(f"{'balance reconciliation':<36}{reconcile_ms:>12.1f}  ({len(breaks)} breaks)")
+
+    # The baseline parser still produces float rupees
+    baseline = pd.DataFrame(rows)
+    for column in ('Amount', 'Balance'):
+        baseline[f"{column}_Paise"] = (baseline[column] * 100).round().astype('int64')
+    same = len(baseline) == len(batched) and all(
+        (baseline[column].astype(object) == batched[column].astype(object)).all()
+        for column in TRANSACTION_COLUMNS if column in baseline)
+    print(f"Outputs identical: {'yes' if same else 'NO'}")
+
+
+def synthetic_ledger(rows, seed=0, subscriptions=7):
+    """Date-ordered ledger of random UPI spends plus a few monthly subscriptions"""
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp('2015-01-01')
+    merchants = np.array([f"MERCHANT {chr(65 + i % 26)}{chr(65 + i // 26 % 26)}{chr(65 + i // 676 % 26)}"
+                          for i in range(rows // 20 + 1)])
+    spends = pd.DataFrame({
+        'Date': start + pd.to_timedelta(rng.integers(0, 3650, rows), unit='D'),
+        'Description': 'UPI-' + pd.Series(merchants[rng.integers(0, len(merchants), rows)]) + '-PAY@OKAXIS-1234',
+        'Amount_Paise': rng.integers(1_000, 500_000, rows),
+    })
+    months = pd.date_range(start, periods=120, freq='MS')
+    monthly = pd.DataFrame({
+        'Date': np.tile(months + pd.Timedelta(days=4), subscriptions),
+        'Description': np.repeat([f"UPI-STREAMING {chr(65 + i)}-NETFLIX@HDFC-99" for i in range(subscriptions)], len(months)),
+        'Amount_Paise': 64_900,
+    })
+    ledger = pd.concat([spends, monthly], ignore_index=True).sort_values('Date', kind='stable', ignore_index=True)
+    return ledger.assign(Type='Debit', Account='HDFC', Category='Other', Subcategory='')
+
+
+def bench_recurring(repeat):
+    """Recurring payment detection on synthetic ledgers of growing size"""
+    from recurring import detect_recurring
+
+    print(f"{'Rows':>10}{'Time (ms)':>12}{'us/row':>10}{'Found':>8}")
+    print("-" * 40)
+    for rows in (50_000, 200_000, 800_000):
+        ledger = synthetic_ledger(rows)
+        elapsed_ms, commitments = best_of(repeat, lambda: detect_recurring(ledger))
+        print(f"{rows:>10,}{elapsed_ms:>12.1f}{elapsed_ms * 1000 / rows:>10.2f}{len(commitments):>8}")
+
+
+def bench_forecast(repeat):
+    """Cash-flow forecast from the aggregates of a decade of synthetic data"""
+    import numpy as np
+    from forecast import forecast_cash_flow
+    from recurring import detect_recurring
+    from unified_ledger import build_aggregates
+
+    ledger = synthetic_ledger(200_000)
+    rng = np.random.default_rng(1)
+    categories = np.array([f"Category {i:02d}" for i in range(15)])
+    ledger['Category'] = categories[rng.integers(0, len(categories), len(ledger))]
+    ledger['Type'] = np.where(rng.random(len(ledger)) < 0.1, 'Credit', 'Debit')
+    ledger['Balance_Paise'] = 0
+
+    aggregates_ms, aggregates = best_of(repeat, lambda: build_aggregates(ledger))
+    commitments = detect_recurring(ledger)
+    forecast_ms, (detail, _) = best_of(repeat, lambda: forecast_cash_flow(aggregates, commitments, months=12))
+
+    print(f"Ledger: {len(ledger):,} rows over {ledger['Date'].dt.to_period('M').nunique()} months; "
+          f"{len(aggregates['totals']):,} month x category totals; {len(commitments)} recurring items")
+    print(f"{'aggregates (once per ledger save)':<36}{aggregates_ms:>10.1f} ms")
+    print(f"{'12-month forecast':<36}{forecast_ms:>10.1f} ms  ({len(detail)} month x category rows)")
+
+
+def bench_categorize_chunks(repeat):
+    """Peak memory of whole-workbook vs chunked HDFC categorization on 25k and 100k rows"""
+    import tempfile
+
+    import numpy as np
+    import pandas as pd
+
+    modes = (("whole workbook", 0), ("chunks of 10,000 rows", 10_000), ("chunks of 2,000 rows", 2_000),
+             ("chunks of 500 rows", 500))
+    print(f"{'Rows':>8}  {'Mode':<24}{'Time (s)':>10}{'Peak RSS (MB)':>16}")
+    print("-" * 60)
+    for rows in (25_000, 100_000):
+        ledger = synthetic_ledger(rows)
+        rng = np.random.default_rng(3)
+        credit = rng.random(len(ledger)) < 0.1
+        amount = ledger['Amount_Paise'] / 100
+        consolidated = pd.DataFrame({
+            'Date': ledger['Date'],
+            'Narration': ledger['Description'],
+            'Chq./Ref.No.': [f"{n:016d}" for n in range(len(ledger))],
+            'Value Dt': ledger['Date'].dt.strftime('%d/%m/%y'),
+            'Withdrawal Amt.': amount.where(~credit),
+            'Deposit Amt.': amount.where(credit),
+            'Closing Balance': 0.0,
+            'Source_File': 'synthetic.xls',
+        })
+
+        with tempfile.TemporaryDirectory() as base:
+            consolidated_dir = os.path.join(base, "Consolidated_Files")
+            os.makedirs(consolidated_dir)
+            consolidated.to_excel(os.path.join(consolidated_dir, "Complete_Consolidated_Statement.xlsx"), index=False)
+            for label, chunk_size in modes:
+                result = subprocess.run([sys.executable, "-c", CATEGORIZE_PEAK_SCRIPT, base, str(chunk_size)],
+                                        capture_output=True, text=True, cwd=statement_paths.HDFC_DIR)
+                if result.returncode != 0:
+                    print(f"{len(consolidated):>8,}  {label:<24} failed: {result.stderr.strip().splitlines()[-1]}")
+                    continue
+                seconds, peak_kb = result.stdout.strip().splitlines()[-1].split()
+                print(f"{len(consolidated):>8,}  {label:<24}{float(seconds):>10.1f}{int(peak_kb) / 1024:>16.0f}")
+
+
+def bench_categorize_parallel(repeat):
+    """Rule matching throughput from 1 to N cores on 2M synthetic narrations"""
+    import numpy as np
+    import pandas as pd
+    from categorization_rules import load_rules
+    from parallel_categorize import apply_parallel
+
+    rules = load_rules()
+    rows = 2_000_000
+    rng = np.random.default_rng(4)
+    # Half the narrations name a rule keyword; the rest fall through every pass to the default
+    keywords = np.array(sorted(rules.keywords))
+    merchants = synthetic_ledger(rows)['Description'].to_numpy(dtype=object)[:rows]
+    named = rng.random(rows) < 0.5
+    keyworded = 'UPI-' + pd.Series(keywords[rng.integers(0, len(keywords), rows)]) + '-PAY@OKAXIS-1234'
+    narrations = pd.Series(np.where(named, keyworded.to_numpy(dtype=object), merchants), dtype=object)
+
+    serial_ms, expected = best_of(repeat, lambda: rules.apply(narrations))
+    print(f"Narrations: {rows:,} ({len(rules.passes)} rule passes), {os.cpu_count()} cores")
+    print(f"{'Workers':<12}{'Time (ms)':>12}{'Rows/sec':>14}{'Speedup':>10}  Identical")
+    print("-" * 60)
+    print(f"{'1 (serial)':<12}{serial_ms:>12.1f}{rows / serial_ms * 1000:>14,.0f}{'1.0x':>10}")
+    workers = 2
+    while workers <= (os.cpu_count() or 1):
+        parallel_ms, result = best_of(repeat, lambda: apply_parallel(rules, narrations, workers, min_rows=0))
+        same = all(left.equals(right) for left, right in zip(result, expected))
+        print(f"{workers:<12}{parallel_ms:>12.1f}{rows / parallel_ms * 1000:>14,.0f}{serial_ms / parallel_ms:>9.1f}x  {'yes' if same else 'NO'}")
+        workers *= 2
+
+
+def bench_hdfc_csv(repeat):
+    """HDFC export reading: delimited text (C parser) vs Excel (streaming reader), 200k rows"""
+    import tempfile
+
+    import numpy as np
+    import pandas as pd
+    from statement_reader import read_statement
+
+    rows = 200_000
+    ledger = synthetic_ledger(rows).iloc[:rows]
+    rng = np.random.default_rng(5)
+    credit = rng.random(rows) < 0.1
+    amount = (ledger['Amount_Paise'] / 100).to_numpy()
+    dates = ledger['Date'].dt.strftime('%d/%m/%y').to_numpy()
+    references = np.array([f"{n:016d}" for n in range(rows)], dtype=object)
+    balance = np.round(rng.random(rows) * 1e6, 2)
+    # As the NetBanking downloads lay them out: blank cells in the workbook, 0.00 in delimited text
+    excel = pd.DataFrame({
+        'Date': dates, 'Narration': ledger['Description'].to_numpy(), 'Chq./Ref.No.': references, 'Value Dt': dates,
+        'Withdrawal Amt.': np.where(credit, np.nan, amount), 'Deposit Amt.': np.where(credit, amount, np.nan),
+        'Closing Balance': balance,
+    })
+    delimited = pd.DataFrame({
+        'Date': dates, 'Narration': ledger['Description'].to_numpy(), 'Value Dat': dates,
+        'Debit Amount': np.where(credit, 0.0, amount), 'Credit Amount': np.where(credit, amount, 0.0),
+        'Chq/Ref Number': references, 'Closing Balance': balance,
+    })
+
+    with tempfile.TemporaryDirectory() as directory:
+        excel_file = os.path.join(directory, "export.xlsx")
+        csv_file = os.path.join(directory, "export.csv")
+        excel.to_excel(excel_file, index=False)
+        with open(csv_file, 'w', encoding='utf-8', newline='') as f:
+            f.write("HDFC BANK Ltd.,Statement From : 01/01/15 To : 31/12/24\n\n")
+            delimited.to_csv(f, index=False, float_format='%.2f')
+        print(f"Export: {rows:,} rows - {os.path.getsize(excel_file) / 2**20:.1f} MB .xlsx, "
+              f"{os.path.getsize(csv_file) / 2**20:.1f} MB .csv")
+
+        excel_ms, from_excel = best_of(repeat, lambda: read_statement(excel_file))
+        csv_ms, from_csv = best_of(repeat, lambda: read_statement(csv_file))
+
+    print(f"{'Reader':<36}{'Time (ms)':>12}{'Rows/sec':>14}{'Speedup':>10}")
+    print("-" * 72)
+    print(f"{'Excel (openpyxl streaming)':<36}{excel_ms:>12.1f}{rows / excel_ms * 1000:>14,.0f}{'1.0x':>10}")
+    print(f"{'delimited text (C CSV parser)':<36}{csv_ms:>12.1f}{rows / csv_ms * 1000:>14,.0f}{excel_ms / csv_ms:>9.1f}x")
+    same = set(from_csv.columns) == set(from_excel.columns) and from_csv[from_excel.columns].equals(from_excel)
+    print(f"Outputs identical: {'yes' if same else 'NO'}")
+
+
+def load_test(port, paths, clients, requests_per_client, etags=None):
+    """Requests/sec from `clients` keep-alive connections cycling through paths"""
+    import http.client
+    import threading
+
+    failures = []
+
+    def client(offset):
+        connection = http.client.HTTPConnection("127.0.0.1", port)
+        for i in range(requests_per_client):
+            path = paths[(offset + i) % len(paths)]
+            headers = {'If-None-Match': etags[path]} if etags else {}
+            connection.request("GET", path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            if response.status not in (200, 304):
+                failures.append(response.status)
+        connection.close()
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return clients * requests_per_client / elapsed, failures
+
+
+def bench_query_service(repeat):
+    """Load test of the localhost query service on a 200k-row synthetic ledger"""
+    import http.client
+    import threading
+
+    import numpy as np
+    from query_service import LedgerService, create_server
+
+    ledger = synthetic_ledger(200_000)
+    rng = np.random.default_rng(2)
+    categories = np.array([f"Category {i:02d}" for i in range(15)])
+    ledger['Category'] = categories[rng.integers(0, len(categories), len(ledger))]
+    ledger['Balance_Paise'] = 0
+    paths = [f"/{endpoint}?from={year}-01-01&to={year}-12-31"
+             for endpoint in ('categories', 'monthly') for year in range(2015, 2025)]
+    paths += [f"/transactions?from={year}-{month:02d}-01&to={year}-{month:02d}-28&limit=50"
+              for year in (2020, 2021) for month in range(1, 13)]
+    paths += [f"/search?q=MERCHANT%20{chr(65 + i)}&limit=20" for i in range(10)]
+
+    print(f"Ledger: {len(ledger):,} rows; {len(paths)} distinct queries; 4 keep-alive clients")
+    print(f"{'Mode':<34}{'Requests/sec':>14}")
+    print("-" * 48)
+    for label, cache_size, conditional in (("no cache (every request computed)", 0, False),
+                                           ("LRU cache hits", 256, False),
+                                           ("If-None-Match -> 304", 256, True)):
+        service = LedgerService(lambda: ledger, lambda: 'synthetic', cache_size)
+        server = create_server(service, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        port = server.server_port
+        etags = {}
+        # Warm the cache (and collect the ETags) before measuring
+        connection = http.client.HTTPConnection("127.0.0.1", port)
+        for path in paths:
+            connection.request("GET", path)
+            response = connection.getresponse()
+            response.read()
+            etags[path] = response.getheader('ETag')
+        connection.close()
+
+        per_client = len(paths) * (5 if cache_size else 1)
+        rates = [load_test(port, paths, 4, per_client, etags if conditional else None) for _ in range(repeat)]
+        server.shutdown()
+        server.server_close()
+        best, failures = max(rates, key=lambda rate: rate[0])
+        print(f"{label:<34}{best:>14,.0f}" + (f"  ({len(failures)} failed)" if failures else ""))
+
+
+BENCHMARKS = {
+    'startup': bench_startup,
+    'sbi_parse': bench_sbi_parse,
+    'recurring': bench_recurring,
+    'forecast': bench_forecast,
+    'query_service': bench_query_service,
+    'categorize_chunks': bench_categorize_chunks,
+    'categorize_parallel': bench_categorize_parallel,
+    'hdfc_csv': bench_hdfc_csv,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run statement tool benchmarks")
+    parser.add_argument("names", nargs="*", help=f"Benchmarks to run: {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions per measurement (default: 3)")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    for name in args.names or BENCHMARKS:
+        print(f"\n=== {name}: {BENCHMARKS[name].__doc__} ===")
+        BENCHMARKS[name](args.repeat)
+
+
+if __name__ == "__main__":
+    main()
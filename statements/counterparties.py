@@ -0,0 +1,45 @@
+"""
+Counterparties - who a ledger row was paid to or received from.
+
+Bank narrations wrap the counterparty in channel boilerplate (UPI references,
+IFSC codes, VPAs, card numbers). normalize_counterparties strips that with one
+vectorized regex pass, so rows paying the same person or merchant share a key.
+"""
+
+import re
+
+# One named group per narration layout; the first group that matches wins
+COUNTERPARTY_PATTERN = re.compile(
+    r'^UPI-(?P<hdfc_upi>[^-]+)-'                                   # UPI-ZOMATO LIMITED-ZOMATO@HDFCBANK-...
+    r'|^UPI/(?:DR|CR|REV)/\d+/(?P<sbi_upi>[^/]+)/'                 # UPI/DR/403252134824/SHITAL N/PYTM/...
+    r'|^NEFT (?:CR|DR)-[A-Z]{4}0[A-Z0-9]{6}-(?P<neft>[^-]+)-'      # NEFT CR-YESB0000001-ZERODHA BROKING LTD-...
+    r'|^IMPS-\d+-(?P<imps>[^-]+)-'                                 # IMPS-412345678901-NAME-...
+    r'|^ACH [CD]- ?(?P<ach>[^-]+)-'                                # ACH C- WIPROLIMITED-0000...
+    r'|^POS \S+ (?P<pos>.+)$'                                      # POS 541919XXXXXX5019 GOOGLECLOUD
+    r'|^(?P<other>[^-/]+)'                                         # TMF SERVICES I-REFLEXIS SAL MAY 24
+)
+
+# Words kept from the cleaned name; long legal names vary in their tails
+COUNTERPARTY_WORDS = 3
+
+
+def normalize_counterparties(descriptions):
+    """Series of descriptions -> Series of upper-case counterparty keys ('' when unknown)"""
+    import numpy as np
+    import pandas as pd
+
+    groups = descriptions.astype(object).fillna('').str.strip().str.extract(COUNTERPARTY_PATTERN).to_numpy()
+    # The layouts are alternatives, so at most one group of a row is set
+    matched = pd.notna(groups)
+    first = groups[np.arange(len(groups)), matched.argmax(axis=1)]
+    name = pd.Series(np.where(matched.any(axis=1), first, ''), index=descriptions.index, dtype=object)
+
+    cleaned = (name.str.upper()
+                   .str.replace(r'\bX*\d[\dX]*\b', ' ', regex=True)    # references, masked card numbers
+                   .str.replace(r'[^A-Z ]+', ' ', regex=True)
+                   .str.strip()
+                   .str.replace(r'^(?:MR|MRS|MS|DR|SHRI) ', '', regex=True)
+                   .str.split()
+                   .str[:COUNTERPARTY_WORDS]
+                   .str.join(' '))
+    return cleaned.fillna('')
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Dashboard - a self-contained offline HTML report from the ledger aggregates.
+
+Rendered from ledger_aggregates.json (the month x category cube, spend per
+counterparty and month-end balances), never from the transaction rows:
+
+  - Overview: inflow, outflow and net per month
+  - Balances: each account's month-end balance
+  - one section per year: spending by category and the top merchants
+
+Each section's chart data is embedded in the page as compact JSON and drawn
+as SVG by a few lines of inline script, so the file opens without a network
+connection. Sections are cached in dashboard_sections.json with a
+fingerprint of the months they cover; a rebuild re-renders only the sections
+whose months changed (after one new statement: the overview, the balances
+and that statement's year).
+"""
+
+import argparse
+import hashlib
+import html
+import json
+import os
+import sys
+from datetime import datetime
+from itertools import groupby
+
+import statement_paths
+
+DASHBOARD_FILE = "Dashboard.html"
+SECTIONS_FILE = "dashboard_sections.json"
+# Bumped when the section markup changes, so cached sections are rendered again
+TEMPLATE_VERSION = 1
+TOP_MERCHANTS = 10
+
+PAGE_STYLE = """
+body{font-family:system-ui,sans-serif;margin:0 auto;max-width:1000px;padding:16px;color:#222}
+nav a{margin-right:12px}section{margin:28px 0}h2{border-bottom:1px solid #ddd;padding-bottom:4px}
+table{border-collapse:collapse;margin:8px 24px 8px 0;display:inline-table;vertical-align:top}
+td,th{padding:3px 10px;border-bottom:1px solid #eee;text-align:left}td.amount{text-align:right}
+.plot{width:100%}.axis{stroke:#999}.tick{font-size:11px;fill:#666}
+.legend span{margin-right:12px;font-size:12px}.legend i{display:inline-block;width:10px;height:10px;margin-right:4px}
+"""
+
+# Draws every .chart from the JSON in the <script> element that follows it
+PAGE_SCRIPT = """
+const COLORS=['#4e79a7','#f28e2b','#e15759','#76b7b2','#59a14f','#edc948','#b07aa1','#ff9da7','#9c755f','#bab0ac',
+'#86bcb6','#d37295','#a0cbe8','#ffbe7d','#8cd17d'];
+const NS='http://www.w3.org/2000/svg';
+function el(tag,attrs,parent){const e=document.createElementNS(NS,tag);
+for(const k in attrs)e.setAttribute(k,attrs[k]);parent.appendChild(e);return e}
+function short(v){const a=Math.abs(v);return a>=1e7?(v/1e7).toFixed(1)+'Cr':a>=1e5?(v/1e5).toFixed(1)+'L':
+a>=1e3?(v/1e3).toFixed(0)+'k':String(v)}
+function draw(box){
+const d=JSON.parse(box.nextElementSibling.textContent),kind=box.dataset.chart,n=d.labels.length;
+const W=900,H=240,P=50,step=(W-P)/Math.max(n,1);
+const s=el('svg',{viewBox:`0 0 ${W} ${H+24}`,class:'plot'},box);
+let lo=0,hi=0;
+d.labels.forEach((_,i)=>{let t=0;d.series.forEach(x=>{const v=x.values[i];if(v===null)return;
+t+=v;lo=Math.min(lo,v);hi=Math.max(hi,kind==='stacked'?t:v)})});
+if(hi===lo)hi=lo+1;
+const y=v=>H-(v-lo)/(hi-lo)*(H-10);
+el('line',{x1:P,x2:W,y1:y(0),y2:y(0),class:'axis'},s);
+[lo,hi].forEach(v=>{el('text',{x:P-4,y:y(v)+4,class:'tick','text-anchor':'end'},s).textContent=short(v)});
+const every=Math.ceil(n/12);
+d.labels.forEach((l,i)=>{if(i%every===0)el('text',{x:P+(i+0.5)*step,y:H+16,class:'tick','text-anchor':'middle'},s).textContent=l});
+const base=d.labels.map(()=>0),w=kind==='bar'?step*0.8/d.series.length:step*0.8;
+d.series.forEach((x,k)=>{const color=COLORS[k%COLORS.length];
+if(kind==='line'){el('polyline',{fill:'none',stroke:color,'stroke-width':2,points:x.values.map((v,i)=>
+v===null?'':`${P+(i+0.5)*step},${y(v)}`).join(' ')},s);return}
+x.values.forEach((v,i)=>{if(!v)return;const bottom=kind==='stacked'?base[i]:0,top=bottom+v;
+const r=el('rect',{x:P+i*step+step*0.1+(kind==='bar'?k*w:0),y:y(Math.max(top,bottom)),width:w,
+height:Math.abs(y(bottom)-y(top)),fill:color},s);
+el('title',{},r).textContent=`${d.labels[i]} ${x.name}: \\u20b9${v.toLocaleString('en-IN')}`;
+if(kind==='stacked')base[i]=top})});
+const legend=document.createElement('div');legend.className='legend';
+d.series.forEach((x,k)=>{const item=document.createElement('span'),swatch=document.createElement('i');
+swatch.style.background=COLORS[k%COLORS.length];item.append(swatch,x.name);legend.append(item)});
+box.append(legend)}
+document.querySelectorAll('.chart').forEach(draw);
+"""
+
+
+def month_range(first, last):
+    """'YYYY-MM' labels from first to last inclusive"""
+    year, month = map(int, first.split('-'))
+    months = []
+    while f"{year:04d}-{month:02d}" <= last:
+        months.append(f"{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def by_month(rows):
+    """Aggregate rows (month first) grouped into {month: [rows]}"""
+    return {month: list(group) for month, group in groupby(sorted(rows), key=lambda row: row[0])}
+
+
+def month_fingerprints(aggregates):
+    """{month: hash of every aggregate row for that month}"""
+    sources = [by_month(aggregates['totals']), by_month(aggregates.get('merchants', [])),
+               by_month(aggregates.get('month_end_balances', []))]
+    months = sorted(set().union(*sources))
+    return {month: hashlib.blake2b(json.dumps([source.get(month, []) for source in sources]).encode('utf-8'),
+                                   digest_size=12).hexdigest()
+            for month in months}
+
+
+def section_fingerprint(months, fingerprints):
+    payload = json.dumps([TEMPLATE_VERSION, [(month, fingerprints.get(month)) for month in months]])
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=12).hexdigest()
+
+
+def rupees(paise):
+    """Whole rupees for the charts"""
+    return round(paise / 100)
+
+
+def table(headings, rows):
+    """HTML table; cells that are ints are paise and shown as rupees"""
+    from money import format_rupees
+
+    head = ''.join(f"<th>{html.escape(heading)}</th>" for heading in headings)
+    body = ''.join('<tr>' + ''.join(f'<td class="amount">{format_rupees(cell)}</td>' if isinstance(cell, int)
+                                    else f"<td>{html.escape(str(cell))}</td>" for cell in row) + '</tr>'
+                   for row in rows)
+    return f"<table><tr>{head}</tr>{body}</table>"
+
+
+def render_section(section_id, title, chart, data, tables):
+    """A <section> with a chart drawn from embedded compact JSON, followed by tables"""
+    # '</' would end the script element early
+    payload = json.dumps(data, separators=(',', ':'), ensure_ascii=False).replace('</', '<\\/')
+    return (f'<section id="{section_id}"><h2>{html.escape(title)}</h2>'
+            f'<div class="chart" data-chart="{chart}"></div><script type="application/json">{payload}</script>'
+            f'{"".join(tables)}</section>')
+
+
+def overview_section(aggregates, months):
+    # Own-account transfers are already left out of the aggregates
+    flows = {month: {'Credit': 0, 'Debit': 0} for month in months}
+    for month, _, kind, amount, _ in aggregates['totals']:
+        flows[month][kind] += amount
+    net = {month: flow['Credit'] - flow['Debit'] for month, flow in flows.items()}
+    data = {'labels': months, 'series': [
+        {'name': 'Inflow', 'values': [rupees(flows[month]['Credit']) for month in months]},
+        {'name': 'Outflow', 'values': [rupees(flows[month]['Debit']) for month in months]},
+        {'name': 'Net', 'values': [rupees(net[month]) for month in months]},
+    ]}
+    recent = [(month, flows[month]['Credit'], flows[month]['Debit'], net[month]) for month in reversed(months[-12:])]
+    return render_section('overview', 'Monthly Trend', 'bar', data,
+                          [table(['Month', 'Inflow', 'Outflow', 'Net'], recent)])
+
+
+def balances_section(aggregates, months):
+    month_end = {(month, account): balance for month, account, balance in aggregates.get('month_end_balances', [])}
+    series = []
+    for account in sorted(aggregates['balances']):
+        values = []
+        last = None
+        for month in months:
+            # Months without transactions keep the previous month-end balance
+            last = month_end.get((month, account), last)
+            values.append(None if last is None else rupees(last))
+        series.append({'name': account, 'values': values})
+    latest = [(account, day, balance) for account, (day, balance) in sorted(aggregates['balances'].items())]
+    return render_section('balances', 'Balance History', 'line', {'labels': months, 'series': series},
+                          [table(['Account', 'As of', 'Balance'], latest)])
+
+
+def year_section(aggregates, year, months):
+    spend = {}
+    for month, category, kind, amount, _ in aggregates['totals']:
+        if month.startswith(year) and kind == 'Debit':
+            spend.setdefault(category, {})[month] = amount
+    categories = sorted(spend, key=lambda category: -sum(spend[category].values()))
+    data = {'labels': months, 'series': [{'name': category, 'values': [rupees(spend[category].get(month, 0)) for month in months]}
+                                         for category in categories]}
+
+    merchants = {}
+    for month, name, amount, count in aggregates.get('merchants', []):
+        if month.startswith(year):
+            total = merchants.setdefault(name, [0, 0])
+            total[0] += amount
+            total[1] += count
+    top = sorted(merchants.items(), key=lambda item: -item[1][0])[:TOP_MERCHANTS]
+    return render_section(f"year-{year}", year, 'stacked', data, [
+        table(['Category', 'Spent'], [(category, sum(spend[category].values())) for category in categories]),
+        table(['Top merchant', 'Payments', 'Spent'], [(name, str(count), amount) for name, (amount, count) in top]),
+    ])
+
+
+def section_plan(aggregates, fingerprints):
+    """(id, title, months the section covers, function rendering it), newest year first"""
+    months = month_range(min(fingerprints), max(fingerprints))
+    plan = [
+        ('overview', 'Monthly Trend', months, lambda: overview_section(aggregates, months)),
+        ('balances', 'Balance History', months, lambda: balances_section(aggregates, months)),
+    ]
+    for year in sorted({month[:4] for month in months}, reverse=True):
+        year_months = [month for month in months if month.startswith(year)]
+        plan.append((f"year-{year}", year, year_months,
+                     lambda year=year, year_months=year_months: year_section(aggregates, year, year_months)))
+    return plan
+
+
+def load_sections(output_dir):
+    path = os.path.join(output_dir, SECTIONS_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_sections(sections, output_dir):
+    path = os.path.join(output_dir, SECTIONS_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(sections, f)
+    os.replace(tmp_path, path)
+
+
+def render_page(aggregates, plan, fragments):
+    nav = ''.join(f'<a href="#{section_id}">{html.escape(title)}</a>' for section_id, title, _, _ in plan)
+    generated = datetime.now().strftime('%d/%m/%Y %H:%M')
+    return (f'<!DOCTYPE html><html lang="en"><head><meta charset="utf-8"><title>Personal Finance Dashboard</title>'
+            f'<style>{PAGE_STYLE}</style></head><body><h1>Personal Finance Dashboard</h1>'
+            f'<p>Transactions up to {aggregates["last_date"]}; generated {generated}.</p><nav>{nav}</nav>'
+            f'{"".join(fragments)}<script>{PAGE_SCRIPT}</script></body></html>\n')
+
+
+def update_dashboard(output_dir=statement_paths.UNIFIED_OUTPUT_DIR, aggregates=None, rebuild=False):
+    """Write the dashboard, re-rendering only sections whose months changed
+
+    Returns (path, sections rendered, sections in total), or None if there
+    are no aggregates to render.
+    """
+    if aggregates is None:
+        from unified_ledger import load_aggregates
+        aggregates = load_aggregates(output_dir)
+    if not aggregates or not aggregates['totals']:
+        return None
+
+    fingerprints = month_fingerprints(aggregates)
+    plan = section_plan(aggregates, fingerprints)
+    cached = {} if rebuild else load_sections(output_dir)
+    path = os.path.join(output_dir, DASHBOARD_FILE)
+
+    sections = {}
+    fragments = []
+    rendered = 0
+    for section_id, _, months, render in plan:
+        fingerprint = section_fingerprint(months, fingerprints)
+        entry = cached.get(section_id)
+        if entry is None or entry[0] != fingerprint:
+            entry = [fingerprint, render()]
+            rendered += 1
+        sections[section_id] = entry
+        fragments.append(entry[1])
+
+    if rendered or sections.keys() != cached.keys() or not os.path.exists(path):
+        os.makedirs(output_dir, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(render_page(aggregates, plan, fragments))
+        os.replace(tmp_path, path)
+        save_sections(sections, output_dir)
+    return path, rendered, len(plan)
+
+
+def add_arguments(parser):
+    """Register the dashboard options on an argparse parser"""
+    parser.add_argument("--ledger", default=statement_paths.UNIFIED_OUTPUT_DIR, help="Unified ledger directory")
+    parser.add_argument("--rebuild", action="store_true", help="Render every section, ignoring the cached ones")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build an offline HTML dashboard from the unified ledger aggregates")
+    add_arguments(parser)
+    run(parser.parse_args())
+
+
+def run(args):
+    """Build the dashboard for parsed command line arguments"""
+    result = update_dashboard(args.ledger, rebuild=args.rebuild)
+    if result is None:
+        print("❌ No ledger aggregates found - run 'finance.py report' first.")
+        sys.exit(1)
+    path, rendered, total = result
+    print(f"✅ Dashboard: {path} ({rendered} of {total} sections rendered)")
+
+
+if __name__ == "__main__":
+    main()
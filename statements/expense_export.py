@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Expense Export - categorized debits from the unified ledger into the Java
+app's expenses.json.
+
+Each debit becomes an Expense record the Java FileBasedExpenseRepository
+reads (id, category, amount, date as yyyy-MM-dd, description, tags). Ids are
+UUIDs derived from the row's source file and row number, so exporting the
+same statement again yields the same ids. Transfers between own accounts are
+not expenses and are left out.
+
+Records are written to the file one at a time as they are built. A full
+export rewrites the file but keeps the records it did not write itself
+(ones entered in the Java app). With --incremental only transactions not
+exported before are added: they are appended inside the existing JSON
+array, so a sync never rewrites (or re-reads) the expenses already in the
+file. The exported ids are kept in a hidden file next to expenses.json.
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import uuid
+
+import statement_paths
+
+DEFAULT_EXPENSES_FILE = os.path.join(os.path.dirname(statement_paths.STATEMENTS_DIR), "expenses.json")
+STATE_VERSION = 1
+
+# Namespace for the ids; uuid5 of it and "<source file>#<source row>" is an expense's id
+EXPENSE_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "personal-financing/statements/expenses")
+
+# Every append ends the file with this, so a finished append can be told from one cut short
+ARRAY_CLOSE = b"\n]\n"
+
+# The Java Expense requires a category
+UNCATEGORIZED = "Uncategorized"
+
+
+def state_path(expenses_file):
+    directory, name = os.path.split(expenses_file)
+    return os.path.join(directory, f".{name}.exported")
+
+
+def load_state(expenses_file):
+    """Ids already exported to the file (and any append that did not finish), or an empty state"""
+    path = state_path(expenses_file)
+    if not os.path.exists(path):
+        return {'version': STATE_VERSION, 'ids': [], 'pending': None}
+    with open(path, 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    if state.get('version') != STATE_VERSION:
+        return {'version': STATE_VERSION, 'ids': [], 'pending': None}
+    return state
+
+
+def save_state(state, expenses_file):
+    path = state_path(expenses_file)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def expense_id(source_file, source_row):
+    return str(uuid.uuid5(EXPENSE_NAMESPACE, f"{source_file}#{source_row}"))
+
+
+def exportable_debits(ledger):
+    """Ledger debits that are expenses: not transfers between own accounts"""
+    from transfers import TRANSFER_CATEGORY
+
+    return ledger[(ledger['Type'] == 'Debit') & (ledger['Category'] != TRANSFER_CATEGORY)]
+
+
+def expense_records(debits):
+    """Expense dicts in the Java schema, one at a time"""
+    from money import to_rupees
+
+    columns = ['Source_File', 'Source_Row', 'Category', 'Subcategory', 'Amount_Paise', 'Date', 'Description', 'Account']
+    for source_file, source_row, category, subcategory, paise, day, description, account in debits[columns].itertuples(index=False):
+        tags = [account]
+        if isinstance(subcategory, str) and subcategory:
+            tags.append(subcategory)
+        yield {
+            'id': expense_id(source_file, source_row),
+            'category': category if isinstance(category, str) and category.strip() else UNCATEGORIZED,
+            'amount': to_rupees(int(paise)),
+            'date': day.strftime('%Y-%m-%d'),
+            'description': description if isinstance(description, str) else '',
+            'tags': tags,
+        }
+
+
+def write_records(handle, records, separator):
+    """Write records as JSON array elements; returns the ids written"""
+    ids = []
+    for record in records:
+        handle.write(separator + json.dumps(record, ensure_ascii=False, indent=2))
+        separator = ",\n"
+        ids.append(record['id'])
+    return ids
+
+
+def write_expenses(records, path, kept=()):
+    """Write a complete expenses.json (through a temporary file): the kept records, then records
+
+    Returns the ids of records written.
+    """
+    from output_tree import atomic_path
+
+    with atomic_path(path) as tmp_path:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write("[")
+            written = write_records(f, kept, "\n")
+            ids = write_records(f, records, ",\n" if written else "\n")
+            f.write("\n]\n" if written or ids else "]\n")
+    return ids
+
+
+def records_not_exported(path, exported):
+    """The records in an existing expenses.json whose id the export never wrote (entered in the Java app)"""
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        records = json.load(f)
+    if not isinstance(records, list):
+        raise ValueError("does not hold a JSON array")
+    return [record for record in records if not (isinstance(record, dict) and record.get('id') in exported)]
+
+
+def array_end(handle):
+    """(offset of the closing ']', True if the array is empty) for a JSON array file open in binary mode"""
+    handle.seek(0, os.SEEK_END)
+    position = handle.tell()
+    # Only the tail is read; the rest of the document is never touched
+    tail_start = max(0, position - 4096)
+    handle.seek(tail_start)
+    tail = handle.read().rstrip()
+    if not tail.endswith(b"]"):
+        raise ValueError("does not end with a JSON array")
+    closing = tail_start + len(tail) - 1
+    # Elements end in '}', so '[' right before the ']' can only be an empty top-level array
+    return closing, tail[:-1].rstrip().endswith(b"[")
+
+
+def recover(path, state):
+    """Finish the bookkeeping of an append the last run did not complete
+
+    An append that wrote every byte it meant to (the file has exactly the
+    expected length and ends with the closing ']' written last) is kept and
+    its ids recorded. Anything else is undone by cutting the file back and
+    restoring its old end: a file cut short inside a record can end in ']'
+    too, inside tags or a description.
+    """
+    pending = state['pending']
+    state['pending'] = None
+    if pending is None or not os.path.exists(path):
+        return
+    with open(path, 'r+b') as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if 'length' in pending and size == pending['length'] and size >= len(ARRAY_CLOSE):
+            f.seek(size - len(ARRAY_CLOSE))
+            if f.read() == ARRAY_CLOSE:
+                state['ids'].extend(pending['ids'])
+                return
+        print("↩️  Rolling back an export that did not finish")
+        f.seek(pending['offset'])
+        f.truncate()
+        f.write(pending['tail'].encode('utf-8'))
+
+
+def append_expenses(records, ids, path, state):
+    """Append records (whose ids are given) inside the JSON array in path
+
+    The original end of the file, the length the file will have and the
+    ids are noted in the state before writing, so an append cut short can be
+    recovered by the next run. Only the new records are built in memory.
+    """
+    if not ids:
+        return
+    with open(path, 'r+b') as f:
+        closing, empty = array_end(f)
+        appended = io.StringIO()
+        write_records(appended, records, "\n" if empty else ",\n")
+        appended = appended.getvalue().encode('utf-8') + ARRAY_CLOSE
+        f.seek(closing)
+        state['pending'] = {'offset': closing, 'tail': f.read().decode('utf-8'), 'ids': ids,
+                            'length': closing + len(appended)}
+        save_state(state, path)
+
+        f.seek(closing)
+        f.truncate()
+        f.write(appended)
+        f.flush()
+        os.fsync(f.fileno())
+    state['ids'].extend(ids)
+    state['pending'] = None
+    save_state(state, path)
+
+
+def export_expenses(ledger, path=DEFAULT_EXPENSES_FILE, incremental=False):
+    """Export the ledger's expenses to path; returns the number of records written
+
+    Without incremental the file is rewritten with every exportable debit,
+    after the records already in it that no export wrote. With it, only
+    debits whose id was not exported before are appended (a missing file is
+    created).
+    """
+    state = load_state(path)
+    recover(path, state)
+
+    debits = exportable_debits(ledger)
+    ids = [expense_id(source_file, source_row) for source_file, source_row in zip(debits['Source_File'], debits['Source_Row'])]
+    if not incremental or not os.path.exists(path):
+        # Ids about to be written count as exported, in case the state file was lost
+        kept = records_not_exported(path, set(state['ids']).union(ids))
+        if kept:
+            print(f"📌 Keeping {len(kept)} expenses in {os.path.basename(path)} that were not exported from statements")
+        state['ids'] = write_expenses(expense_records(debits), path, kept)
+        save_state(state, path)
+        return len(state['ids'])
+
+    exported = set(state['ids'])
+    new = [identifier not in exported for identifier in ids]
+    ids = [identifier for identifier, is_new in zip(ids, new) if is_new]
+    append_expenses(expense_records(debits[new]), ids, path, state)
+    save_state(state, path)
+    return len(ids)
+
+
+def add_arguments(parser):
+    """Register the export options on an argparse parser"""
+    parser.add_argument("--ledger", default=statement_paths.UNIFIED_OUTPUT_DIR, help="Unified ledger directory")
+    parser.add_argument("--output", "-o", default=DEFAULT_EXPENSES_FILE, help=f"expenses.json to write (default: {DEFAULT_EXPENSES_FILE})")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Append only transactions not exported before, keeping the rest of the file as it is")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export categorized debits to the Java app's expenses.json")
+    add_arguments(parser)
+    run(parser.parse_args())
+
+
+def run(args):
+    """Export for parsed command line arguments"""
+    from unified_ledger import load_ledger
+
+    ledger = load_ledger(args.ledger)
+    if ledger is None:
+        print("❌ No unified ledger found - run 'finance.py report' first.")
+        sys.exit(1)
+
+    try:
+        count = export_expenses(ledger, args.output, args.incremental)
+    except ValueError as e:
+        print(f"❌ {args.output} {e}")
+        sys.exit(1)
+    if args.incremental:
+        print(f"✅ Appended {count} new expenses to {args.output}")
+    else:
+        print(f"✅ Wrote {count} expenses to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
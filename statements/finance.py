@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Personal Finance - single command line entry point for the statement tools.
+
+Only the standard library is imported at startup. Each subcommand's options
+are registered by the script that implements it, and the scripts import
+pandas, PyMuPDF and the like only inside the functions that need them, so
+--help and argument errors return immediately.
+
+Usage:
+    python finance.py extract --password XXXX
+    python finance.py coverage
+    python finance.py keyring add 88673015778
+    python finance.py consolidate
+    python finance.py categorize --diff
+    python finance.py report
+    python finance.py report --from 2025-06 --to 2025-07
+    python finance.py pipeline
+    python finance.py query --from 2025-01-01 --to 2025-03-31 --category "Food & Dining"
+    python finance.py serve --port 8765
+    python finance.py expenses --incremental
+    python finance.py dashboard
+    python finance.py tax --fy 2024-25
+    python finance.py recurring
+    python finance.py anomalies
+    python finance.py forecast --months 12
+"""
+
+import argparse
+import importlib
+import sys
+
+import statement_paths
+
+# Modules each subcommand imports before doing any work. The benchmark
+# suite uses this to measure per-subcommand import cost.
+SUBCOMMAND_IMPORTS = {
+    'extract': ('pandas', 'fitz', 'sbi_extractor'),
+    'coverage': ('sbi_statement_index',),
+    'keyring': ('sbi_keyring',),
+    'consolidate': ('pandas', 'consolidate_statements'),
+    'categorize': ('pandas', 'categorize_transactions'),
+    'report': ('pandas', 'unified_ledger'),
+    'pipeline': ('pandas', 'pipeline'),
+    'query': ('pandas', 'unified_ledger'),
+    'serve': ('pandas', 'query_service'),
+    'expenses': ('pandas', 'expense_export'),
+    'dashboard': ('dashboard',),
+    'tax': ('pandas', 'tax_report'),
+    'recurring': ('pandas', 'recurring'),
+    'anomalies': ('pandas', 'anomalies'),
+    'forecast': ('pandas', 'forecast'),
+}
+
+
+def load_subcommand(name):
+    """Import the heavy modules a subcommand depends on"""
+    try:
+        return [importlib.import_module(module) for module in SUBCOMMAND_IMPORTS[name]]
+    except ImportError as e:
+        print(f"❌ '{name}' needs a package that is not installed: {e.name}")
+        sys.exit(1)
+
+
+def cmd_extract(args):
+    load_subcommand('extract')
+    import sbi_extractor
+    sbi_extractor.run(args)
+
+
+def cmd_coverage(args):
+    load_subcommand('coverage')
+    import sbi_statement_index
+    sbi_statement_index.run(args)
+
+
+def cmd_keyring(args):
+    load_subcommand('keyring')
+    import sbi_keyring
+    sbi_keyring.run(args)
+
+
+def cmd_consolidate(args):
+    load_subcommand('consolidate')
+    from consolidate_statements import run_consolidation
+    run_consolidation(args.input, args.output, args.resume, args.start, args.end)
+
+
+def cmd_categorize(args):
+    load_subcommand('categorize')
+    from categorize_transactions import run_categorization
+    run_categorization(args.output, args.rules, args.diff, args.resume, args.chunk_size, args.start, args.end, args.workers)
+
+
+def cmd_report(args):
+    load_subcommand('report')
+    import unified_ledger
+    unified_ledger.run(args)
+
+
+def cmd_pipeline(args):
+    load_subcommand('pipeline')
+    import pipeline
+    pipeline.run(args)
+
+
+def cmd_query(args):
+    load_subcommand('query')
+    from money import export_amounts, format_rupees
+    from unified_ledger import load_ledger, query_ledger
+
+    ledger = load_ledger(args.ledger)
+    if ledger is None:
+        print("❌ No unified ledger found - run 'finance.py report' first.")
+        sys.exit(1)
+
+    result = query_ledger(ledger, args.start, args.end, args.category, args.search)
+    columns = ['Date', 'Account', 'Type', 'Amount', 'Category', 'Description']
+    if result.empty:
+        print("No matching transactions.")
+        return
+
+    print(export_amounts(result)[columns].tail(args.limit).to_string(index=False))
+    credits = result.loc[result['Type'] == 'Credit', 'Amount_Paise'].sum()
+    debits = result.loc[result['Type'] == 'Debit', 'Amount_Paise'].sum()
+    print(f"\n📊 {len(result)} transactions | Credits {format_rupees(credits)} | Debits {format_rupees(debits)} | Net {format_rupees(credits - debits)}")
+
+
+def cmd_serve(args):
+    load_subcommand('serve')
+    import query_service
+    query_service.run(args)
+
+
+def cmd_expenses(args):
+    load_subcommand('expenses')
+    import expense_export
+    expense_export.run(args)
+
+
+def cmd_dashboard(args):
+    load_subcommand('dashboard')
+    import dashboard
+    dashboard.run(args)
+
+
+def cmd_tax(args):
+    load_subcommand('tax')
+    import tax_report
+    tax_report.run(args)
+
+
+def cmd_recurring(args):
+    load_subcommand('recurring')
+    import recurring
+    recurring.run(args)
+
+
+def cmd_anomalies(args):
+    load_subcommand('anomalies')
+    import anomalies
+    anomalies.run(args)
+
+
+def cmd_forecast(args):
+    load_subcommand('forecast')
+    import forecast
+    forecast.run(args)
+
+
+def build_parser():
+    # Each module imports only the standard library until it runs (pandas,
+    # PyMuPDF and the like are imported inside its functions), so every
+    # subcommand registers the options of the module that implements it
+    from anomalies import add_arguments as add_anomalies_arguments
+    from categorize_transactions import add_arguments as add_categorize_arguments
+    from consolidate_statements import add_arguments as add_consolidate_arguments
+    from dashboard import add_arguments as add_dashboard_arguments
+    from date_range import add_range_arguments
+    from expense_export import add_arguments as add_expenses_arguments
+    from forecast import add_arguments as add_forecast_arguments
+    from pipeline import add_arguments as add_pipeline_arguments
+    from query_service import add_arguments as add_serve_arguments
+    from recurring import add_arguments as add_recurring_arguments
+    from sbi_extractor import add_arguments as add_extract_arguments
+    from sbi_keyring import add_arguments as add_keyring_arguments
+    from sbi_statement_index import add_arguments as add_coverage_arguments
+    from tax_report import add_arguments as add_tax_arguments
+    from unified_ledger import add_arguments as add_report_arguments
+
+    parser = argparse.ArgumentParser(prog="finance", description="Personal finance statement tools")
+    subparsers = parser.add_subparsers(dest="command", metavar="COMMAND")
+    subparsers.required = True
+
+    extract = subparsers.add_parser("extract", help="Extract transactions from SBI statement PDFs")
+    add_extract_arguments(extract, statement_paths.SBI_PDF_DIR, statement_paths.SBI_OUTPUT_DIR)
+    extract.set_defaults(func=cmd_extract)
+
+    coverage = subparsers.add_parser("coverage", help="Show the months the SBI statement PDFs cover, from their names")
+    add_coverage_arguments(coverage)
+    coverage.set_defaults(func=cmd_coverage)
+
+    keyring = subparsers.add_parser("keyring", help="Manage the encrypted SBI PDF password keyring")
+    add_keyring_arguments(keyring)
+    keyring.set_defaults(func=cmd_keyring)
+
+    consolidate = subparsers.add_parser("consolidate", help="Consolidate HDFC exports by month")
+    add_consolidate_arguments(consolidate)
+    consolidate.set_defaults(func=cmd_consolidate)
+
+    categorize = subparsers.add_parser("categorize", help="Categorize consolidated HDFC transactions")
+    add_categorize_arguments(categorize, statement_paths.HDFC_OUTPUT_DIR)
+    categorize.set_defaults(func=cmd_categorize)
+
+    report = subparsers.add_parser("report", help="Build the unified HDFC + SBI ledger and print a summary")
+    add_report_arguments(report)
+    report.set_defaults(func=cmd_report)
+
+    pipeline = subparsers.add_parser("pipeline", help="Run extract, consolidate, categorize and report concurrently")
+    add_pipeline_arguments(pipeline)
+    pipeline.set_defaults(func=cmd_pipeline)
+
+    query = subparsers.add_parser("query", help="Search the unified ledger")
+    add_range_arguments(query, "transactions", whole_months=False)
+    query.add_argument("--category", help="Category name")
+    query.add_argument("--search", "-s", help="Text to look for in the description")
+    query.add_argument("--limit", type=int, default=50, help="Maximum rows to print (default: 50)")
+    query.add_argument("--ledger", default=statement_paths.UNIFIED_OUTPUT_DIR, help="Unified ledger directory")
+    query.set_defaults(func=cmd_query)
+
+    serve = subparsers.add_parser("serve", help="Serve JSON queries over the unified ledger on localhost")
+    add_serve_arguments(serve)
+    serve.set_defaults(func=cmd_serve)
+
+    expenses = subparsers.add_parser("expenses", help="Export categorized debits to the Java app's expenses.json")
+    add_expenses_arguments(expenses)
+    expenses.set_defaults(func=cmd_expenses)
+
+    dashboard = subparsers.add_parser("dashboard", help="Build an offline HTML dashboard from the ledger aggregates")
+    add_dashboard_arguments(dashboard)
+    dashboard.set_defaults(func=cmd_dashboard)
+
+    tax = subparsers.add_parser("tax", help="Income and investment totals per financial year (April-March)")
+    add_tax_arguments(tax)
+    tax.set_defaults(func=cmd_tax)
+
+    recurring = subparsers.add_parser("recurring", help="Find subscriptions, SIPs, EMIs and salary in the ledger")
+    add_recurring_arguments(recurring)
+    recurring.set_defaults(func=cmd_recurring)
+
+    anomalies = subparsers.add_parser("anomalies", help="Show unusual spends and duplicate charges in new transactions")
+    add_anomalies_arguments(anomalies)
+    anomalies.set_defaults(func=cmd_anomalies)
+
+    forecast = subparsers.add_parser("forecast", help="Project monthly inflow, outflow and balance by category")
+    add_forecast_arguments(forecast)
+    forecast.set_defaults(func=cmd_forecast)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Cash-Flow Forecast - projects monthly inflow, outflow and balance by category.
+
+Works only from the month x category totals saved with the unified ledger
+(ledger_aggregates.json) and the recurring commitments saved by recurring.py,
+never from the transaction workbooks. Each category's forecast is:
+
+    seasonal average for that calendar month, blended with the trailing
+    12-month average, minus the monthly equivalent of the category's
+    recurring commitments (their timing is known, so they are added back
+    in the months they actually fall due)
+"""
+
+import argparse
+import os
+import sys
+
+import statement_paths
+from money import export_amounts, format_rupees
+from recurring import PERIODS, load_recurring
+
+FORECAST_FILE = "Cash_Flow_Forecast.xlsx"
+
+DEFAULT_MONTHS = 6
+# Complete months of history the averages are taken over
+DEFAULT_HISTORY_MONTHS = 36
+# Weight of the same-calendar-month average against the trailing 12 months
+SEASONAL_WEIGHT = 0.5
+
+
+def aggregates_to_cube(aggregates):
+    """Aggregates totals as a months x (Type, Category) frame of paise, one row per calendar month"""
+    import pandas as pd
+
+    totals = pd.DataFrame(aggregates['totals'], columns=['Month', 'Category', 'Type', 'Amount_Paise', 'Count'])
+    cube = totals.pivot_table(index='Month', columns=['Type', 'Category'], values='Amount_Paise',
+                              aggfunc='sum', fill_value=0)
+    cube.index = pd.PeriodIndex(cube.index, freq='M')
+    full_range = pd.period_range(cube.index.min(), cube.index.max(), freq='M')
+    return cube.reindex(full_range, fill_value=0)
+
+
+def seasonal_averages(history, months):
+    """Blend of same-calendar-month and trailing 12-month averages for each forecast month"""
+    import pandas as pd
+
+    trailing = history.tail(12).mean()
+    by_calendar_month = history.groupby(history.index.month).mean().reindex(range(1, 13))
+    by_calendar_month = by_calendar_month.fillna(trailing)
+
+    seasonal = by_calendar_month.loc[months.month].to_numpy()
+    blended = SEASONAL_WEIGHT * seasonal + (1 - SEASONAL_WEIGHT) * trailing.to_numpy()
+    return pd.DataFrame(blended, index=months, columns=history.columns)
+
+
+def recurring_schedule(commitments, months, after):
+    """Paise falling due after `after` per forecast month and (Type, Category), plus monthly equivalents"""
+    import pandas as pd
+
+    end = months[-1].end_time
+    due = []
+    equivalent = []
+    for row in commitments.itertuples(index=False):
+        days, _, step_months = PERIODS[row.Period]
+        step = pd.DateOffset(months=step_months) if step_months else pd.Timedelta(days=days)
+        date = pd.Timestamp(row.Next_Expected)
+        while date <= after:
+            date += step
+        while date <= end:
+            due.append((date.to_period('M'), row.Type, row.Category, row.Typical_Amount_Paise))
+            date += step
+        equivalent.append((row.Type, row.Category, row.Typical_Amount_Paise * PERIODS['Monthly'][0] / days))
+
+    due = pd.DataFrame(due, columns=['Month', 'Type', 'Category', 'Amount_Paise'])
+    scheduled = due.pivot_table(index='Month', columns=['Type', 'Category'], values='Amount_Paise',
+                                aggfunc='sum', fill_value=0) if len(due) else pd.DataFrame(index=months)
+    equivalent = pd.DataFrame(equivalent, columns=['Type', 'Category', 'Amount_Paise'])
+    monthly = equivalent.groupby(['Type', 'Category'])['Amount_Paise'].sum()
+    return scheduled.reindex(months, fill_value=0), monthly
+
+
+def forecast_cash_flow(aggregates, commitments=None, months=DEFAULT_MONTHS, history_months=DEFAULT_HISTORY_MONTHS):
+    """Return (per-category forecast, monthly summary) from the latest transaction onwards
+
+    The first month is the one the latest transaction falls in; only the days
+    after that transaction are forecast for it.
+    """
+    import numpy as np
+    import pandas as pd
+
+    cube = aggregates_to_cube(aggregates)
+    last_date = pd.Timestamp(aggregates['last_date'])
+    last_month = last_date.to_period('M')
+    # The latest month is usually only partly covered by statements
+    history = cube[cube.index < last_month].tail(history_months)
+    if history.empty:
+        history = cube
+    forecast_months = pd.period_range(last_month, periods=months, freq='M')
+
+    seasonal = seasonal_averages(history, forecast_months)
+    remaining = (last_month.days_in_month - last_date.day) / last_month.days_in_month
+    seasonal.iloc[0] *= remaining
+    if commitments is not None and len(commitments):
+        active = commitments[commitments['Status'] == 'Active']
+        scheduled, monthly_equivalent = recurring_schedule(active, forecast_months, last_date)
+    else:
+        scheduled, monthly_equivalent = pd.DataFrame(index=forecast_months), pd.Series(dtype=float)
+
+    columns = seasonal.columns.union(scheduled.columns)
+    seasonal = seasonal.reindex(columns=columns, fill_value=0)
+    scheduled = scheduled.reindex(columns=columns, fill_value=0)
+    # Recurring items are already inside the averages; take them out and put them back on their due dates
+    month_share = np.r_[remaining, np.ones(len(forecast_months) - 1)][:, None]
+    baseline = (seasonal - month_share * monthly_equivalent.reindex(columns, fill_value=0).to_numpy()).clip(lower=0)
+
+    detail = pd.concat({'Recurring_Paise': scheduled, 'Seasonal_Paise': baseline}, axis=1)
+    detail = detail.stack(['Type', 'Category'], future_stack=True).fillna(0)
+    detail['Forecast_Paise'] = detail['Recurring_Paise'] + detail['Seasonal_Paise']
+    detail = detail.round().astype('int64')
+    detail = detail[detail['Forecast_Paise'] > 0].rename_axis(['Month', 'Type', 'Category']).reset_index()
+
+    flows = detail.pivot_table(index='Month', columns='Type', values='Forecast_Paise', aggfunc='sum', fill_value=0)
+    flows = flows.reindex(index=forecast_months, columns=['Credit', 'Debit'], fill_value=0)
+    opening = sum(balance for _, balance in aggregates['balances'].values())
+    summary = pd.DataFrame({
+        'Month': forecast_months.astype(str),
+        'Inflow_Paise': flows['Credit'].to_numpy(),
+        'Outflow_Paise': flows['Debit'].to_numpy(),
+    })
+    summary['Net_Paise'] = summary['Inflow_Paise'] - summary['Outflow_Paise']
+    summary['End_Balance_Paise'] = opening + np.cumsum(summary['Net_Paise'].to_numpy())
+    detail['Month'] = detail['Month'].astype(str)
+    return detail, summary
+
+
+def save_forecast(detail, summary, output_dir=statement_paths.UNIFIED_OUTPUT_DIR):
+    import pandas as pd
+
+    output_file = os.path.join(output_dir, FORECAST_FILE)
+    with pd.ExcelWriter(output_file) as writer:
+        export_amounts(summary).to_excel(writer, sheet_name='Summary', index=False)
+        export_amounts(detail).to_excel(writer, sheet_name='By_Category', index=False)
+    return output_file
+
+
+def print_forecast(detail, summary, opening):
+    print(f"🔮 Cash-flow forecast from a balance of {format_rupees(opening, 0)}")
+    print(f"{'Month':<10}{'Inflow':>14}{'Outflow':>14}{'Net':>14}{'End balance':>16}")
+    print("-" * 68)
+    for row in summary.itertuples(index=False):
+        print(f"{row.Month:<10}{format_rupees(row.Inflow_Paise, 0):>14}{format_rupees(row.Outflow_Paise, 0):>14}"
+              f"{format_rupees(row.Net_Paise, 0):>14}{format_rupees(row.End_Balance_Paise, 0):>16}")
+
+    outflow = detail[detail['Type'] == 'Debit'].groupby('Category')['Forecast_Paise'].sum().nlargest(5)
+    print("\n💸 Largest forecast outflows:")
+    for category, amount in outflow.items():
+        print(f"  {category:<30} {format_rupees(amount / len(summary), 0):>12} a month")
+
+
+def add_arguments(parser):
+    """Register the forecast options on an argparse parser"""
+    parser.add_argument("--ledger", default=statement_paths.UNIFIED_OUTPUT_DIR, help="Unified ledger directory")
+    parser.add_argument("--months", type=int, default=DEFAULT_MONTHS,
+                        help=f"Months to forecast (default: {DEFAULT_MONTHS})")
+    parser.add_argument("--history", type=int, default=DEFAULT_HISTORY_MONTHS,
+                        help=f"Months of history to average over (default: {DEFAULT_HISTORY_MONTHS})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Forecast monthly cash flow from the unified ledger aggregates")
+    add_arguments(parser)
+    run(parser.parse_args())
+
+
+def run(args):
+    """Forecast, print and save for parsed command line arguments"""
+    from unified_ledger import load_aggregates
+
+    aggregates = load_aggregates(args.ledger)
+    if aggregates is None or not aggregates['totals']:
+        print("❌ No ledger aggregates found - run 'finance.py report' first.")
+        sys.exit(1)
+
+    commitments = load_recurring(args.ledger)
+    if commitments is None:
+        print("ℹ️  No recurring commitments saved - run 'finance.py recurring' to include them.")
+
+    detail, summary = forecast_cash_flow(aggregates, commitments, args.months, args.history)
+    print_forecast(detail, summary, sum(balance for _, balance in aggregates['balances'].values()))
+    print(f"\n✅ Saved {save_forecast(detail, summary, args.ledger)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Pipeline - runs the HDFC and SBI processing as one dependency graph.
+
+The HDFC suite and the SBI extractor used to run one after the other, so
+PDF decryption sat idle while the HDFC workbooks were written and the
+other way round. Here each bank's work is split into steps (ingest, parse,
+categorize, export) and the unified ledger steps (merge, aggregate, export)
+depend on both banks:
+
+    hdfc.ingest -> hdfc.parse -> hdfc.export_monthly
+                               -> hdfc.categorize -> hdfc.export_categorized (after export_monthly)
+    sbi.ingest  -> sbi.parse  -> sbi.export
+    hdfc.ingest + sbi.parse   -> ledger.merge -> ledger.aggregate -> ledger.export
+                                              -> ledger.anomalies
+
+An asyncio loop starts every step as soon as its inputs are ready. CPU-bound
+steps (parsing, categorizing, merging) run in a process pool and file reads
+and writes in a thread pool, so independent branches overlap. A step that
+fails skips the steps that depend on it; the others still run. The HDFC
+steps commit their files to the Organized_Statements manifest (see
+HDFC/output_tree.py) the same way the standalone scripts do. The run
+report (start offset and duration of every step) is printed and saved as
+Unified_Ledger/pipeline_report.json.
+
+With --from/--to only the exports and statements covering those months are
+read, and every output is patched for those months alone: the ledger steps
+become ledger.merge -> ledger.export (an ingest into the saved ledger, which
+scores anomalies itself) -> ledger.dashboard.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+
+import statement_paths
+
+REPORT_FILE = "pipeline_report.json"
+
+# Step kinds: 'cpu' steps run in the process pool, 'io' steps in the thread pool
+CPU = 'cpu'
+IO = 'io'
+DEFAULT_CPU_WORKERS = min(4, os.cpu_count() or 1)
+DEFAULT_IO_WORKERS = 4
+
+
+class StepSkipped(Exception):
+    """A step did not run because a step it depends on failed"""
+
+
+# Step functions are module level so the process pool can pickle them
+
+def hdfc_ingest(hdfc_dir, base_directory, start=None, end=None):
+    from consolidate_statements import read_exports
+    return read_exports(hdfc_dir, base_directory, start, end)
+
+
+def hdfc_parse(dataframes):
+    from consolidate_statements import consolidate_and_organize_by_month
+
+    if not dataframes:
+        raise ValueError("no HDFC exports found or readable")
+    return consolidate_and_organize_by_month(dataframes)
+
+
+def hdfc_export_monthly(monthly_data, tree, inputs, start=None, end=None):
+    """Write and commit the consolidate stage; returns the consolidated workbook it wrote"""
+    from consolidate_statements import CONSOLIDATE_STAGE, save_monthly_data
+
+    if start or end:
+        stage = tree.range_stage(CONSOLIDATE_STAGE)
+    else:
+        stage = tree.stage(CONSOLIDATE_STAGE, inputs)
+    save_monthly_data(monthly_data, tree.base_directory, stage, start, end)
+    stage.commit()
+    return os.path.join(tree.base_directory, 'Consolidated_Files', 'Complete_Consolidated_Statement.xlsx')
+
+
+def hdfc_categorize(monthly_data, rules_path):
+    """Categorize the consolidated HDFC rows the way categorize_transactions.py does"""
+    import pandas as pd
+    from categorization_rules import load_rules
+    from categorize_transactions import categorize_transactions
+
+    df = pd.concat(monthly_data.values(), ignore_index=True)
+    df['Date'] = pd.to_datetime(df['Date'])
+    df['Month_Year'] = df['Date'].dt.to_period('M')
+    return categorize_transactions(df, load_rules(rules_path))
+
+
+def hdfc_export_categorized(df_categorized, consolidated_file, tree, rules_path, start=None, end=None):
+    """Write and commit the categorize stage, made from the consolidated workbook just written"""
+    from categorization_rules import load_rules
+    from categorize_transactions import (CATEGORIZE_STAGE, applied_rules_differ, categorize_inputs,
+                                         save_categorized_data, save_categorized_range)
+
+    rules = load_rules(rules_path)
+    if start or end:
+        if applied_rules_differ(tree.base_directory, rules):
+            raise ValueError("rules changed since the last categorization - run without --from/--to first")
+        stage = tree.range_stage(CATEGORIZE_STAGE)
+        save_categorized_range(df_categorized, tree.base_directory, rules, start, end, stage)
+    else:
+        stage = tree.stage(CATEGORIZE_STAGE, categorize_inputs(consolidated_file, rules))
+        save_categorized_data(df_categorized, tree.base_directory, rules, stage)
+    stage.commit()
+
+
+def sbi_ingest(pdf_dir, start=None, end=None):
+    from sbi_extractor import find_pdfs
+    return sorted(find_pdfs(pdf_dir, start, end))
+
+
+def sbi_parse(pdf_files, output_dir, password=None, keyring=None):
+    """Decrypt and parse the statements; returns the extractor with its transactions converted"""
+    from sbi_extractor import SBITransactionExtractor
+
+    extractor = SBITransactionExtractor(output_dir, keyring)
+    extractor.process_pdfs(pdf_files, password)
+    # Reading the property converts the captured rows, here in the worker
+    extractor.transactions
+    # The keyring saves what it learned itself; the copy is not sent back
+    extractor.keyring = None
+    return extractor
+
+
+def sbi_export(extractor, merge_existing=False):
+    if extractor.transactions:
+        extractor.export_to_excel(merge_existing)
+        extractor.generate_report()
+
+
+def sbi_workbook_runs(excel_file):
+    from unified_ledger import load_sbi_runs_from_excel
+    return load_sbi_runs_from_excel(excel_file)
+
+
+def ledger_merge(hdfc_frames, sbi, transfer_window):
+    """Merge the HDFC exports with the SBI runs (or an extractor's transactions) into the ledger"""
+    from unified_ledger import build_ledger, hdfc_runs_from_frames, sbi_runs_from_transactions
+
+    sbi_runs = sbi if isinstance(sbi, list) else sbi_runs_from_transactions(sbi.transactions)
+    runs = hdfc_runs_from_frames(hdfc_frames) + sbi_runs
+    print(f"🔀 Merging {len(runs)} statement runs...")
+    ledger = build_ledger(runs, transfer_window=transfer_window)
+    if ledger.empty:
+        raise ValueError("no transactions found to merge")
+    return ledger
+
+
+def ledger_range_runs(hdfc_frames, sbi, start, end):
+    """The HDFC and SBI runs of a --from/--to run, cut to the range's months"""
+    from date_range import in_range
+    from unified_ledger import hdfc_runs_from_frames, sbi_runs_from_transactions
+
+    sbi_runs = sbi if isinstance(sbi, list) else sbi_runs_from_transactions(sbi.transactions)
+    runs = hdfc_runs_from_frames(hdfc_frames) + sbi_runs
+    return [run[in_range(run['Date'], start, end)] for run in runs]
+
+
+def ledger_ingest_range(runs, output_dir, transfer_window, start, end):
+    """Replace the range's months in the saved ledger; returns the months rewritten"""
+    from unified_ledger import ingest_runs
+
+    months = ingest_runs(runs, output_dir, transfer_window=transfer_window, start=start, end=end)
+    if not months:
+        raise ValueError("no transactions found in the range")
+    return months
+
+
+def ledger_aggregate(ledger):
+    from unified_ledger import build_aggregates
+    return build_aggregates(ledger)
+
+
+def ledger_export(ledger, aggregates, output_dir):
+    from unified_ledger import save_ledger
+    return save_ledger(ledger, output_dir, aggregates)
+
+
+def ledger_anomalies(ledger, output_dir):
+    from anomalies import rebuild_state
+    rebuild_state(ledger, output_dir)
+
+
+def ledger_dashboard(aggregates, output_dir):
+    """Update the dashboard (from the aggregates saved with the ledger if aggregates is a list of months)"""
+    from dashboard import update_dashboard
+    return update_dashboard(output_dir, aggregates if isinstance(aggregates, dict) else None)[0]
+
+
+def hdfc_tree(args):
+    """The Organized_Statements tree the HDFC steps write into"""
+    from output_tree import OutputTree
+    return OutputTree(os.path.join(args.hdfc_dir, "Organized_Statements"))
+
+
+def build_steps(args, keyring=None, tree=None):
+    """The pipeline graph: step name -> (kind, function, names of the steps whose results it takes)"""
+    from consolidate_statements import export_fingerprints
+
+    tree = tree or hdfc_tree(args)
+    ranged = bool(args.start or args.end)
+    steps = {
+        'hdfc.ingest': (IO, partial(hdfc_ingest, args.hdfc_dir, tree.base_directory, args.start, args.end), []),
+        'hdfc.parse': (CPU, hdfc_parse, ['hdfc.ingest']),
+        'hdfc.export_monthly': (IO, partial(hdfc_export_monthly, tree=tree, inputs=export_fingerprints(args.hdfc_dir),
+                                            start=args.start, end=args.end), ['hdfc.parse']),
+        'hdfc.categorize': (CPU, partial(hdfc_categorize, rules_path=args.rules), ['hdfc.parse']),
+        'hdfc.export_categorized': (IO, partial(hdfc_export_categorized, tree=tree, rules_path=args.rules,
+                                                start=args.start, end=args.end),
+                                    ['hdfc.categorize', 'hdfc.export_monthly']),
+    }
+
+    if args.password or keyring is not None:
+        steps['sbi.ingest'] = (IO, partial(sbi_ingest, args.sbi_pdfs, args.start, args.end), [])
+        steps['sbi.parse'] = (CPU, partial(sbi_parse, output_dir=args.sbi_output, password=args.password, keyring=keyring),
+                              ['sbi.ingest'])
+        steps['sbi.export'] = (IO, partial(sbi_export, merge_existing=ranged), ['sbi.parse'])
+        sbi_source = 'sbi.parse'
+    else:
+        # Without a password the extractor workbook from an earlier run is the SBI source
+        steps['sbi.ingest'] = (IO, partial(sbi_workbook_runs, args.sbi_excel), [])
+        sbi_source = 'sbi.ingest'
+
+    if ranged:
+        steps.update({
+            'ledger.merge': (CPU, partial(ledger_range_runs, start=args.start, end=args.end), ['hdfc.ingest', sbi_source]),
+            'ledger.export': (IO, partial(ledger_ingest_range, output_dir=args.output, transfer_window=args.transfer_window,
+                                          start=args.start, end=args.end), ['ledger.merge']),
+            'ledger.dashboard': (IO, partial(ledger_dashboard, output_dir=args.output), ['ledger.export']),
+        })
+        return steps
+
+    steps.update({
+        'ledger.merge': (CPU, partial(ledger_merge, transfer_window=args.transfer_window), ['hdfc.ingest', sbi_source]),
+        'ledger.aggregate': (CPU, ledger_aggregate, ['ledger.merge']),
+        'ledger.export': (IO, partial(ledger_export, output_dir=args.output), ['ledger.merge', 'ledger.aggregate']),
+        'ledger.anomalies': (CPU, partial(ledger_anomalies, output_dir=args.output), ['ledger.merge']),
+        'ledger.dashboard': (IO, partial(ledger_dashboard, output_dir=args.output), ['ledger.aggregate']),
+    })
+    return steps
+
+
+async def run_steps(steps, cpu_workers=DEFAULT_CPU_WORKERS, io_workers=DEFAULT_IO_WORKERS):
+    """Run every step once its dependencies have finished; return {name: report entry}"""
+    # The same start method as the categorization pool: the I/O threads may hold locks when a worker starts
+    from parallel_categorize import START_METHOD
+
+    loop = asyncio.get_running_loop()
+    report = {}
+    tasks = {}
+    started = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=cpu_workers, mp_context=multiprocessing.get_context(START_METHOD)) as cpu_pool, \
+            ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="pipeline") as io_pool:
+
+        async def run_step(name):
+            kind, func, deps = steps[name]
+            entry = report[name] = {'kind': kind, 'status': 'skipped', 'depends_on': deps}
+            try:
+                inputs = [await tasks[dep] for dep in deps]
+            except Exception as e:
+                raise StepSkipped(name) from e
+
+            entry['start'] = time.perf_counter() - started
+            try:
+                result = await loop.run_in_executor(cpu_pool if kind == CPU else io_pool, partial(func, *inputs))
+            except Exception as e:
+                entry['status'] = 'failed'
+                entry['error'] = f"{type(e).__name__}: {e}"
+                print(f"❌ {name} failed: {entry['error']}")
+                raise
+            finally:
+                entry['seconds'] = time.perf_counter() - started - entry['start']
+            entry['status'] = 'ok'
+            print(f"✅ {name} ({entry['seconds']:.2f}s)")
+            return result
+
+        # Dependencies are listed before their dependents, so every awaited task already exists
+        for name in steps:
+            tasks[name] = asyncio.ensure_future(run_step(name))
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+    report['total'] = {'seconds': time.perf_counter() - started}
+    return report
+
+
+def critical_path(report):
+    """Steps on the chain that finished last - the ones worth making faster"""
+    finished = {name: entry for name, entry in report.items() if 'seconds' in entry and 'start' in entry}
+    if not finished:
+        return []
+    name = max(finished, key=lambda step: finished[step]['start'] + finished[step]['seconds'])
+    path = [name]
+    while True:
+        deps = [dep for dep in finished[name]['depends_on'] if dep in finished]
+        if not deps:
+            return path[::-1]
+        name = max(deps, key=lambda step: finished[step]['start'] + finished[step]['seconds'])
+        path.append(name)
+
+
+def print_report(report):
+    total = report['total']['seconds']
+    print(f"\n⏱️  {'Step':<26}{'Kind':<6}{'Start':>8}{'Time':>8}  Status")
+    print("-" * 60)
+    for name, entry in report.items():
+        if name == 'total':
+            continue
+        start = f"{entry['start']:.2f}" if 'start' in entry else '-'
+        seconds = f"{entry['seconds']:.2f}" if 'seconds' in entry else '-'
+        print(f"   {name:<26}{entry['kind']:<6}{start:>8}{seconds:>8}  {entry['status']}")
+    busy = sum(entry.get('seconds', 0) for name, entry in report.items() if name != 'total')
+    print("-" * 60)
+    print(f"🏁 {total:.2f}s wall clock for {busy:.2f}s of step time ({busy / total if total else 0:.1f}x overlap)")
+    print(f"🧵 Critical path: {' -> '.join(critical_path(report))}")
+
+
+def save_report(report, output_dir=statement_paths.UNIFIED_OUTPUT_DIR):
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, REPORT_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'finished_at': datetime.now().isoformat(timespec='seconds'), 'steps': report}, f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def add_arguments(parser):
+    """Register the pipeline options on an argparse parser"""
+    from date_range import add_range_arguments
+
+    parser.add_argument("--hdfc-dir", default=statement_paths.HDFC_DIR, help="Folder with HDFC .xls/.csv exports")
+    parser.add_argument("--rules", default=os.path.join(statement_paths.HDFC_DIR, "categorization_rules.json"),
+                        help="Categorization rules file")
+    parser.add_argument("--sbi-pdfs", default=statement_paths.SBI_PDF_DIR, help="Folder with SBI statement PDFs")
+    parser.add_argument("--sbi-output", default=statement_paths.SBI_OUTPUT_DIR, help="SBI extractor output directory")
+    parser.add_argument("--sbi-excel", default=statement_paths.SBI_EXCEL_FILE,
+                        help="SBI extractor workbook (used without a password or keyring)")
+    parser.add_argument("--password", "-p", help="SBI PDF password (the keyring is used if $SBI_KEYRING_PASSPHRASE is set)")
+    add_range_arguments(parser, "statements and months")
+    parser.add_argument("--output", "-o", default=statement_paths.UNIFIED_OUTPUT_DIR, help="Unified ledger output directory")
+    parser.add_argument("--transfer-window", type=int, default=3, help="Days between the two sides of an own-account transfer (default: 3)")
+    parser.add_argument("--cpu-workers", type=int, default=DEFAULT_CPU_WORKERS,
+                        help=f"Processes for parsing and categorizing (default: {DEFAULT_CPU_WORKERS})")
+    parser.add_argument("--io-workers", type=int, default=DEFAULT_IO_WORKERS,
+                        help=f"Threads for reading and writing files (default: {DEFAULT_IO_WORKERS})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the HDFC and SBI processing concurrently as one dependency graph")
+    add_arguments(parser)
+    run(parser.parse_args())
+
+
+def run(args):
+    """Run the whole pipeline for parsed command line arguments"""
+    from sbi_keyring import load_keyring
+
+    print("🏦 STATEMENT PIPELINE")
+    print("=" * 60)
+
+    keyring = None
+    if not args.password:
+        try:
+            keyring = load_keyring()
+        except ValueError as e:
+            print(f"⚠️  Keyring not used: {e}")
+        if keyring is None:
+            print("ℹ️  No SBI password or keyring - SBI rows come from the extractor workbook")
+
+    # Organized_Statements stays locked for the run, so a concurrent consolidate or categorize waits
+    tree = hdfc_tree(args)
+    with tree.locked():
+        report = asyncio.run(run_steps(build_steps(args, keyring, tree), args.cpu_workers, args.io_workers))
+    print_report(report)
+    print(f"📋 Saved {save_report(report, args.output)}")
+    if any(entry.get('status') == 'failed' for entry in report.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
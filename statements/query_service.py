@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Query Service - read-only JSON endpoints over the unified ledger, on localhost.
+
+Answers the everyday questions (a month's total, what was spent on food,
+where a payment went) without opening the big workbooks:
+
+    GET /transactions?from=2025-01-01&to=2025-03-31&category=Food%20%26%20Dining&limit=100
+    GET /categories?from=2025-01-01&to=2025-12-31&type=Debit
+    GET /monthly?from=2024-04-01&to=2025-03-31&type=Debit
+    GET /search?q=zomato&limit=50
+
+The ledger is loaded once and kept in memory. Responses are kept in an LRU
+cache keyed by endpoint and parameters and carry an ETag, so a repeated
+request is answered from memory and a client that sends If-None-Match gets
+304 Not Modified. Every request checks the ledger workbook's size and
+modification time; when an ingest (report, watcher or pipeline) has saved a
+new ledger, it is reloaded and the cache is emptied.
+
+The server binds to 127.0.0.1 only.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import statement_paths
+
+HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_CACHE_SIZE = 256
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 10_000
+
+
+class BadRequest(ValueError):
+    """A query parameter that cannot be used"""
+
+
+def parse_day(params, name, end_of_month=False):
+    """A from/to parameter parsed like --from/--to (YYYY-MM is the month's first, or last, day)"""
+    from date_range import parse_date_argument
+
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        return parse_date_argument(value, end_of_month)
+    except argparse.ArgumentTypeError:
+        raise BadRequest(f"{name} must be a date (YYYY-MM-DD or YYYY-MM), got {value!r}")
+
+
+def parse_limit(params):
+    value = params.get('limit', str(DEFAULT_LIMIT))
+    if not value.isdigit():
+        raise BadRequest(f"limit must be a whole number, got {value!r}")
+    return min(int(value), MAX_LIMIT)
+
+
+def filtered(ledger, params):
+    """Ledger rows matching the date range, category, account, type and text parameters"""
+    from unified_ledger import query_ledger
+
+    rows = query_ledger(ledger, parse_day(params, 'from'), parse_day(params, 'to', end_of_month=True),
+                        params.get('category'), params.get('q'))
+    if params.get('account'):
+        rows = rows[rows['Account'] == params['account']]
+    if params.get('type'):
+        rows = rows[rows['Type'] == params['type'].capitalize()]
+    return rows
+
+
+def transaction_records(rows, limit):
+    from money import export_amounts
+
+    columns = ['Date', 'Account', 'Type', 'Amount', 'Balance', 'Category', 'Subcategory', 'Description']
+    page = export_amounts(rows.tail(limit))[columns]
+    page = page.assign(Date=page['Date'].dt.strftime('%Y-%m-%d'))
+    return json.loads(page.to_json(orient='records'))
+
+
+def transactions_payload(ledger, params):
+    """Ledger rows in a date range (latest `limit` rows), optionally for one category/account/type"""
+    rows = filtered(ledger, params)
+    return {'count': len(rows), 'transactions': transaction_records(rows, parse_limit(params))}
+
+
+def search_payload(ledger, params):
+    """Rows whose description contains the text in q"""
+    if not params.get('q'):
+        raise BadRequest("q is required")
+    rows = filtered(ledger, params)
+    return {'count': len(rows), 'transactions': transaction_records(rows, parse_limit(params))}
+
+
+def categories_payload(ledger, params):
+    """Total and count per category and type"""
+    from money import to_rupees
+
+    rows = filtered(ledger, params)
+    totals = rows.groupby(['Category', 'Type'])['Amount_Paise'].agg(['sum', 'size'])
+    totals = totals.sort_values('sum', ascending=False)
+    return {'categories': [{'category': category, 'type': kind, 'amount': to_rupees(int(amount)), 'count': int(count)}
+                           for (category, kind), amount, count in zip(totals.index, totals['sum'], totals['size'])]}
+
+
+def monthly_payload(ledger, params):
+    """Month x category pivot of one transaction type (Debit unless type is given)"""
+    from money import to_rupees
+
+    params = dict(params, type=params.get('type', 'Debit'))
+    rows = filtered(ledger, params)
+    pivot = rows.pivot_table(index=rows['Date'].dt.to_period('M').astype(str), columns='Category',
+                             values='Amount_Paise', aggfunc='sum', fill_value=0)
+    return {
+        'type': params['type'].capitalize(),
+        'months': list(pivot.index),
+        'categories': {category: [to_rupees(int(amount)) for amount in pivot[category]] for category in pivot.columns},
+        'totals': [to_rupees(int(amount)) for amount in pivot.sum(axis=1)],
+    }
+
+
+ENDPOINTS = {
+    '/transactions': transactions_payload,
+    '/categories': categories_payload,
+    '/monthly': monthly_payload,
+    '/search': search_payload,
+}
+
+
+def file_source(output_dir=statement_paths.UNIFIED_OUTPUT_DIR):
+    """(load, fingerprint) callables for the saved unified ledger"""
+    from output_tree import file_fingerprint
+    from unified_ledger import LEDGER_FILE, read_ledger_file
+
+    path = os.path.join(output_dir, LEDGER_FILE)
+    return partial(read_ledger_file, path), partial(file_fingerprint, path)
+
+
+class LedgerService:
+    """The in-memory ledger and an LRU cache of encoded responses, reloaded when the source changes"""
+
+    def __init__(self, load, fingerprint, cache_size=DEFAULT_CACHE_SIZE):
+        self.load = load
+        self.fingerprint = fingerprint
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.ledger = None
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+
+    def current(self):
+        """The ledger, reloaded (and the cache emptied) if the source changed since it was loaded"""
+        version = self.fingerprint()
+        with self.lock:
+            if version != self.version or self.ledger is None:
+                self.ledger = self.load()
+                self.version = version
+                self.cache.clear()
+            return self.ledger, self.version
+
+    def response(self, path, params):
+        """(ETag, JSON body) for an endpoint, from the cache when possible"""
+        ledger, version = self.current()
+        if ledger is None:
+            raise LookupError("no unified ledger found - run 'finance.py report' first")
+        key = (path, tuple(sorted(params.items())))
+        with self.lock:
+            if key in self.cache and self.version == version:
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return self.cache[key]
+            self.misses += 1
+
+        body = json.dumps(ENDPOINTS[path](ledger, params), ensure_ascii=False).encode('utf-8')
+        # Taken from the body, so a reload that changes nothing for this query keeps the ETag valid
+        etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+        with self.lock:
+            # A reload while this response was built makes it stale; do not cache it
+            if self.version == version and self.cache_size:
+                self.cache[key] = (etag, body)
+                self.cache.move_to_end(key)
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+        return etag, body
+
+    def status(self):
+        ledger, version = self.current()
+        return {
+            'endpoints': sorted(ENDPOINTS),
+            'rows': 0 if ledger is None else len(ledger),
+            'version': version,
+            'cached_responses': len(self.cache),
+            'cache_hits': self.hits,
+            'cache_misses': self.misses,
+        }
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "LedgerQuery/1"
+    # Headers and body go out as two writes; with Nagle on, keep-alive clients wait on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        # Repeated parameters keep their last value
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        service = self.server.service
+        try:
+            if url.path == '/':
+                self.send_json(200, json.dumps(service.status()).encode('utf-8'))
+                return
+            if url.path not in ENDPOINTS:
+                self.send_json(404, self.error_body(f"unknown endpoint {url.path}"))
+                return
+            etag, body = service.response(url.path, params)
+        except BadRequest as e:
+            self.send_json(400, self.error_body(str(e)))
+            return
+        except LookupError as e:
+            self.send_json(503, self.error_body(str(e)))
+            return
+
+        if etag in self.headers.get('If-None-Match', ''):
+            self.send_json(304, b'', etag)
+        else:
+            self.send_json(200, body, etag)
+
+    def error_body(self, message):
+        return json.dumps({'error': message}).encode('utf-8')
+
+    def send_json(self, status, body, etag=None):
+        self.send_response(status)
+        if status != 304:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        # Clients may keep responses but must revalidate; an unchanged ledger answers 304
+        self.send_header('Cache-Control', 'no-cache')
+        if etag:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def create_server(service, port=DEFAULT_PORT, verbose=False):
+    """A threaded HTTP server on localhost for the service (port 0 picks a free port)"""
+    server = ThreadingHTTPServer((HOST, port), QueryHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.verbose = verbose
+    return server
+
+
+def add_arguments(parser):
+    """Register the service options on an argparse parser"""
+    parser.add_argument("--ledger", default=statement_paths.UNIFIED_OUTPUT_DIR, help="Unified ledger directory")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port on 127.0.0.1 (default: {DEFAULT_PORT})")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE,
+                        help=f"Responses kept in memory (default: {DEFAULT_CACHE_SIZE})")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Log every request")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve read-only JSON queries over the unified ledger on localhost")
+    add_arguments(parser)
+    run(parser.parse_args())
+
+
+def run(args):
+    """Load the ledger and serve until interrupted, for parsed command line arguments"""
+    service = LedgerService(*file_source(args.ledger), cache_size=args.cache_size)
+    status = service.status()
+    if not status['rows']:
+        print("❌ No unified ledger found - run 'finance.py report' first.")
+        sys.exit(1)
+
+    server = create_server(service, args.port, args.verbose)
+    print(f"🌐 Serving {status['rows']} transactions on http://{HOST}:{server.server_port}/")
+    print(f"   Endpoints: {', '.join(ENDPOINTS)} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Stopped")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Recurring Payments - finds SIPs, EMIs, subscriptions and salary in the unified ledger.
+
+Rows are grouped by counterparty, direction and an amount band around the
+counterparty's median amount. Within each group the gaps between consecutive
+payments are compared with the usual billing periods. Everything is done with
+groupby aggregations over the date-ordered ledger, so the cost grows linearly
+with the number of rows - no transaction is ever compared with every other.
+"""
+
+import argparse
+import os
+import sys
+
+import statement_paths
+from counterparties import normalize_counterparties
+from money import export_amounts, format_rupees, import_amounts
+
+RECURRING_FILE = "Recurring_Commitments.xlsx"
+
+COMMITMENT_COLUMNS = [
+    'Counterparty', 'Type', 'Period', 'Occurrences', 'Typical_Amount_Paise', 'First_Date',
+    'Last_Date', 'Next_Expected', 'Regularity', 'Status', 'Account', 'Category',
+]
+
+# Period name -> (nominal days, allowed deviation in days, months to add for the next date)
+PERIODS = {
+    'Weekly': (7, 1, None),
+    'Fortnightly': (14, 2, None),
+    'Monthly': (30.4, 4, 1),
+    'Quarterly': (91, 8, 3),
+    'Half-yearly': (182, 12, 6),
+    'Yearly': (365, 20, 12),
+}
+
+MIN_OCCURRENCES = 3
+# Share of gaps that must be within the allowed deviation of the period
+MIN_REGULARITY = 0.7
+# Amounts within this factor of the counterparty's median share a band
+AMOUNT_BAND_RATIO = 1.25
+# A commitment is active until this many periods pass without a payment
+LAPSE_AFTER_PERIODS = 1.5
+
+
+def amount_bands(counterparty, direction, amount_paise):
+    """Log-scale band of each amount relative to its counterparty's median amount"""
+    import numpy as np
+
+    log_amount = np.log(amount_paise.clip(lower=1).astype(float))
+    median = log_amount.groupby([counterparty, direction]).transform('median')
+    return np.round((log_amount - median) / np.log(AMOUNT_BAND_RATIO)).astype(int)
+
+
+def classify_periods(median_gap):
+    """Name of the billing period matching each median gap (None if none does)"""
+    import numpy as np
+    import pandas as pd
+
+    conditions = [(median_gap - days).abs() <= tolerance for days, tolerance, _ in PERIODS.values()]
+    return pd.Series(np.select(conditions, list(PERIODS), default=''), index=median_gap.index).replace('', None)
+
+
+def next_dates(last_date, period, median_gap):
+    """Expected date of the next payment: calendar months for monthly and longer periods"""
+    import pandas as pd
+
+    expected = last_date + pd.to_timedelta(median_gap.round(), unit='D')
+    for name, (_, _, months) in PERIODS.items():
+        selected = period == name
+        if months and selected.any():
+            expected[selected] = last_date[selected] + pd.DateOffset(months=months)
+    return expected
+
+
+def detect_recurring(ledger, min_occurrences=MIN_OCCURRENCES, as_of=None):
+    """Return one row per recurring commitment found in a date-ordered ledger"""
+    import numpy as np
+    import pandas as pd
+
+    rows = pd.DataFrame({
+        'Counterparty': normalize_counterparties(ledger['Description']),
+        'Type': ledger['Type'],
+        'Date': ledger['Date'],
+        'Amount_Paise': ledger['Amount_Paise'],
+        'Account': ledger['Account'],
+        'Category': ledger['Category'],
+    })
+    rows = rows[(rows['Counterparty'] != '') & (rows['Amount_Paise'] > 0)]
+    rows['Band'] = amount_bands(rows['Counterparty'], rows['Type'], rows['Amount_Paise'])
+
+    keys = ['Counterparty', 'Type', 'Band']
+    # Several payments to the same payee on one day count as one occurrence
+    rows = rows.drop_duplicates(subset=keys + ['Date'])
+
+    # The ledger is in date order, so each group's rows already are too
+    rows['Gap'] = rows.groupby(keys, sort=False)['Date'].diff().dt.days
+    groups = rows.groupby(keys, sort=False)
+    summary = groups.agg(
+        Occurrences=('Date', 'size'),
+        First_Date=('Date', 'first'),
+        Last_Date=('Date', 'last'),
+        Typical_Amount_Paise=('Amount_Paise', 'median'),
+        Median_Gap=('Gap', 'median'),
+        Account=('Account', 'last'),
+        Category=('Category', 'last'),
+    )
+    summary = summary[summary['Occurrences'] >= min_occurrences].copy()
+    summary['Period'] = classify_periods(summary['Median_Gap'])
+    summary = summary[summary['Period'].notna()]
+    if summary.empty:
+        return pd.DataFrame(columns=COMMITMENT_COLUMNS)
+
+    # Regularity: share of a group's gaps that are a whole number of periods
+    # (a skipped month still counts as regular)
+    period_days = pd.DataFrame({
+        'Nominal': summary['Period'].map({name: days for name, (days, _, _) in PERIODS.items()}),
+        'Tolerance': summary['Period'].map({name: tolerance for name, (_, tolerance, _) in PERIODS.items()}),
+    })
+    gaps = rows.dropna(subset=['Gap']).join(period_days, on=keys, how='inner')
+    multiple = (gaps['Gap'] / gaps['Nominal']).round().clip(lower=1)
+    fits = (gaps['Gap'] - multiple * gaps['Nominal']).abs() <= gaps['Tolerance'] * multiple
+    summary['Regularity'] = fits.groupby([gaps[key] for key in keys]).mean()
+    summary = summary[summary['Regularity'] >= MIN_REGULARITY].copy()
+
+    as_of = pd.Timestamp(as_of) if as_of is not None else ledger['Date'].max()
+    summary['Next_Expected'] = next_dates(summary['Last_Date'], summary['Period'], summary['Median_Gap'])
+    lapsed = summary['Last_Date'] + pd.to_timedelta(summary['Median_Gap'] * LAPSE_AFTER_PERIODS, unit='D') < as_of
+    summary['Status'] = np.where(lapsed, 'Lapsed', 'Active')
+    summary['Typical_Amount_Paise'] = summary['Typical_Amount_Paise'].round().astype('int64')
+
+    summary = summary.reset_index().sort_values(['Status', 'Type', 'Typical_Amount_Paise'], ascending=[True, False, False])
+    return summary[COMMITMENT_COLUMNS].reset_index(drop=True)
+
+
+def save_recurring(commitments, output_dir=statement_paths.UNIFIED_OUTPUT_DIR):
+    """Write the recurring commitments table next to the ledger"""
+    os.makedirs(output_dir, exist_ok=True)
+    output_file = os.path.join(output_dir, RECURRING_FILE)
+    export_amounts(commitments).to_excel(output_file, index=False)
+    return output_file
+
+
+def load_recurring(output_dir=statement_paths.UNIFIED_OUTPUT_DIR):
+    """Commitments saved by the last run, or None if the detector has not been run"""
+    import pandas as pd
+
+    path = os.path.join(output_dir, RECURRING_FILE)
+    if not os.path.exists(path):
+        return None
+    return import_amounts(pd.read_excel(path), ['Typical_Amount'])
+
+
+def print_recurring(commitments):
+    """Print the active commitments and the monthly outflow they add up to"""
+    active = commitments[commitments['Status'] == 'Active']
+    print(f"🔁 {len(commitments)} recurring commitments ({len(active)} active)")
+    for row in active.itertuples(index=False):
+        print(f"  {'⬆️ ' if row.Type == 'Credit' else '⬇️ '} {row.Counterparty:<24} {row.Period:<11} "
+              f"{format_rupees(row.Typical_Amount_Paise):>14}  x{row.Occurrences:<3} next {row.Next_Expected:%d/%m/%Y}")
+
+    per_month = {name: PERIODS['Monthly'][0] / days for name, (days, _, _) in PERIODS.items()}
+    debits = active[active['Type'] == 'Debit']
+    monthly_outflow = (debits['Typical_Amount_Paise'] * debits['Period'].map(per_month)).sum()
+    print(f"💸 Active recurring debits come to about {format_rupees(monthly_outflow, 0)} a month")
+
+
+def add_arguments(parser):
+    """Register the recurring detector options on an argparse parser"""
+    parser.add_argument("--ledger", default=statement_paths.UNIFIED_OUTPUT_DIR, help="Unified ledger directory")
+    parser.add_argument("--min-occurrences", type=int, default=MIN_OCCURRENCES,
+                        help=f"Payments needed before a pattern counts (default: {MIN_OCCURRENCES})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find recurring payments and income in the unified ledger")
+    add_arguments(parser)
+    run(parser.parse_args())
+
+
+def run(args):
+    """Detect, print and save recurring commitments for parsed command line arguments"""
+    from unified_ledger import load_ledger
+
+    ledger = load_ledger(args.ledger)
+    if ledger is None:
+        print("❌ No unified ledger found - run 'finance.py report' first.")
+        sys.exit(1)
+
+    commitments = detect_recurring(ledger, args.min_occurrences)
+    print_recurring(commitments)
+    print(f"✅ Saved {save_recurring(commitments, args.ledger)}")
+
+
+if __name__ == "__main__":
+    main()
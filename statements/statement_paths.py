@@ -0,0 +1,24 @@
+"""
+Shared locations for the cross-bank tools in this folder.
+
+Importing this module makes the HDFC and SBI scripts importable, so the
+unified tools can reuse their readers and parsers directly.
+"""
+
+import os
+import sys
+
+STATEMENTS_DIR = os.path.dirname(os.path.abspath(__file__))
+HDFC_DIR = os.path.join(STATEMENTS_DIR, "HDFC")
+SBI_DIR = os.path.join(STATEMENTS_DIR, "SBI")
+
+HDFC_OUTPUT_DIR = os.path.join(HDFC_DIR, "Organized_Statements")
+SBI_PDF_DIR = os.path.join(SBI_DIR, "statements")
+SBI_OUTPUT_DIR = os.path.join(SBI_DIR, "extracted_transactions")
+SBI_EXCEL_FILE = os.path.join(SBI_OUTPUT_DIR, "excel_files", "SBI_All_Transactions.xlsx")
+
+UNIFIED_OUTPUT_DIR = os.path.join(STATEMENTS_DIR, "Unified_Ledger")
+
+for _bank_dir in (HDFC_DIR, SBI_DIR):
+    if _bank_dir not in sys.path:
+        sys.path.insert(0, _bank_dir)
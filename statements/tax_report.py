@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Tax Report - income and investment totals per Indian financial year (April-March).
+
+Works from the per-financial-year rollup saved with the ledger aggregates
+(built in the same groupby as the monthly totals), never from the
+transaction rows. For each financial year it reports the heads that matter
+when filing: salary, savings bank interest, dividends, other income and
+investments, plus every category and month of the year, and writes one
+workbook per financial year (Tax_Reports/FY2024-25.xlsx).
+"""
+
+import argparse
+import os
+import sys
+
+import statement_paths
+from money import export_amounts, format_rupees
+
+TAX_REPORTS_DIR = "Tax_Reports"
+
+# The Indian financial year runs from April to March
+FY_START_MONTH = 4
+
+# (head, type, category, subcategory or None for any) - a row counts towards the first head it matches
+TAX_HEADS = [
+    ('Salary', 'Credit', 'Income & Salary', 'Salary/Income Transfer'),
+    ('Savings Bank Interest', 'Credit', 'Banking & Finance', 'Bank Interest'),
+    ('Dividends', 'Credit', 'Banking & Finance', 'Dividend Income'),
+    ('Other Income', 'Credit', 'Income & Salary', None),
+    ('Investments', 'Debit', 'Investments & Savings', None),
+    ('Investments', 'Debit', 'Banking & Finance', 'Trading/Investment'),
+]
+
+FY_COLUMNS = ['Financial_Year', 'Category', 'Subcategory', 'Type', 'Amount_Paise', 'Count']
+
+
+def fiscal_years(months):
+    """Series of 'YYYY-MM' month labels -> 'FY2024-25' style financial year labels"""
+    year = months.str[:4].astype(int)
+    start = year - (months.str[5:7].astype(int) < FY_START_MONTH)
+    return 'FY' + start.astype(str) + '-' + ((start + 1) % 100).astype(str).str.zfill(2)
+
+
+def fiscal_year_months(label):
+    """'YYYY-MM' labels of the twelve months of a financial year"""
+    import pandas as pd
+
+    start = int(label[2:6])
+    return [str(month) for month in pd.period_range(f"{start}-{FY_START_MONTH:02d}", periods=12, freq='M')]
+
+
+def fy_frame(aggregates):
+    """The saved per-financial-year rollup as a DataFrame"""
+    import pandas as pd
+
+    return pd.DataFrame(aggregates.get('fiscal_years', []), columns=FY_COLUMNS)
+
+
+def tax_heads(rollup):
+    """Amount and count per tax head for one financial year's rollup rows"""
+    import pandas as pd
+
+    heads = {}
+    claimed = pd.Series(False, index=rollup.index)
+    for head, kind, category, subcategory in TAX_HEADS:
+        match = (rollup['Type'] == kind) & (rollup['Category'] == category) & ~claimed
+        if subcategory is not None:
+            match &= rollup['Subcategory'] == subcategory
+        claimed |= match
+        amount, count = heads.get(head, (0, 0))
+        heads[head] = (amount + int(rollup.loc[match, 'Amount_Paise'].sum()), count + int(rollup.loc[match, 'Count'].sum()))
+    return pd.DataFrame([(head, amount, count) for head, (amount, count) in heads.items()],
+                        columns=['Head', 'Amount_Paise', 'Count'])
+
+
+def monthly_flows(aggregates, label):
+    """Inflow, outflow and net for each month of a financial year"""
+    import pandas as pd
+
+    months = fiscal_year_months(label)
+    totals = pd.DataFrame(aggregates['totals'], columns=['Month', 'Category', 'Type', 'Amount_Paise', 'Count'])
+    flows = totals[totals['Month'].isin(months)].pivot_table(index='Month', columns='Type', values='Amount_Paise',
+                                                             aggfunc='sum', fill_value=0)
+    flows = flows.reindex(index=months, columns=['Credit', 'Debit'], fill_value=0)
+    monthly = pd.DataFrame({'Month': months, 'Inflow_Paise': flows['Credit'].to_numpy(),
+                            'Outflow_Paise': flows['Debit'].to_numpy()})
+    monthly['Net_Paise'] = monthly['Inflow_Paise'] - monthly['Outflow_Paise']
+    return monthly
+
+
+def save_tax_report(aggregates, label, rollup, output_dir=statement_paths.UNIFIED_OUTPUT_DIR):
+    """Write one financial year's workbook: tax heads, categories and months"""
+    import pandas as pd
+
+    from output_tree import atomic_path
+
+    reports_dir = os.path.join(output_dir, TAX_REPORTS_DIR)
+    os.makedirs(reports_dir, exist_ok=True)
+    output_file = os.path.join(reports_dir, f"{label}.xlsx")
+    categories = rollup.drop(columns='Financial_Year').sort_values(['Type', 'Amount_Paise'], ascending=[True, False])
+    with atomic_path(output_file) as tmp_path:
+        with pd.ExcelWriter(tmp_path) as writer:
+            export_amounts(tax_heads(rollup)).to_excel(writer, sheet_name='Tax_Summary', index=False)
+            export_amounts(categories).to_excel(writer, sheet_name='By_Category', index=False)
+            export_amounts(monthly_flows(aggregates, label)).to_excel(writer, sheet_name='Monthly', index=False)
+    return output_file
+
+
+def print_tax_heads(label, heads):
+    print(f"\n🧾 {label}")
+    for row in heads.itertuples(index=False):
+        print(f"  {row.Head:<24}{format_rupees(row.Amount_Paise):>16}  ({row.Count} transactions)")
+
+
+def add_arguments(parser):
+    """Register the tax report options on an argparse parser"""
+    parser.add_argument("--ledger", default=statement_paths.UNIFIED_OUTPUT_DIR, help="Unified ledger directory")
+    parser.add_argument("--fy", help="Only this financial year, e.g. 2024-25 (default: every year in the ledger)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Income and investment totals per Indian financial year")
+    add_arguments(parser)
+    run(parser.parse_args())
+
+
+def run(args):
+    """Print and save the financial-year reports for parsed command line arguments"""
+    from unified_ledger import load_aggregates
+
+    aggregates = load_aggregates(args.ledger)
+    if aggregates is None or 'fiscal_years' not in aggregates:
+        print("❌ No financial-year totals found - run 'finance.py report' first.")
+        sys.exit(1)
+
+    rollups = fy_frame(aggregates)
+    labels = sorted(rollups['Financial_Year'].unique())
+    if args.fy:
+        wanted = args.fy if args.fy.upper().startswith('FY') else f"FY{args.fy}"
+        if wanted.upper() not in labels:
+            print(f"❌ No transactions in {wanted} (the ledger covers {', '.join(labels)})")
+            sys.exit(1)
+        labels = [wanted.upper()]
+
+    for label in labels:
+        rollup = rollups[rollups['Financial_Year'] == label]
+        print_tax_heads(label, tax_heads(rollup))
+        print(f"  ✅ Saved {save_tax_report(aggregates, label, rollup, args.ledger)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Transfers - pairs money moved between our own accounts.
+
+A transfer from HDFC to SBI is a debit in one account and a credit of the
+same amount in another a day or two later. Left unmatched, it counts once as
+spending and once as income. Pairs are found in two passes, neither of
+which compares rows pairwise:
+
+  1. both sides carry the same UPI/IMPS reference number (an equi-join)
+  2. the remaining debits and credits of each pair of accounts are joined
+     with a sorted as-of join on date, by amount, nearest date within the
+     window - only for amounts large enough that a coincidence is unlikely
+
+Matched rows are moved to the Self Transfer category, which the aggregates
+leave out.
+"""
+
+TRANSFER_CATEGORY = 'Self Transfer'
+DEFAULT_WINDOW_DAYS = 3
+# Amount-only matches below this are too likely to be unrelated payments
+MIN_AMOUNT_MATCH_PAISE = 1000 * 100
+
+# 12-digit UPI RRN / IMPS reference, as printed by both banks
+REFERENCE_PATTERN = r'(?<!\d)(\d{12})(?!\d)'
+PAIR_COLUMNS = ['Row_Debit', 'Row_Credit', 'Account_Debit', 'Account_Credit']
+
+
+def reference_pairs(debits, credits, window):
+    """Debit/credit pairs in different accounts sharing a reference number and amount"""
+    pairs = debits.dropna(subset=['Reference']).merge(
+        credits.dropna(subset=['Reference']), on=['Reference', 'Amount_Paise'], suffixes=('_Debit', '_Credit'))
+    pairs = pairs[(pairs['Account_Debit'] != pairs['Account_Credit']) &
+                  ((pairs['Date_Debit'] - pairs['Date_Credit']).abs() <= window)]
+    return pairs.drop_duplicates('Row_Debit').drop_duplicates('Row_Credit')[PAIR_COLUMNS]
+
+
+def candidate_pairs(debits, credits, accounts, window):
+    """Nearest same-amount credit in every other account for each debit"""
+    import pandas as pd
+
+    matches = []
+    for debit_account in accounts:
+        left = debits[debits['Account'] == debit_account]
+        if left.empty:
+            continue
+        for credit_account in accounts:
+            right = credits[credits['Account'] == credit_account]
+            if credit_account == debit_account or right.empty:
+                continue
+            matched = pd.merge_asof(left, right.assign(Credit_Date=right['Date']), on='Date', by='Amount_Paise',
+                                    direction='nearest', tolerance=window, suffixes=('_Debit', '_Credit'))
+            matches.append(matched.dropna(subset=['Row_Credit']))
+
+    if not matches:
+        return pd.DataFrame(columns=PAIR_COLUMNS + ['Gap'])
+    pairs = pd.concat(matches, ignore_index=True)
+    # Two different reference numbers mean two unrelated payments
+    pairs = pairs[pairs['Reference_Debit'].isna() | pairs['Reference_Credit'].isna() |
+                  (pairs['Reference_Debit'] == pairs['Reference_Credit'])].copy()
+    pairs['Gap'] = (pairs['Date'] - pairs['Credit_Date']).abs()
+    return pairs
+
+
+def match_transfers(ledger, window_days=DEFAULT_WINDOW_DAYS):
+    """DataFrame of matched (Row_Debit, Row_Credit) ledger index pairs and their accounts
+
+    Each as-of round pairs every debit with its nearest candidate and keeps
+    the closest pair per credit; debits that lost their credit to a closer
+    debit try again with what is left.
+    """
+    import pandas as pd
+
+    window = pd.Timedelta(days=window_days)
+    open_rows = ledger[(ledger['Category'] != TRANSFER_CATEGORY) & (ledger['Amount_Paise'] > 0)]
+    open_rows = open_rows[['Date', 'Account', 'Type', 'Amount_Paise']].assign(
+        Reference=open_rows['Description'].astype(object).str.extract(REFERENCE_PATTERN, expand=False))
+    open_rows = open_rows.rename_axis('Row').reset_index().sort_values('Date', kind='stable')
+    debits = open_rows[open_rows['Type'] == 'Debit'].drop(columns='Type')
+    credits = open_rows[open_rows['Type'] == 'Credit'].drop(columns='Type')
+    accounts = list(ledger['Account'].unique())
+
+    rounds = [reference_pairs(debits, credits, window)]
+    debits = debits[~debits['Row'].isin(rounds[0]['Row_Debit']) & (debits['Amount_Paise'] >= MIN_AMOUNT_MATCH_PAISE)]
+    credits = credits[~credits['Row'].isin(rounds[0]['Row_Credit']) & (credits['Amount_Paise'] >= MIN_AMOUNT_MATCH_PAISE)]
+    while len(debits) and len(credits):
+        pairs = candidate_pairs(debits, credits, accounts, window)
+        pairs = pairs.sort_values(['Gap', 'Row_Debit'], kind='stable')
+        pairs = pairs.drop_duplicates('Row_Debit').drop_duplicates('Row_Credit')
+        if pairs.empty:
+            break
+        rounds.append(pairs[PAIR_COLUMNS])
+        debits = debits[~debits['Row'].isin(pairs['Row_Debit'])]
+        credits = credits[~credits['Row'].isin(pairs['Row_Credit'])]
+
+    matched = pd.concat(rounds, ignore_index=True)
+    return matched.astype({'Row_Debit': 'int64', 'Row_Credit': 'int64'})
+
+
+def tag_transfers(ledger, window_days=DEFAULT_WINDOW_DAYS):
+    """Move matched transfer pairs to the Self Transfer category; return the ledger index of tagged rows"""
+    import pandas as pd
+
+    pairs = match_transfers(ledger, window_days)
+    if pairs.empty:
+        return pairs['Row_Debit']
+
+    ledger.loc[pairs['Row_Debit'], 'Category'] = TRANSFER_CATEGORY
+    ledger.loc[pairs['Row_Debit'], 'Subcategory'] = ('To ' + pairs['Account_Credit']).to_numpy()
+    ledger.loc[pairs['Row_Credit'], 'Category'] = TRANSFER_CATEGORY
+    ledger.loc[pairs['Row_Credit'], 'Subcategory'] = ('From ' + pairs['Account_Debit']).to_numpy()
+    print(f"🔄 Matched {len(pairs)} transfers between own accounts")
+    return pd.concat([pairs['Row_Debit'], pairs['Row_Credit']], ignore_index=True)
@@ -0,0 +1,498 @@
+#!/usr/bin/env python3
+"""
+Unified Ledger - merges HDFC and SBI statements into one chronological ledger.
+
+Every statement is normalized into the same schema and is already in date
+order, so the ledger is built with a k-way heap merge of those runs instead
+of concatenating everything and sorting it again.
+"""
+
+import argparse
+import heapq
+import itertools
+import json
+import os
+
+import statement_paths
+from anomalies import process_new_rows, rebuild_state
+from counterparties import normalize_counterparties
+from date_range import add_range_arguments, in_range, is_ranged, range_label
+from money import export_amounts, format_rupees, import_amounts, to_paise
+from output_tree import write_excel
+from sbi_keyring import load_keyring
+from sbi_statement_index import parse_statement_name
+from tax_report import fiscal_years
+from transfers import DEFAULT_WINDOW_DAYS, TRANSFER_CATEGORY, tag_transfers
+
+LEDGER_FILE = "Complete_Unified_Ledger.xlsx"
+
+# Amounts are int64 paise in memory; the workbooks hold rupees in Amount/Balance
+LEDGER_COLUMNS = [
+    'Date', 'Bank', 'Account', 'Description', 'Type', 'Amount_Paise', 'Balance_Paise',
+    'Category', 'Subcategory', 'Source_File', 'Source_Row',
+]
+
+# Columns that identify the same transaction when statements overlap
+DEDUP_COLUMNS = ['Bank', 'Account', 'Date', 'Description', 'Type', 'Amount_Paise', 'Balance_Paise']
+
+# Month x category totals and latest balances, kept beside the ledger for the forecast
+AGGREGATES_FILE = "ledger_aggregates.json"
+
+
+def normalize_hdfc_statement(df, source_file):
+    """Map an HDFC export (Date/Narration/Withdrawal Amt./Deposit Amt.) onto the ledger schema
+
+    Source_Row is the row's position in the export (the frame's index), so it
+    is the same whether the export was read whole or cut to a --from/--to range.
+    """
+    import pandas as pd
+
+    withdrawals = to_paise(df['Withdrawal Amt.'])
+    deposits = pd.to_numeric(df['Deposit Amt.'], errors='coerce')
+
+    run = pd.DataFrame({
+        'Date': pd.to_datetime(df['Date'], format='%d/%m/%y', errors='coerce'),
+        'Bank': 'HDFC',
+        'Account': 'HDFC',
+        'Description': df['Narration'].astype(object),
+        'Type': deposits.notna().map({True: 'Credit', False: 'Debit'}),
+        'Amount_Paise': withdrawals + to_paise(deposits),
+        'Balance_Paise': to_paise(df['Closing Balance']),
+        'Source_File': source_file,
+        'Source_Row': df.index.to_numpy(),
+    })
+    return run[run['Date'].notna()].reset_index(drop=True)
+
+
+def normalize_sbi_statement(df, source_file):
+    """Map SBI extractor rows (Date/Description/Type/Amount/Balance) onto the ledger schema"""
+    import pandas as pd
+
+    dates = df['Date']
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates, format='%d/%m/%Y', errors='coerce')
+    # Parsed PDFs carry paise already; the extractor workbook has rupees
+    if 'Amount_Paise' not in df.columns:
+        df = import_amounts(df, ['Amount', 'Balance'])
+
+    run = pd.DataFrame({
+        'Date': dates,
+        'Bank': 'SBI',
+        'Account': sbi_account_from_filename(source_file),
+        'Description': df['Description'].astype(object),
+        'Type': df['Type'].astype(object),
+        'Amount_Paise': df['Amount_Paise'].astype('int64'),
+        'Balance_Paise': df['Balance_Paise'].astype('int64'),
+        'Source_File': source_file,
+        'Source_Row': range(len(df)),
+    })
+    return run[run['Date'].notna()].reset_index(drop=True)
+
+
+def sbi_account_from_filename(filename):
+    """SBI statement names start with the 11-digit account number (e.g. 88673015778...)"""
+    parsed = parse_statement_name(filename)
+    if parsed:
+        return f"SBI-{parsed[0][-4:]}"
+    return 'SBI'
+
+
+def load_hdfc_runs(directory_path=statement_paths.HDFC_DIR, start=None, end=None):
+    """Read each HDFC export as one normalized, date-ordered run (only those covering start to end, if given)"""
+    from consolidate_statements import read_exports
+
+    # The export periods the HDFC scripts remember let a range skip exports unread
+    base_directory = os.path.join(directory_path, "Organized_Statements")
+    return hdfc_runs_from_frames(read_exports(directory_path, base_directory, start, end))
+
+
+def hdfc_runs_from_frames(dataframes):
+    """Normalize HDFC exports already read by consolidate_statements, one run per file"""
+    runs = []
+    for df in dataframes:
+        source_file = df['Source_File'].iloc[0] if len(df) else ''
+        runs.append(normalize_hdfc_statement(df, source_file))
+    return runs
+
+
+def load_sbi_runs_from_excel(excel_file=statement_paths.SBI_EXCEL_FILE):
+    """Read the SBI extractor workbook and split it back into per-statement runs"""
+    import pandas as pd
+
+    if not os.path.exists(excel_file):
+        print(f"⚠️  SBI workbook not found: {excel_file}")
+        return []
+
+    df = pd.read_excel(excel_file, sheet_name='All_Transactions')
+    print(f"📄 Read {len(df)} SBI transactions from {os.path.basename(excel_file)}")
+    return [
+        normalize_sbi_statement(group, source_file)
+        for source_file, group in df.groupby('Source_File', sort=True)
+    ]
+
+
+def load_sbi_runs_from_pdfs(pdf_dir, password=None, keyring=None, start=None, end=None):
+    """Decrypt and parse SBI PDFs directly (with the password or the keyring), one run per statement
+
+    With start or end, statements whose file name puts them outside the
+    range are not decrypted.
+    """
+    from sbi_extractor import SBITransactionExtractor, find_pdfs
+
+    extractor = SBITransactionExtractor(statement_paths.SBI_OUTPUT_DIR, keyring)
+    for pdf_path in sorted(find_pdfs(pdf_dir, start, end)):
+        extractor.process_single_pdf(pdf_path, password)
+    return sbi_runs_from_transactions(extractor.transactions)
+
+
+def sbi_runs_from_transactions(transactions):
+    """Split parsed SBI transactions (extractor rows) into one run per statement"""
+    import pandas as pd
+
+    if not transactions:
+        return []
+
+    # Every statement's rows are converted in one batch, then split back into runs
+    df = pd.DataFrame(transactions)
+    return [
+        normalize_sbi_statement(group, source_file)
+        for source_file, group in df.groupby('Source_File', sort=True)
+    ]
+
+
+def load_statement_file(path, password=None, keyring=None):
+    """Normalize a single HDFC export or SBI PDF into one run (None if nothing was read)"""
+    import pandas as pd
+
+    filename = os.path.basename(path)
+
+    if path.lower().endswith('.pdf'):
+        if not password and keyring is None:
+            print(f"⚠️  Skipping {filename}: no SBI PDF password or keyring available")
+            return None
+        from sbi_extractor import SBITransactionExtractor
+
+        extractor = SBITransactionExtractor(statement_paths.SBI_OUTPUT_DIR, keyring)
+        extractor.process_single_pdf(path, password)
+        if not extractor.transactions:
+            return None
+        return normalize_sbi_statement(pd.DataFrame(extractor.transactions), filename)
+
+    from consolidate_statements import read_excel_file
+    return normalize_hdfc_statement(read_excel_file(path), filename)
+
+
+def ensure_date_sorted(run):
+    """Return the run in date order (statements normally already are)"""
+    if run['Date'].is_monotonic_increasing:
+        return run
+    print(f"⚠️  {run['Source_File'].iloc[0]} is not in date order - sorting this statement only")
+    return run.sort_values('Date', kind='stable').reset_index(drop=True)
+
+
+def merge_sorted_runs(runs):
+    """K-way merge of date-sorted runs into a single chronologically ordered frame
+
+    Runs on the same date keep their input order, and rows keep their order
+    within a run, so the merge is stable. Cost is O(n log k) for n rows in
+    k runs, instead of a full sort of the concatenated data.
+    """
+    import pandas as pd
+
+    runs = [ensure_date_sorted(run) for run in runs if len(run)]
+    if not runs:
+        return pd.DataFrame(columns=LEDGER_COLUMNS)
+
+    keyed_runs = []
+    offsets = []
+    offset = 0
+    for run_id, run in enumerate(runs):
+        date_keys = run['Date'].to_numpy(dtype='datetime64[ns]').astype('int64').tolist()
+        keyed_runs.append(zip(date_keys, itertools.repeat(run_id), range(len(run))))
+        offsets.append(offset)
+        offset += len(run)
+
+    positions = [offsets[run_id] + row for _, run_id, row in heapq.merge(*keyed_runs)]
+
+    combined = pd.concat(runs, ignore_index=True)
+    return combined.take(positions).reset_index(drop=True)
+
+
+def categorize_ledger(ledger, rules=None):
+    """Attach Category/Subcategory using the shared categorization rules"""
+    from categorization_rules import load_rules
+
+    if rules is None:
+        rules = load_rules()
+    ledger['Category'], ledger['Subcategory'] = rules.apply(ledger['Description'])
+    return ledger
+
+
+def build_ledger(runs, rules=None, transfer_window=DEFAULT_WINDOW_DAYS):
+    """Merge normalized runs, drop overlapping duplicates, categorize and match own-account transfers"""
+    ledger = merge_sorted_runs(runs)
+
+    before = len(ledger)
+    ledger = ledger.drop_duplicates(subset=DEDUP_COLUMNS, keep='first').reset_index(drop=True)
+    if before != len(ledger):
+        print(f"🔁 Dropped {before - len(ledger)} duplicate rows from overlapping statements")
+
+    ledger = categorize_ledger(ledger, rules)
+    tag_transfers(ledger, transfer_window)
+    return ledger[LEDGER_COLUMNS]
+
+
+def save_ledger(ledger, output_dir=statement_paths.UNIFIED_OUTPUT_DIR, aggregates=None):
+    """Write the complete ledger and one workbook per month (and the aggregates, built here if not given)"""
+    monthly_dir = os.path.join(output_dir, "Monthly_Files")
+    os.makedirs(monthly_dir, exist_ok=True)
+
+    complete_file = os.path.join(output_dir, LEDGER_FILE)
+    write_ledger_file(ledger, complete_file)
+    print(f"✅ Saved unified ledger: {complete_file} ({len(ledger)} transactions)")
+
+    # The ledger is already in date order, so each month is a contiguous slice
+    months = ledger['Date'].dt.to_period('M')
+    for month, month_data in ledger.groupby(months, sort=False):
+        month_file = os.path.join(monthly_dir, f"Ledger_{month}.xlsx")
+        write_ledger_file(month_data, month_file)
+        print(f"  Saved {month}: {len(month_data)} transactions")
+
+    save_aggregates(ledger, output_dir, aggregates)
+    return complete_file
+
+
+def ingest_runs(runs, output_dir=statement_paths.UNIFIED_OUTPUT_DIR, rules=None, transfer_window=DEFAULT_WINDOW_DAYS,
+                start=None, end=None):
+    """Merge new statement runs into an existing saved ledger
+
+    Only the month workbooks touched by the new rows are rewritten. Rows that
+    came from the same source files before (a re-exported or modified
+    statement) are replaced rather than duplicated; with start or end, every
+    saved row in the range's months is replaced instead (a --from/--to
+    rebuild). Transfers are matched across the whole ledger, since the other
+    side may already be in it. Rows the ledger did not have before are
+    scored for anomalies.
+    """
+    runs = [run for run in runs if run is not None and len(run)]
+    if not runs:
+        return []
+
+    new_rows = categorize_ledger(merge_sorted_runs(runs), rules)[LEDGER_COLUMNS]
+    source_files = set(new_rows['Source_File'])
+
+    complete_file = os.path.join(output_dir, LEDGER_FILE)
+    existing = read_ledger_file(complete_file)
+    if existing is None:
+        existing = new_rows.iloc[0:0]
+    if is_ranged(start, end):
+        replaced = in_range(existing['Date'], start, end)
+    else:
+        replaced = existing['Source_File'].isin(source_files)
+
+    ledger = merge_sorted_runs([existing[~replaced], new_rows])
+    ledger = ledger.drop_duplicates(subset=DEDUP_COLUMNS, keep='first')[LEDGER_COLUMNS]
+    transfers = tag_transfers(ledger, transfer_window)
+    seen = ledger[DEDUP_COLUMNS].merge(existing[DEDUP_COLUMNS].drop_duplicates(), how='left', indicator=True)
+    added = ledger[(seen['_merge'] == 'left_only').to_numpy()]
+
+    # Months that gained rows, lost rows from a replaced file, or had rows matched as transfers
+    ledger_months = ledger['Date'].dt.to_period('M')
+    affected_months = sorted(set(new_rows['Date'].dt.to_period('M')) |
+                             set(existing.loc[replaced, 'Date'].dt.to_period('M')) |
+                             set(ledger_months[transfers]))
+
+    monthly_dir = os.path.join(output_dir, "Monthly_Files")
+    os.makedirs(monthly_dir, exist_ok=True)
+    for month in affected_months:
+        month_file = os.path.join(monthly_dir, f"Ledger_{month}.xlsx")
+        month_data = ledger[ledger_months == month]
+        if month_data.empty:
+            if os.path.exists(month_file):
+                os.remove(month_file)
+            continue
+        write_ledger_file(month_data, month_file)
+        print(f"  Updated {month}: {len(month_data)} transactions")
+
+    write_ledger_file(ledger, complete_file)
+    save_aggregates(ledger, output_dir)
+    print(f"✅ Ingested {len(new_rows)} transactions from {len(source_files)} file(s) into {complete_file}")
+    process_new_rows(added, output_dir)
+
+    return [str(month) for month in affected_months]
+
+
+def read_ledger_file(path):
+    """Read a saved ledger workbook, or None if it does not exist"""
+    import pandas as pd
+
+    if not os.path.exists(path):
+        return None
+    ledger = import_amounts(pd.read_excel(path), ['Amount', 'Balance'])
+    ledger['Date'] = pd.to_datetime(ledger['Date'])
+    return ledger
+
+
+def write_ledger_file(ledger, path):
+    """Write ledger rows to a workbook, with amounts in rupees (through a temporary file, so readers never see half of it)"""
+    write_excel(export_amounts(ledger), path, index=False)
+
+
+def build_aggregates(ledger):
+    """Monthly and financial-year totals per category, spend per counterparty, and balances
+
+    Transfers between own accounts are neither spending nor income, so they
+    are left out of the totals and the counterparties. The rows are grouped
+    once, by month, category, subcategory and type; the monthly and
+    financial-year totals are rolled up from that small frame.
+    """
+    flows = ledger[ledger['Category'] != TRANSFER_CATEGORY]
+    months = flows['Date'].dt.to_period('M').astype(str).rename('Month')
+    detail = (flows.groupby([months, flows['Category'].fillna('Uncategorized').rename('Category'),
+                             flows['Subcategory'].fillna('').rename('Subcategory'), 'Type'])['Amount_Paise']
+                   .agg(['sum', 'size']).reset_index())
+    totals = detail.groupby(['Month', 'Category', 'Type'])[['sum', 'size']].sum()
+    fiscal = detail.groupby([fiscal_years(detail['Month']).rename('Financial_Year'),
+                             'Category', 'Subcategory', 'Type'])[['sum', 'size']].sum()
+
+    debits = flows['Type'] == 'Debit'
+    counterparty = normalize_counterparties(flows.loc[debits, 'Description']).rename('Counterparty')
+    named = counterparty != ''
+    merchants = (flows.loc[debits, 'Amount_Paise'][named]
+                 .groupby([months[debits][named], counterparty[named]]).agg(['sum', 'size']))
+
+    latest = ledger.groupby('Account', sort=False)[['Date', 'Balance_Paise']].last()
+    month_end = ledger.groupby([ledger['Date'].dt.to_period('M').astype(str), 'Account'])['Balance_Paise'].last()
+    return {
+        'last_date': ledger['Date'].max().strftime('%Y-%m-%d'),
+        'totals': [[month, category, kind, int(amount), int(count)]
+                   for (month, category, kind), amount, count in zip(totals.index, totals['sum'], totals['size'])],
+        'balances': {account: [date.strftime('%Y-%m-%d'), int(balance)]
+                     for account, date, balance in latest.itertuples()},
+        # Debits per month and counterparty, and each account's balance at the end of each month
+        'merchants': [[month, name, int(amount), int(count)]
+                      for (month, name), amount, count in zip(merchants.index, merchants['sum'], merchants['size'])],
+        'month_end_balances': [[month, account, int(balance)] for (month, account), balance in month_end.items()],
+        # April-March financial years, per category and subcategory (for the tax heads)
+        'fiscal_years': [[year, category, subcategory, kind, int(amount), int(count)]
+                         for (year, category, subcategory, kind), amount, count
+                         in zip(fiscal.index, fiscal['sum'], fiscal['size'])],
+    }
+
+
+def save_aggregates(ledger, output_dir=statement_paths.UNIFIED_OUTPUT_DIR, aggregates=None):
+    """Write the ledger aggregates as JSON next to the ledger"""
+    path = os.path.join(output_dir, AGGREGATES_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(aggregates if aggregates is not None else build_aggregates(ledger), f)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_aggregates(output_dir=statement_paths.UNIFIED_OUTPUT_DIR):
+    """Aggregates saved with the ledger, or None if the ledger predates them"""
+    path = os.path.join(output_dir, AGGREGATES_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def print_ledger_summary(ledger):
+    """Print per-bank totals for the unified ledger"""
+    print("\n" + "=" * 60)
+    print("📊 UNIFIED LEDGER SUMMARY")
+    print("=" * 60)
+    if ledger.empty:
+        print("No transactions.")
+        return
+
+    print(f"📅 Date Range: {ledger['Date'].min().strftime('%d/%m/%Y')} to {ledger['Date'].max().strftime('%d/%m/%Y')}")
+    totals = ledger.pivot_table(index=['Bank', 'Account'], columns='Type', values='Amount_Paise', aggfunc='sum', fill_value=0)
+    for (bank, account), row in totals.iterrows():
+        credits = row.get('Credit', 0)
+        debits = row.get('Debit', 0)
+        print(f"🏦 {account}: Credits {format_rupees(credits)} | Debits {format_rupees(debits)} | Net {format_rupees(credits - debits)}")
+
+
+def load_ledger(output_dir=statement_paths.UNIFIED_OUTPUT_DIR):
+    """Read a previously saved unified ledger"""
+    return read_ledger_file(os.path.join(output_dir, LEDGER_FILE))
+
+
+def query_ledger(ledger, start=None, end=None, category=None, text=None):
+    """Filter the ledger by date range, category and description text"""
+    import pandas as pd
+
+    mask = pd.Series(True, index=ledger.index)
+    if start is not None:
+        mask &= ledger['Date'] >= pd.Timestamp(start)
+    if end is not None:
+        mask &= ledger['Date'] <= pd.Timestamp(end)
+    if category:
+        mask &= ledger['Category'].str.lower() == category.lower()
+    if text:
+        mask &= ledger['Description'].astype(str).str.contains(text, case=False, regex=False)
+    return ledger[mask]
+
+
+def add_arguments(parser):
+    """Register the ledger build options on an argparse parser"""
+    parser.add_argument("--hdfc-dir", default=statement_paths.HDFC_DIR, help="Folder with HDFC .xls/.csv exports")
+    parser.add_argument("--sbi-excel", default=statement_paths.SBI_EXCEL_FILE, help="SBI extractor workbook (used without a password or keyring)")
+    parser.add_argument("--sbi-pdfs", default=statement_paths.SBI_PDF_DIR, help="Folder with SBI statement PDFs")
+    parser.add_argument("--password", "-p", help="SBI PDF password; parse the PDFs directly instead of the extractor workbook (the keyring is used if $SBI_KEYRING_PASSPHRASE is set)")
+    parser.add_argument("--output", "-o", default=statement_paths.UNIFIED_OUTPUT_DIR, help="Output directory for the unified ledger")
+    parser.add_argument("--transfer-window", type=int, default=DEFAULT_WINDOW_DAYS,
+                        help=f"Days between the two sides of an own-account transfer (default: {DEFAULT_WINDOW_DAYS})")
+    add_range_arguments(parser, "statements and months")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a single chronological ledger from HDFC and SBI statements")
+    add_arguments(parser)
+    run(parser.parse_args())
+
+
+def run(args):
+    """Build and save the ledger for parsed command line arguments"""
+    print("🏦 UNIFIED MULTI-BANK LEDGER")
+    print("=" * 60)
+
+    runs = load_hdfc_runs(args.hdfc_dir, args.start, args.end)
+    keyring = None
+    if not args.password:
+        try:
+            keyring = load_keyring()
+        except ValueError as e:
+            print(f"⚠️  Keyring not used: {e}")
+    if args.password or keyring is not None:
+        runs += load_sbi_runs_from_pdfs(args.sbi_pdfs, args.password, keyring, args.start, args.end)
+    else:
+        runs += load_sbi_runs_from_excel(args.sbi_excel)
+
+    if is_ranged(args.start, args.end):
+        # Statements can run past the range's months; only the range's rows are merged
+        runs = [run[in_range(run['Date'], args.start, args.end)] for run in runs]
+        print(f"📅 Updating {range_label(args.start, args.end)} in the saved ledger...")
+        months = ingest_runs(runs, args.output, transfer_window=args.transfer_window, start=args.start, end=args.end)
+        if not months:
+            print("❌ No transactions found in the range!")
+            return
+        print(f"🗓️  Months rewritten: {', '.join(months)}")
+        return
+
+    print(f"🔀 Merging {len(runs)} statement runs...")
+    ledger = build_ledger(runs, transfer_window=args.transfer_window)
+    if ledger.empty:
+        print("❌ No transactions found to merge!")
+        return
+
+    save_ledger(ledger, args.output)
+    rebuild_state(ledger, args.output)
+    print_ledger_summary(ledger)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+Statement Watcher - ingests new bank statements as soon as they land.
+
+Watches the HDFC folder for .xls/.xlsx and delimited .csv/.txt exports and the SBI folders for
+PDFs (inotify on Linux, directory polling elsewhere). Each new or modified
+file is debounced until it stops changing, queued to a bounded worker pool
+and merged into the unified ledger on its own - nothing else is reprocessed.
+
+PDFs dropped straight into the SBI folder are first moved into
+SBI/statements, the same way organize_pdfs.py does.
+
+A file whose ingest fails is not marked as processed: it is tried again
+when it changes, when the keyring file changes (a password may have been
+added) and on the next start.
+
+A status file with queue depth and ingest lag is rewritten every second.
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import shutil
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import statement_paths
+from sbi_keyring import KEYRING_FILE, load_keyring
+
+HDFC_EXTENSIONS = ('.xls', '.xlsx', '.csv', '.txt')
+SBI_EXTENSIONS = ('.pdf',)
+STATE_FILE = "watch_state.json"
+STATUS_FILE = "watch_status.json"
+
+# inotify event masks (see <sys/inotify.h>)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, 'O_CLOEXEC', 0o2000000)
+EVENT_HEADER = struct.Struct('iIII')
+
+
+class InotifyWatcher:
+    """Directory watcher backed by Linux inotify (via ctypes, no extra packages)"""
+
+    name = "inotify"
+
+    def __init__(self, directories):
+        libc_name = ctypes.util.find_library('c')
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError("inotify is not available")
+
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self.directories = {}
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_MODIFY
+        for directory in directories:
+            wd = libc.inotify_add_watch(self.fd, os.fsencode(directory), mask)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+            self.directories[wd] = directory
+
+    def poll(self, timeout):
+        """Return the set of paths that changed within `timeout` seconds"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        changed = set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, _, _, name_len = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + name_len].rstrip(b'\0')
+            offset += name_len
+            if name and wd in self.directories:
+                changed.add(os.path.join(self.directories[wd], os.fsdecode(name)))
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Portable fallback that compares directory snapshots"""
+
+    name = "polling"
+
+    def __init__(self, directories, interval=2.0):
+        self.directories = list(directories)
+        self.interval = interval
+        self.snapshot = self.scan()
+
+    def scan(self):
+        snapshot = {}
+        for directory in self.directories:
+            try:
+                entries = os.scandir(directory)
+            except FileNotFoundError:
+                continue
+            with entries:
+                for entry in entries:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        snapshot[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def poll(self, timeout):
+        time.sleep(max(timeout, self.interval))
+        current = self.scan()
+        changed = {path for path, sig in current.items() if self.snapshot.get(path) != sig}
+        self.snapshot = current
+        return changed
+
+    def close(self):
+        pass
+
+
+def create_watcher(directories, force_polling=False, interval=2.0):
+    """Use inotify where available, otherwise fall back to polling"""
+    if not force_polling and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(directories)
+        except OSError as e:
+            print(f"⚠️  inotify unavailable ({e}), falling back to polling")
+    return PollingWatcher(directories, interval)
+
+
+def file_signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def is_statement_file(path):
+    """HDFC exports in the HDFC folder, PDFs in the SBI folders"""
+    name = os.path.basename(path)
+    if name.startswith(('~$', '.')):
+        return False
+    if os.path.dirname(path) == statement_paths.HDFC_DIR:
+        return name.lower().endswith(HDFC_EXTENSIONS)
+    return name.lower().endswith(SBI_EXTENSIONS)
+
+
+class StatementWatcher:
+    """Debounces file events and ingests finished files on a bounded pool"""
+
+    def __init__(self, output_dir, password=None, debounce=3.0, workers=2, max_queue=8,
+                 force_polling=False, poll_interval=2.0, keyring=None):
+        self.output_dir = output_dir
+        self.password = password
+        self.keyring = keyring
+        self.debounce = debounce
+        self.max_queue = max_queue
+        self.state_path = os.path.join(output_dir, STATE_FILE)
+        self.status_path = os.path.join(output_dir, STATUS_FILE)
+
+        self.sbi_drop_dir = statement_paths.SBI_DIR
+        self.directories = [statement_paths.HDFC_DIR, statement_paths.SBI_PDF_DIR, self.sbi_drop_dir]
+        os.makedirs(statement_paths.SBI_PDF_DIR, exist_ok=True)
+        os.makedirs(output_dir, exist_ok=True)
+
+        self.watcher = create_watcher(self.directories, force_polling, poll_interval)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest")
+        # The ledger workbooks are shared, so merges are applied one at a time
+        self.write_lock = threading.Lock()
+
+        self.pending = {}       # path -> {'first_seen', 'last_event', 'signature'}
+        self.in_flight = {}     # path -> (future, first_seen)
+        # Failed files are not in the state, so its existence (not its contents) marks the first run
+        self.first_run = not os.path.exists(self.state_path)
+        self.processed = self.load_state()
+        # path -> signature of the files whose last ingest failed; never saved, so a restart retries them
+        self.failed = {}
+        self.keyring_signature = file_signature(KEYRING_FILE)
+        self.stats = {'ingested': 0, 'failed': 0, 'last_lag_seconds': None, 'last_file': None}
+
+    def load_state(self):
+        if os.path.exists(self.state_path):
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {}
+
+    def save_state(self):
+        write_json_atomic(self.state_path, self.processed)
+
+    def seed(self, ingest_existing):
+        """Queue files already present that are new or changed since the last run"""
+        for directory in self.directories:
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                path = os.path.join(directory, name)
+                if not is_statement_file(path):
+                    continue
+                if path in self.processed and self.processed[path] == file_signature(path):
+                    continue
+                if not self.first_run or ingest_existing:
+                    self.note_event(path)
+                else:
+                    # First run without --ingest-existing: treat what is there as the baseline
+                    self.processed[path] = file_signature(path)
+        self.save_state()
+
+    def note_event(self, path, retry=False):
+        if not is_statement_file(path):
+            return
+        now = time.time()
+        entry = self.pending.setdefault(path, {'first_seen': now, 'signature': None})
+        entry['last_event'] = now
+        # Failed files are skipped until they change, unless the keyring changed
+        entry['retry'] = entry.get('retry', False) or retry
+
+    def dispatch_ready(self):
+        """Submit debounced files whose size and mtime have stopped changing"""
+        now = time.time()
+        for path in sorted(self.pending, key=lambda p: self.pending[p]['first_seen']):
+            if len(self.in_flight) >= self.max_queue:
+                break
+            entry = self.pending[path]
+            if now - entry['last_event'] < self.debounce or path in self.in_flight:
+                continue
+            if path in {self.final_path(moving) for moving in self.in_flight}:
+                # The move of a dropped PDF that is being ingested - settled once that ingest finishes
+                continue
+
+            signature = file_signature(path)
+            if signature is None:
+                del self.pending[path]
+                continue
+            if signature != entry['signature']:
+                # Still being written - check again after another debounce window
+                entry['signature'] = signature
+                entry['last_event'] = now
+                continue
+            if self.processed.get(path) == signature or (self.failed.get(path) == signature and not entry['retry']):
+                del self.pending[path]
+                continue
+
+            del self.pending[path]
+            self.in_flight[path] = (self.pool.submit(self.ingest_file, path), entry['first_seen'])
+
+    def final_path(self, path):
+        """Where a file ends up once ingested: PDFs dropped into the SBI folder move to SBI/statements"""
+        if os.path.dirname(path) == self.sbi_drop_dir and path.lower().endswith('.pdf'):
+            return os.path.join(statement_paths.SBI_PDF_DIR, os.path.basename(path))
+        return path
+
+    def ingest_file(self, path):
+        """Parse one statement file and merge it into the unified ledger
+
+        Returns the file's path after ingesting (a dropped PDF's new path in
+        SBI/statements) and the ledger months it changed.
+        """
+        import unified_ledger
+        from dashboard import update_dashboard
+
+        if self.final_path(path) != path:
+            moved = move_to_statements_folder(path)
+            if moved is None:
+                return path, None
+            path = moved
+
+        run = unified_ledger.load_statement_file(path, self.password, self.keyring)
+        if run is None or run.empty:
+            raise ValueError(f"no transactions read from {os.path.basename(path)}")
+        with self.write_lock:
+            months = unified_ledger.ingest_runs([run], self.output_dir)
+            if months:
+                # Only the sections covering the ingested months are rendered again
+                update_dashboard(self.output_dir)
+            return path, months
+
+    def collect_finished(self):
+        for path, (future, first_seen) in list(self.in_flight.items()):
+            if not future.done():
+                continue
+            del self.in_flight[path]
+            name = os.path.basename(path)
+            try:
+                final_path, months = future.result()
+            except Exception as e:
+                self.stats['failed'] += 1
+                print(f"❌ {name}: {e} (retried when it or the keyring changes)")
+                if not os.path.exists(path):
+                    # A dropped PDF fails after it has been moved
+                    self.failed.pop(path, None)
+                    path = self.final_path(path)
+                signature = file_signature(path)
+                if signature is not None:
+                    self.failed[path] = signature
+                continue
+
+            for done in (path, final_path):
+                self.failed.pop(done, None)
+                self.processed.pop(done, None)
+            self.stats['ingested'] += 1
+            self.stats['last_file'] = name
+            self.stats['last_lag_seconds'] = round(time.time() - first_seen, 2)
+            # A dropped PDF is recorded under its new path, so the event its move raises is not ingested again
+            self.processed[final_path] = file_signature(final_path)
+            self.save_state()
+            if months:
+                print(f"📥 {name}: ingested into {', '.join(months)} ({self.stats['last_lag_seconds']}s after it landed)")
+
+    def check_keyring(self):
+        """Reload the keyring and retry the failed files when the keyring file changes"""
+        signature = file_signature(KEYRING_FILE)
+        if signature == self.keyring_signature:
+            return
+        self.keyring_signature = signature
+        if self.password:
+            return
+        try:
+            self.keyring = load_keyring()
+        except ValueError as e:
+            print(f"⚠️  Keyring changed but could not be loaded: {e}")
+            return
+        if self.failed:
+            print(f"🔑 Keyring changed - retrying {len(self.failed)} failed file(s)")
+        for path in self.failed:
+            self.note_event(path, retry=True)
+
+    def write_status(self):
+        now = time.time()
+        waiting = [entry['first_seen'] for entry in self.pending.values()]
+        waiting += [first_seen for _, first_seen in self.in_flight.values()]
+        status = {
+            'updated_at': datetime.now().isoformat(timespec='seconds'),
+            'backend': self.watcher.name,
+            'queue_depth': len(self.pending) + len(self.in_flight),
+            'debouncing': len(self.pending),
+            'in_progress': len(self.in_flight),
+            'oldest_pending_lag_seconds': round(now - min(waiting), 2) if waiting else 0,
+            'last_ingest_lag_seconds': self.stats['last_lag_seconds'],
+            'last_file': self.stats['last_file'],
+            'ingested': self.stats['ingested'],
+            'failed': self.stats['failed'],
+            'failing': sorted(os.path.basename(path) for path in self.failed),
+        }
+        write_json_atomic(self.status_path, status)
+
+    def run(self, ingest_existing=False):
+        print(f"👀 Watching with {self.watcher.name}:")
+        for directory in self.directories:
+            print(f"   - {directory}")
+        print(f"📋 Status file: {self.status_path}")
+
+        self.seed(ingest_existing)
+        last_status = 0
+        try:
+            while True:
+                for path in self.watcher.poll(timeout=0.5):
+                    self.note_event(path)
+                self.dispatch_ready()
+                self.collect_finished()
+                if time.time() - last_status >= 1:
+                    self.check_keyring()
+                    self.write_status()
+                    last_status = time.time()
+        except KeyboardInterrupt:
+            print("\n🛑 Stopping watcher...")
+        finally:
+            self.pool.shutdown(wait=True)
+            self.collect_finished()
+            self.write_status()
+            self.watcher.close()
+
+
+def move_to_statements_folder(pdf_path):
+    """Move a PDF dropped into the SBI folder into SBI/statements"""
+    destination = os.path.join(statement_paths.SBI_PDF_DIR, os.path.basename(pdf_path))
+    if os.path.exists(destination):
+        print(f"⚠️  Skipped {os.path.basename(pdf_path)} (already exists in statements folder)")
+        return None
+    shutil.move(pdf_path, destination)
+    print(f"✅ Moved {os.path.basename(pdf_path)} → statements/")
+    return destination
+
+
+def write_json_atomic(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch the statement folders and ingest new files as they land")
+    parser.add_argument("--output", "-o", default=statement_paths.UNIFIED_OUTPUT_DIR, help="Unified ledger directory")
+    parser.add_argument("--password", "-p", default=os.environ.get("SBI_PDF_PASSWORD"),
+                        help="SBI PDF password (default: $SBI_PDF_PASSWORD, else the keyring when $SBI_KEYRING_PASSPHRASE is set); PDFs are skipped without either")
+    parser.add_argument("--debounce", type=float, default=3.0, help="Seconds a file must stay unchanged before ingesting (default: 3)")
+    parser.add_argument("--workers", type=int, default=2, help="Parallel ingest workers (default: 2)")
+    parser.add_argument("--max-queue", type=int, default=8, help="Maximum files queued or in progress (default: 8)")
+    parser.add_argument("--poll", action="store_true", help="Use directory polling instead of inotify")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="Polling interval in seconds (default: 2)")
+    parser.add_argument("--ingest-existing", action="store_true", help="On the first run, also ingest files already present")
+    args = parser.parse_args()
+
+    print("🏦 STATEMENT WATCHER")
+    print("=" * 60)
+
+    keyring = None
+    if not args.password:
+        try:
+            keyring = load_keyring()
+        except ValueError as e:
+            print(f"❌ Keyring: {e}")
+            sys.exit(1)
+        if keyring is not None:
+            print(f"🔑 Using the keyring ({len(keyring.families)} file families)")
+
+    watcher = StatementWatcher(args.output, args.password, args.debounce, args.workers,
+                               args.max_queue, args.poll, args.poll_interval, keyring)
+    watcher.run(args.ingest_existing)
+
+
+if __name__ == "__main__":
+    main()